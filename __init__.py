@@ -1,3 +1,5 @@
 # -*- coding: utf-8 -*-
+from . import tools
 from . import models
 from . import wizard
+from . import controllers
@@ -53,9 +53,16 @@
         'views/dgii_ecf_tipo_views.xml',
         'views/dgii_ecf_sequence_range_views.xml',
         'views/dgii_transaction_log_views.xml',
+        'views/dgii_circuit_breaker_views.xml',
+        'views/dgii_latency_histogram_views.xml',
+        'views/dgii_rnc_registry_views.xml',
+        'views/dgii_lookup_cache_views.xml',
         'views/account_journal_views.xml',
         'views/account_move_views.xml',
+        'views/dgii_send_queue_views.xml',
+        'views/dgii_status_history_views.xml',
         'views/res_partner_views.xml',
+        'views/dgii_rnc_validation_job_views.xml',
         'views/res_config_settings_views.xml',
         'views/product_template_views.xml',
         'views/ecf_credit_views.xml',
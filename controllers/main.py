@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import hmac
+import json
+import logging
+import time
+
+from odoo import SUPERUSER_ID, http
+from odoo.http import request
+
+_logger = logging.getLogger(__name__)
+
+# Diferencia máxima (segundos) aceptada entre X-DGII-Timestamp y la hora del servidor
+CALLBACK_MAX_SKEW = 300
+
+
+class DgiiEcfController(http.Controller):
+
+    @http.route('/dgii_ecf/metrics', type='http', auth='none', methods=['GET'], csrf=False)
+    def metrics(self, token=None, **kwargs):
+        """
+        Histogramas de latencia en formato Prometheus.
+        Requiere el token configurado en dgii_ecf.metrics_token
+        (parámetro ?token= o cabecera Authorization: Bearer <token>).
+        """
+        env = request.env(su=True)
+        expected = env['ir.config_parameter'].get_param('dgii_ecf.metrics_token')
+        if not expected:
+            return request.not_found()
+
+        auth = request.httprequest.headers.get('Authorization', '')
+        provided = token or (auth[7:] if auth.startswith('Bearer ') else '')
+        if not hmac.compare_digest(provided.encode(), expected.encode()):
+            return request.make_response('Forbidden', status=403)
+
+        body = env['dgii.latency.histogram']._prometheus_text()
+        return request.make_response(body, headers=[('Content-Type', 'text/plain; version=0.0.4')])
+
+    @http.route('/dgii_ecf/status_callback', type='http', auth='none', methods=['POST'], csrf=False)
+    def status_callback(self, **kwargs):
+        """
+        Recibe cambios de estado enviados por el microservicio para uno o varios trackIds.
+
+        Cabeceras:
+            X-DGII-Timestamp: segundos epoch del envío
+            X-DGII-Signature: sha256=<hex HMAC-SHA256(secret, "<timestamp>.<cuerpo>")>
+
+        Cuerpo: {"results": [{"trackId": ..., "codigo": ..., "estado": ..., "mensajes": [...]}, ...]}
+        o un único objeto de estado.
+        """
+        env = request.env(user=SUPERUSER_ID, su=True)
+        secret = env['ir.config_parameter'].get_param('dgii_ecf.callback_secret')
+        if not secret:
+            return request.not_found()
+
+        raw = request.httprequest.get_data()
+        headers = request.httprequest.headers
+        timestamp = headers.get('X-DGII-Timestamp', '')
+        signature = headers.get('X-DGII-Signature', '')
+        if not timestamp.isdigit() or abs(time.time() - int(timestamp)) > CALLBACK_MAX_SKEW:
+            return request.make_json_response({'success': False, 'error': 'Timestamp inválido'}, status=401)
+
+        expected = 'sha256=' + hmac.new(
+            secret.encode(), timestamp.encode() + b'.' + raw, hashlib.sha256).hexdigest()
+        if not hmac.compare_digest(signature.encode(), expected.encode()):
+            _logger.warning('Callback de estado DGII con firma inválida desde %s', request.httprequest.remote_addr)
+            return request.make_json_response({'success': False, 'error': 'Firma inválida'}, status=401)
+
+        try:
+            body = json.loads(raw.decode('utf-8'))
+        except ValueError:
+            return request.make_json_response({'success': False, 'error': 'JSON inválido'}, status=400)
+        items = body.get('results') if isinstance(body, dict) and 'results' in body else [body]
+        if not isinstance(items, list):
+            return request.make_json_response({'success': False, 'error': 'Se esperaba "results"'}, status=400)
+
+        summary = env['account.move']._dgii_apply_status_callback(items)
+        _logger.info('Callback de estado DGII: %s recibidos, %s aplicados', summary['received'], summary['applied'])
+        return request.make_json_response({'success': True, 'data': summary})
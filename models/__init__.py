@@ -2,14 +2,24 @@
 from . import dgii_ecf_tipo
 from . import dgii_ecf_sequence_range
 from . import dgii_transaction_log
+from . import dgii_circuit_breaker
+from . import dgii_http_client
+from . import dgii_latency_histogram
+from . import dgii_rnc_registry
+from . import dgii_lookup_cache
+from . import dgii_send_queue
 # ecf.api.provider y ecf.api.log vienen de l10n_do_e_cf_tests
 # Extensiones para agregar relación con account.move
 from . import ecf_api_log_extension
 from . import ecf_api_provider_extension
 from . import account_journal
 from . import account_move
+from . import dgii_status_history
 from . import res_partner
+from . import dgii_rnc_validation_job
+from . import dgii_rnc_lookup_request
 from . import res_config_settings
 from . import product_template
 from . import ecf_credit
 from . import ecf_credit_application
+from . import ecf_credit_balance
@@ -1,13 +1,18 @@
 # -*- coding: utf-8 -*-
+import hashlib
 import json
 import logging
-from datetime import datetime
+import time
+from datetime import datetime, timedelta
 
 import requests
 
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError, ValidationError
 
+from ..tools import metrics
+from ..tools.resilience import CircuitOpenError, RateLimitedError
+
 _logger = logging.getLogger(__name__)
 
 
@@ -59,6 +64,7 @@ class AccountMove(models.Model):
         string='DGII Track ID',
         copy=False,
         readonly=True,
+        index='btree_not_null',
         help='Identificador de seguimiento devuelto por DGII/microservicio'
     )
 
@@ -112,6 +118,20 @@ class AccountMove(models.Model):
         help='Respuesta completa en JSON para auditoría'
     )
 
+    dgii_next_status_check_at = fields.Datetime(
+        string='Próxima Consulta DGII',
+        copy=False,
+        readonly=True,
+        help='Momento en que el cron volverá a consultar el estado; las consultas se espacian '
+             'a medida que el comprobante envejece'
+    )
+
+    dgii_status_check_count = fields.Integer(
+        string='Consultas de Estado',
+        copy=False,
+        readonly=True,
+    )
+
     dgii_last_status_date = fields.Datetime(
         string='Última Consulta DGII',
         copy=False,
@@ -119,6 +139,22 @@ class AccountMove(models.Model):
         help='Fecha/hora de la última consulta de estado en DGII'
     )
 
+    dgii_idempotency_key = fields.Char(
+        string='Clave de Idempotencia',
+        copy=False,
+        readonly=True,
+        index=True,
+        help='Clave determinística (RNC emisor + e-NCF + hash del payload) enviada en cada intento '
+             'para que el microservicio no procese dos veces el mismo e-CF'
+    )
+
+    dgii_status_history_ids = fields.One2many(
+        'dgii.status.history',
+        'move_id',
+        string='Historial de Estados DGII',
+        readonly=True,
+    )
+
     # ========== CAMPOS DE LOGS DE API ==========
     api_log_ids = fields.One2many(
         'ecf.api.log',
@@ -549,8 +585,53 @@ class AccountMove(models.Model):
                         # El e-NCF se puede generar manualmente después
                         pass
 
+        # Encolar el envío a DGII de las facturas numeradas (tras el commit)
+        to_send = self.filtered(
+            lambda m: m.move_type in ('out_invoice', 'out_refund')
+            and m.encf and m.dgii_estado == 'draft'
+        )
+        if to_send and self._dgii_auto_send_enabled():
+            to_send._dgii_schedule_auto_send()
+
         return res
 
+    @api.model
+    def _dgii_auto_send_enabled(self):
+        """Indica si las facturas se encolan para envío a DGII al confirmarse."""
+        icp = self.env['ir.config_parameter'].sudo()
+        return icp.get_param('dgii_ecf.auto_send_on_post', 'False') == 'True'
+
+    def _dgii_schedule_auto_send(self):
+        """
+        Encola las facturas para envío cuando la transacción se confirme.
+
+        Las facturas confirmadas en la misma transacción se acumulan en un único
+        callback post-commit, que las encola juntas con un cursor nuevo. Si la
+        transacción hace rollback el callback se descarta y no se envía nada.
+        """
+        postcommit = self.env.cr.postcommit
+        pending_ids = postcommit.data.get('dgii_auto_send_ids')
+        if pending_ids is None:
+            pending_ids = postcommit.data['dgii_auto_send_ids'] = set()
+            registry = self.env.registry
+            uid = self.env.uid
+
+            @postcommit.add
+            def _enqueue_posted_invoices():
+                try:
+                    with registry.cursor() as cr:
+                        env = api.Environment(cr, uid, {})
+                        moves = env['account.move'].browse(sorted(pending_ids)).exists().filtered(
+                            lambda m: m.state == 'posted' and m.dgii_estado == 'draft'
+                        )
+                        env['dgii.send.queue'].enqueue(
+                            moves, contingency=env['account.move']._dgii_is_contingency())
+                except Exception:  # noqa: BLE001
+                    # El envío manual o la cola siguen disponibles; no romper el commit del usuario
+                    _logger.exception('No se pudieron encolar para envío DGII las facturas %s', sorted(pending_ids))
+
+        pending_ids.update(self.ids)
+
     # ========== MÉTODOS DE ACCIÓN ==========
     def action_generate_encf(self):
         """Acción manual para generar el e-NCF."""
@@ -616,19 +697,153 @@ class AccountMove(models.Model):
         """
         self.ensure_one()
 
-        # Validaciones previas al envío
+        if self._dgii_is_contingency():
+            return self._dgii_send_in_contingency()
+
+        provider = self._get_dgii_provider()
+        result = self._dgii_send(provider)
+
+        if not result['success'] and result.get('transient'):
+            # Falla temporal del servicio: se reintenta en segundo plano con backoff
+            job = self.env['dgii.send.queue']._enqueue_retry(self, result['error'])
+            return {
+                'type': 'ir.actions.client',
+                'tag': 'display_notification',
+                'params': {
+                    'title': _('Servicio DGII no disponible'),
+                    'message': _('%(error)s\nSe reintentará automáticamente a las %(date)s.') % {
+                        'error': result['error'] or _('Error desconocido'),
+                        'date': fields.Datetime.context_timestamp(self, job.next_attempt_at).strftime('%H:%M:%S'),
+                    },
+                    'type': 'warning',
+                    'sticky': True,
+                }
+            }
+
+        if not result['success']:
+            raise UserError(_(
+                'Error al enviar a DGII:\n%s'
+            ) % (result['error'] or 'Error desconocido'))
+
+        self._dgii_apply_send_result(provider, result)
+        track_id = result['track_id']
+
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Enviado a DGII'),
+                'message': _('TrackID: %s') % (track_id or _('N/D')),
+                'type': 'success',
+                'sticky': False,
+            }
+        }
+
+    @api.model
+    def _dgii_is_contingency(self):
+        """
+        Modo contingencia: activado manualmente (dgii_ecf.contingency_mode) o
+        automáticamente mientras el circuito del endpoint de envío está abierto
+        y en enfriamiento. Al vencer el enfriamiento el siguiente envío (o el
+        drenaje de contingencia) hace la petición de prueba.
+        """
+        icp = self.env['ir.config_parameter'].sudo()
+        if icp.get_param('dgii_ecf.contingency_mode', 'False') == 'True':
+            return True
+        return self.env['dgii.circuit.breaker'].sudo()._is_open('send')
+
+    def _dgii_send_in_contingency(self):
+        """
+        Emite la factura en contingencia: valida localmente, congela el payload
+        y lo encola para el envío ordenado al restablecerse el servicio.
+        """
+        self.ensure_one()
         self._validate_before_dgii_send()
+        self.env['dgii.send.queue'].enqueue(self, contingency=True)
+        self.message_post(body=_(
+            'e-CF emitido en modo contingencia. Se enviará a DGII automáticamente '
+            'cuando se restablezca el servicio.'
+        ))
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Modo Contingencia'),
+                'message': _('%s quedó en cola para envío a DGII.') % self.encf,
+                'type': 'warning',
+                'sticky': False,
+            }
+        }
+
+    def action_enqueue_dgii_send(self):
+        """
+        Encola las facturas seleccionadas para envío en segundo plano.
+        El envío real lo realizan los workers de la cola (dgii.send.queue).
+        """
+        moves = self.filtered(
+            lambda m: m.state == 'posted'
+            and m.move_type in ('out_invoice', 'out_refund')
+            and m.dgii_estado in ('draft', 'error')
+        )
+        if not moves:
+            raise UserError(_('No hay facturas confirmadas pendientes de envío a DGII en la selección.'))
+
+        jobs = self.env['dgii.send.queue'].enqueue(moves, contingency=self._dgii_is_contingency())
+
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Envío a DGII en cola'),
+                'message': _('%s factura(s) encolada(s) para envío.') % len(jobs),
+                'type': 'success',
+                'sticky': False,
+            }
+        }
 
-        # Obtener proveedor de API por defecto
+    def _get_dgii_provider(self):
+        """Obtiene el proveedor de API por defecto o lanza error si no existe."""
         provider = self.env['ecf.api.provider'].get_default_provider()
         if not provider:
             raise UserError(_(
                 'No hay proveedor de API configurado.\n\n'
                 'Configure un proveedor en:\nDGII → Técnico → Proveedores de API'
             ))
+        return provider
+
+    def _get_dgii_send_origin(self):
+        """Determina el origen del envío según el tipo de documento."""
+        self.ensure_one()
+        if self.move_type in ('out_refund', 'in_refund'):
+            return 'credit_note'
+        if self.encf and self.encf[1:3] == '33':
+            return 'debit_note'
+        return 'invoice'
+
+    def _dgii_send(self, provider, invoice_data=None):
+        """
+        Valida, construye y envía el e-CF sin escribir el resultado en la factura.
+
+        Args:
+            provider: ecf.api.provider a utilizar
+            invoice_data (dict): payload congelado (modo contingencia); si no se
+                indica se construye a partir de la factura
+
+        Returns:
+            dict: success, response_data, track_id, error, raw_response, signed_xml
+        """
+        self.ensure_one()
+        dbname = self.env.cr.dbname
+        started = time.monotonic()
+
+        # Validaciones previas al envío
+        with metrics.timer(dbname, self._dgii_metrics_key('validate')):
+            self._validate_before_dgii_send()
 
         # Construir el JSON del e-CF
-        invoice_data = self._build_dgii_invoice_data()
+        if invoice_data is None:
+            with metrics.timer(dbname, self._dgii_metrics_key('build')):
+                invoice_data = self._build_dgii_invoice_data()
 
         # Log en consola para debugging
         _logger.info("========== JSON DGII GENERADO ==========")
@@ -637,58 +852,349 @@ class AccountMove(models.Model):
         _logger.info(f"Proveedor: {provider.name}")
         _logger.info("=========================================")
 
-        # Determinar origen según tipo de documento
-        move_type = self.move_type
-        if move_type in ('out_refund', 'in_refund'):
-            origin = 'credit_note'
-        elif self.encf and self.encf[1:3] == '33':
-            origin = 'debit_note'
-        else:
-            origin = 'invoice'
+        # La misma clave viaja en todos los reintentos del mismo e-CF
+        idempotency_key = self._get_dgii_idempotency_key(invoice_data)
+
+        # Con el endpoint de lote habilitado el envío sale por la sesión compartida, con la
+        # clave en la cabecera Idempotency-Key; el proveedor no permite agregar cabeceras
+        if self.env['dgii.send.queue']._get_queue_settings()['send_batch_size']:
+            return self._dgii_send_batch(payloads={self.id: invoice_data})[self.id]
 
         # Enviar usando el proveedor (usa método extendido que asocia el move_id al log)
-        success, response_data, track_id, error_msg, raw_response, signed_xml = provider.send_ecf_from_invoice(
-            ecf_json=invoice_data,
-            move=self,
-            origin=origin,
+        with metrics.timer(dbname, self._dgii_metrics_key('http')):
+            success, response_data, track_id, error_msg, raw_response, signed_xml = provider.with_context(
+                dgii_idempotency_key=idempotency_key,
+            ).send_ecf_from_invoice(
+                ecf_json=invoice_data,
+                move=self,
+                origin=self._get_dgii_send_origin(),
+            )
+        self._dgii_observe_remote(response_data)
+        metrics.observe(dbname, self._dgii_metrics_key('total'), (time.monotonic() - started) * 1000)
+        self.env['dgii.latency.histogram'].sudo()._flush_if_due()
+
+        return self._dgii_check_already_received({
+            'success': success,
+            'response_data': response_data,
+            'track_id': track_id,
+            'error': error_msg,
+            'raw_response': raw_response,
+            'signed_xml': signed_xml,
+            'transient': not success and self._dgii_is_transient_error(error_msg),
+        })
+
+    # ========== MÉTRICAS ==========
+    def _dgii_metrics_key(self, stage, endpoint='send'):
+        """Serie de histograma (compañía, tipo e-CF, endpoint, etapa) de la factura."""
+        tipo_ecf = self.encf[1:3] if len(self) == 1 and self.encf else '-'
+        return (self.company_id[:1].id or self.env.company.id, tipo_ecf, endpoint, stage)
+
+    def _dgii_observe_remote(self, response_data, endpoint='send'):
+        """Registra el tiempo de procesamiento (firma/envío) reportado por el microservicio."""
+        data = response_data.get('data', response_data) if isinstance(response_data, dict) else None
+        if not isinstance(data, dict):
+            return
+        remote_ms = data.get('processingTimeMs') or data.get('durationMs')
+        if isinstance(remote_ms, (int, float)):
+            metrics.observe(self.env.cr.dbname, self._dgii_metrics_key('remote', endpoint), remote_ms)
+
+    # ========== IDEMPOTENCIA ==========
+    # Códigos con los que el microservicio/DGII indica que el e-CF ya fue recibido
+    # (ampliables con el parámetro dgii_ecf.already_received_codes)
+    DGII_ALREADY_RECEIVED_CODES = (
+        'ECF_ALREADY_RECEIVED',
+        'ECF_DUPLICATE',
+        'IDEMPOTENCY_KEY_REPLAYED',
+    )
+
+    # Textos de error que indican una falla temporal del servicio (red, timeout, 5xx)
+    DGII_TRANSIENT_MARKERS = (
+        'timeout',
+        'timed out',
+        'tiempo de espera',
+        'connection',
+        'conexión',
+        'conectar',
+        'temporalmente',
+        'límite de peticiones',
+        'http 429',
+        'http 500',
+        'http 502',
+        'http 503',
+        'http 504',
+        'service unavailable',
+        'bad gateway',
+    )
+
+    # Excepciones en las que el servicio no llegó a responder: red, timeout, circuito abierto
+    DGII_TRANSIENT_EXCEPTIONS = (requests.ConnectionError, requests.Timeout, CircuitOpenError, RateLimitedError)
+
+    @api.model
+    def _dgii_is_transient_error(self, error):
+        """
+        Clasifica un envío fallido por su mensaje: True si es transitorio (red,
+        timeout, 5xx/429, circuito abierto) y puede reintentarse. Cualquier otro
+        error, incluidos los de validación o construcción local del e-CF, es
+        permanente aunque no haya respuesta HTTP.
+        """
+        text = str(error or '').lower()
+        return any(marker in text for marker in self.DGII_TRANSIENT_MARKERS)
+
+    @api.model
+    def _dgii_is_transient_exception(self, exc):
+        """True si la excepción es una falla de red, timeout o circuito abierto."""
+        return isinstance(exc, self.DGII_TRANSIENT_EXCEPTIONS)
+
+    @api.model
+    def _dgii_hash_payload(self, payload):
+        """Hash SHA-256 del payload serializado de forma canónica."""
+        canonical = json.dumps(payload, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def _get_dgii_idempotency_key(self, invoice_data):
+        """
+        Retorna la clave de idempotencia del e-CF para `invoice_data`.
+        Se deriva del hash del payload: un reintento tras un rollback obtiene la
+        misma clave, y un payload modificado (p. ej. factura corregida) obtiene
+        una nueva en lugar de reutilizar la del envío anterior.
+        """
+        self.ensure_one()
+        seed = '|'.join([
+            self.company_id.vat or '',
+            self.encf or '',
+            self._dgii_hash_payload(invoice_data),
+        ])
+        key = hashlib.sha256(seed.encode('utf-8')).hexdigest()
+        if self.dgii_idempotency_key != key:
+            self.write({'dgii_idempotency_key': key})
+        return key
+
+    @api.model
+    def _get_dgii_already_received_codes(self):
+        """Códigos de respuesta que identifican un e-CF ya recibido."""
+        extra = self.env['ir.config_parameter'].sudo().get_param('dgii_ecf.already_received_codes') or ''
+        return frozenset(self.DGII_ALREADY_RECEIVED_CODES) | frozenset(
+            code.strip() for code in extra.replace('\n', ',').split(',') if code.strip())
+
+    def _dgii_is_already_received(self, result):
+        """
+        Indica si la respuesta de error corresponde a un e-CF ya recibido
+        anteriormente. Solo se consideran los indicadores y códigos explícitos
+        de la respuesta, nunca el texto libre del error.
+        """
+        response_data = result.get('response_data')
+        data = response_data.get('data', response_data) if isinstance(response_data, dict) else {}
+        if not isinstance(data, dict):
+            data = {}
+        if data.get('alreadyReceived') is True or data.get('duplicate') is True:
+            return True
+        codes = self._get_dgii_already_received_codes()
+        found = [data.get('errorCode'), data.get('code')]
+        if isinstance(response_data, dict) and response_data is not data:
+            found += [response_data.get('errorCode'), response_data.get('code')]
+        mensajes = data.get('mensajes') or data.get('messages') or []
+        if isinstance(mensajes, list):
+            found += [m.get('codigo') for m in mensajes if isinstance(m, dict)]
+        return any(str(code) in codes for code in found if code not in (None, ''))
+
+    def _dgii_check_already_received(self, result):
+        """
+        Convierte en éxito un envío rechazado por duplicado: el e-CF ya está en el
+        microservicio/DGII y el reintento no debe tratarse como error.
+        """
+        self.ensure_one()
+        if result['success'] or not self._dgii_is_already_received(result):
+            return result
+
+        response_data = result.get('response_data')
+        data = response_data.get('data', response_data) if isinstance(response_data, dict) else {}
+        _logger.info('e-CF %s ya había sido recibido, se reutiliza el envío previo', self.encf)
+        return dict(
+            result,
+            success=True,
+            error=False,
+            already_received=True,
+            track_id=result['track_id'] or (data or {}).get('trackId') or self.dgii_track_id,
         )
 
-        if not success:
-            raise UserError(_(
-                'Error al enviar a DGII:\n%s'
-            ) % (error_msg or 'Error desconocido'))
+    def _dgii_send_batch(self, payloads=None):
+        """
+        Envía varias facturas en una sola petición al endpoint de lote del microservicio.
+        Las facturas que no pasan validación no se incluyen en la petición.
+
+        Args:
+            payloads (dict): {move_id: payload congelado} para envíos en contingencia
 
-        # Procesar respuesta exitosa
+        Returns:
+            dict: {move_id: resultado} con el mismo formato que _dgii_send()
+        """
+        results = {}
+        items = []
+        moves_by_encf = {}
+        dbname = self.env.cr.dbname
+        started = time.monotonic()
+
+        for move in self:
+            try:
+                with metrics.timer(dbname, move._dgii_metrics_key('validate', 'send_batch')):
+                    move._validate_before_dgii_send()
+                invoice_data = (payloads or {}).get(move.id)
+                if not invoice_data:
+                    with metrics.timer(dbname, move._dgii_metrics_key('build', 'send_batch')):
+                        invoice_data = move._build_dgii_invoice_data()
+            except UserError as exc:
+                results[move.id] = move._dgii_error_result(str(exc), transient=False)
+                continue
+            moves_by_encf[move.encf] = move
+            items.append({
+                'clientRef': move.encf,
+                'idempotencyKey': move._get_dgii_idempotency_key(invoice_data),
+                'rnc': move.company_id.vat,
+                'encf': move.encf,
+                'origin': move._get_dgii_send_origin(),
+                'invoiceData': invoice_data,
+                'fileName': f"{move.company_id.vat or ''}{move.encf}.xml",
+            })
+
+        if not items:
+            return results
+
+        sent_encfs = set(moves_by_encf)
+        config = self._get_microservice_config()
+        url = f"{config['base_url']}/invoice/send-batch"
+        payload = {'environment': config['environment'], 'invoices': items}
+
+        # Un ítem: su clave; varios: clave del lote derivada de las claves de sus ítems
+        headers = self._get_microservice_headers(config)
+        item_keys = [item['idempotencyKey'] for item in items]
+        headers['Idempotency-Key'] = item_keys[0] if len(item_keys) == 1 else \
+            hashlib.sha256('|'.join(sorted(item_keys)).encode('utf-8')).hexdigest()
+
+        _logger.info('Enviando lote de %s e-CF a DGII', len(items))
+        http_started = time.monotonic()
+        try:
+            response = self.env['dgii.http.client']._request(
+                'send', 'post', url,
+                json=payload,
+                headers=headers,
+            )
+            body = response.json() if response.status_code < 500 else {}
+        except (requests.RequestException, ValueError) as exc:
+            error = _('No se pudo enviar el lote al microservicio DGII: %s') % str(exc)
+            transient = self._dgii_is_transient_exception(exc)
+            for move in moves_by_encf.values():
+                results[move.id] = move._dgii_error_result(error, transient=transient)
+            return results
+
+        if response.status_code >= 400 or not body.get('success'):
+            error = body.get('error') or _('Error HTTP %s desde microservicio') % response.status_code
+            transient = response.status_code >= 500 or response.status_code == 429
+            for move in moves_by_encf.values():
+                results[move.id] = move._dgii_error_result(error, transient=transient)
+            return results
+
+        data = body.get('data', body)
+        for item in data.get('results', []):
+            move = moves_by_encf.pop(item.get('clientRef') or item.get('encf'), None)
+            if not move:
+                continue
+            move._dgii_observe_remote(item, 'send_batch')
+            results[move.id] = move._dgii_check_already_received({
+                'success': bool(item.get('success')),
+                'response_data': {'success': item.get('success'), 'data': item},
+                'track_id': item.get('trackId'),
+                'error': item.get('error'),
+                'raw_response': json.dumps(item, ensure_ascii=False),
+                'signed_xml': item.get('signedXml') or item.get('signedEcfXml'),
+                'transient': bool(item.get('retryable')) or (
+                    not item.get('success') and self._dgii_is_transient_error(item.get('error'))),
+            })
+
+        # Facturas sin resultado en la respuesta del lote: seguras de reintentar (idempotencia)
+        for move in moves_by_encf.values():
+            results[move.id] = move._dgii_error_result(
+                _('El microservicio no devolvió resultado para este e-CF.'), transient=True)
+
+        # Un log por factura enviada, creados en un solo INSERT
+        http_ms = int(response.elapsed.total_seconds() * 1000) if response.elapsed else \
+            int((time.monotonic() - http_started) * 1000)
+        log_started = time.monotonic()
+        log_vals = []
+        for move in self.filtered(lambda m: m.encf in sent_encfs):
+            result = results[move.id]
+            log_vals.append({
+                'operation_type': 'send_batch',
+                'move_id': move.id,
+                'encf': move.encf,
+                'state': 'success' if result['success'] else 'error',
+                'request_url': url,
+                'request_method': 'POST',
+                'response_status_code': response.status_code,
+                'response_body': result['raw_response'] or False,
+                'dgii_track_id': result['track_id'] or False,
+                'error_message': result['error'] or False,
+                'duration_ms': http_ms,
+                'notes': _('Lote de %s e-CF') % len(items),
+            })
+        try:
+            with self.env.cr.savepoint():
+                self.env['dgii.transaction.log'].sudo().create(log_vals)
+        except Exception:  # noqa: BLE001
+            # El lote ya fue aceptado: sin log, pero sin perder los resultados
+            _logger.exception('No se pudieron registrar los logs del lote de %s e-CF', len(items))
+
+        batch_key = self._dgii_metrics_key('log', 'send_batch')
+        metrics.observe(dbname, batch_key, (time.monotonic() - log_started) * 1000)
+        metrics.observe(dbname, batch_key[:3] + ('total',), (time.monotonic() - started) * 1000)
+        self.env['dgii.latency.histogram'].sudo()._flush_if_due()
+        return results
+
+    def _dgii_error_result(self, error, transient=False):
+        """Resultado de envío fallido con el mismo formato que _dgii_send()."""
+        return {
+            'success': False,
+            'response_data': {},
+            'track_id': False,
+            'error': error,
+            'raw_response': False,
+            'signed_xml': False,
+            'transient': transient,
+        }
+
+    def _dgii_apply_send_result(self, provider, result):
+        """
+        Escribe en la factura el resultado exitoso de un envío y lo registra en el chatter.
+        `provider` puede ser vacío cuando el envío se hizo por el endpoint de lote.
+        """
+        self.ensure_one()
+
+        response_data = result['response_data']
+        track_id = result['track_id']
         data = response_data.get('data', response_data) if isinstance(response_data, dict) else {}
 
+        new_state = 'pending' if data.get('codigo') in ('0', 0, None) else 'accepted'
         self.write({
-            'dgii_track_id': track_id or data.get('trackId'),
-            'dgii_estado': 'pending' if data.get('codigo') in ('0', 0, None) else 'accepted',
-            'dgii_signed_xml': signed_xml or data.get('signedXml') or data.get('signedEcfXml'),
+            'dgii_track_id': track_id or data.get('trackId') or self.dgii_track_id,
+            'dgii_estado': new_state,
+            'dgii_status_check_count': 0,
+            'dgii_next_status_check_at': self._dgii_next_status_check(0) if new_state == 'pending' else False,
+            'dgii_signed_xml': result['signed_xml'] or data.get('signedXml') or data.get('signedEcfXml'),
             'dgii_security_code': data.get('securityCode') or data.get('ecfSecurityCode'),
             'dgii_qr_url': data.get('qrCodeUrl'),
             'dgii_last_status_date': fields.Datetime.now(),
             'dgii_response_message': self._format_dgii_messages(data),
-            'dgii_response_raw': json.dumps(response_data, ensure_ascii=False) if isinstance(response_data, dict) else raw_response,
+            'dgii_response_raw': json.dumps(response_data, ensure_ascii=False) if isinstance(response_data, dict) else result['raw_response'],
         })
 
         # Registrar en chatter para auditoría
-        message = _('Enviado a DGII via %s. TrackID: %s') % (provider.name, track_id or _('N/D'))
+        via = provider.name if provider else _('microservicio (lote)')
+        message = _('Enviado a DGII via %s. TrackID: %s') % (via, track_id or _('N/D'))
+        if result.get('already_received'):
+            message += _('\nEl e-CF ya había sido recibido; se reutilizó el envío previo.')
         if data.get('estado'):
             message += _('\nEstado inicial: %s') % data.get('estado')
         self.message_post(body=message)
 
-        return {
-            'type': 'ir.actions.client',
-            'tag': 'display_notification',
-            'params': {
-                'title': _('Enviado a DGII'),
-                'message': _('TrackID: %s') % (track_id or _('N/D')),
-                'type': 'success',
-                'sticky': False,
-            }
-        }
-
     def action_send_dgii_approval(self, approval_payload=None, file_name=None):
         """
         Envía una aprobación comercial (ACECF) usando el microservicio.
@@ -725,12 +1231,12 @@ class AccountMove(models.Model):
         config = self._get_microservice_config()
         url = f"{config['base_url']}{endpoint}"
         try:
-            response = requests.request(
-                method=method,
-                url=url,
+            headers = self._get_microservice_headers(config)
+            headers['Idempotency-Key'] = self._dgii_hash_payload({'endpoint': endpoint, 'payload': payload})
+            response = self.env['dgii.http.client']._request(
+                'send', method, url,
                 json=payload,
-                headers=self._get_microservice_headers(config),
-                timeout=20,
+                headers=headers,
             )
         except requests.RequestException as exc:
             raise UserError(_('No se pudo conectar con el microservicio DGII: %s') % str(exc))
@@ -1496,10 +2002,12 @@ class AccountMove(models.Model):
 
         config = self._get_microservice_config()
         try:
-            response = requests.get(
+            response = self.env['dgii.http.client'].with_context(
+                dgii_tipo_ecf=self.encf[1:3] if self.encf else False,
+            )._request(
+                'status', 'get',
                 f"{config['base_url']}/invoice/status/{self.dgii_track_id}",
                 headers=self._get_microservice_headers(config),
-                timeout=10,
             )
         except requests.RequestException as exc:
             raise UserError(_('No se pudo consultar estado en DGII: %s') % str(exc))
@@ -1516,17 +2024,13 @@ class AccountMove(models.Model):
             raise UserError(_('DGII devolvió error: %s') % result.get('error', 'Error desconocido'))
 
         data = result.get('data', {})
-        estado_map = {
-            '0': 'pending',
-            '1': 'accepted',
-            '2': 'rejected',
-            0: 'pending',
-            1: 'accepted',
-            2: 'rejected',
-        }
-        new_state = estado_map.get(data.get('codigo'), self.dgii_estado or 'pending')
+        old_state = self.dgii_estado
+        new_state = self._dgii_map_status(data)
+        checks = self.dgii_status_check_count + 1
         self.write({
             'dgii_estado': new_state,
+            'dgii_status_check_count': checks,
+            'dgii_next_status_check_at': self._dgii_next_status_check(checks) if new_state == 'pending' else False,
             'dgii_last_status_date': fields.Datetime.now(),
             'dgii_response_message': self._format_dgii_messages(data),
             'dgii_response_raw': json.dumps(result, ensure_ascii=False),
@@ -1534,6 +2038,13 @@ class AccountMove(models.Model):
 
         note = _('DGII estado actualizado: %s') % data.get('estado', new_state)
         self.message_post(body=note)
+        if old_state != new_state:
+            self.env['dgii.status.history']._log_changes([{
+                'move_id': self.id,
+                'old_state': old_state,
+                'new_state': new_state,
+                'dgii_status': data.get('estado'),
+            }], source='manual')
 
         return {
             'type': 'ir.actions.client',
@@ -1546,19 +2057,350 @@ class AccountMove(models.Model):
             }
         }
 
+    # Código de estado DGII → dgii_estado
+    DGII_STATUS_CODE_MAP = {
+        '0': 'pending',
+        '1': 'accepted',
+        '2': 'rejected',
+        0: 'pending',
+        1: 'accepted',
+        2: 'rejected',
+    }
+
+    # Espera (segundos) antes de la consulta N+1: rápida al inicio, más espaciada después
+    DGII_STATUS_POLL_DELAYS = (60, 120, 300, 600, 1800, 3600, 10800, 21600)
+
+    def init(self):
+        """Índice parcial para que el cron tome solo las facturas con consulta vencida."""
+        super().init()
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS account_move_dgii_status_due_idx
+                ON account_move (dgii_next_status_check_at)
+             WHERE dgii_track_id IS NOT NULL AND dgii_estado IN ('pending', 'draft')
+        """)
+
+    @api.model
+    def _dgii_next_status_check(self, checks):
+        """
+        Fecha de la próxima consulta tras `checks` consultas sin estado final.
+        Con callbacks configurados la consulta es solo respaldo y empieza a los 10 minutos.
+        """
+        delays = self.DGII_STATUS_POLL_DELAYS
+        if self._dgii_callbacks_enabled():
+            delays = delays[3:]
+        return fields.Datetime.now() + timedelta(seconds=delays[min(checks, len(delays) - 1)])
+
+    @api.model
+    def _get_status_check_ceiling(self):
+        """Consultas tras las que se alerta de un comprobante sin estado final."""
+        icp = self.env['ir.config_parameter'].sudo()
+        return max(int(icp.get_param('dgii_ecf.status_check_max', 15)), 1)
+
+    def _dgii_alert_status_ceiling(self):
+        """Programa una actividad para revisar comprobantes que siguen pendientes en DGII."""
+        for move in self:
+            move.activity_schedule(
+                'mail.mail_activity_data_todo',
+                summary=_('Estado DGII sin resolver'),
+                note=_('El e-CF %s sigue pendiente en DGII después de %s consultas. '
+                       'Verifique el trackID %s.') % (move.encf, move.dgii_status_check_count, move.dgii_track_id),
+                user_id=(move.invoice_user_id or move.create_uid).id,
+            )
+
+    def _dgii_map_status(self, data):
+        """Estado local correspondiente al código devuelto por DGII."""
+        return self.DGII_STATUS_CODE_MAP.get(data.get('codigo'), self.dgii_estado or 'pending')
+
     @api.model
-    def _cron_update_dgii_status(self):
-        """Cron para actualizar estados pendientes en DGII."""
-        pending_moves = self.search([
-            ('dgii_track_id', '!=', False),
-            ('dgii_estado', 'in', ['pending', 'draft']),
-        ], limit=50)
-        for move in pending_moves:
+    def _get_status_batch_size(self):
+        icp = self.env['ir.config_parameter'].sudo()
+        return max(int(icp.get_param('dgii_ecf.status_batch_size', 100)), 1)
+
+    def _dgii_fetch_status_batch(self):
+        """
+        Consulta el estado de varias facturas en una sola petición a
+        POST /invoice/status-batch.
+
+        Returns:
+            dict: {move_id: datos de estado}, o None si el microservicio no
+                ofrece el endpoint de lote
+
+        Raises:
+            UserError: error de conexión o respuesta inválida
+        """
+        moves_by_track = {move.dgii_track_id: move for move in self if move.dgii_track_id}
+        if not moves_by_track:
+            return {}
+
+        config = self._get_microservice_config()
+        try:
+            response = self.env['dgii.http.client']._request(
+                'status', 'post',
+                f"{config['base_url']}/invoice/status-batch",
+                json={'environment': config['environment'], 'trackIds': list(moves_by_track)},
+                headers=self._get_microservice_headers(config),
+            )
+        except requests.RequestException as exc:
+            raise UserError(_('No se pudo consultar estado en DGII: %s') % str(exc))
+
+        if response.status_code == 404:
+            return None
+        if response.status_code >= 400:
+            raise UserError(_('Error HTTP %s al consultar estado DGII.') % response.status_code)
+        try:
+            body = response.json()
+        except ValueError:
+            raise UserError(_('La respuesta del microservicio no es JSON válido.'))
+        if not body.get('success'):
+            raise UserError(_('DGII devolvió error: %s') % body.get('error', 'Error desconocido'))
+
+        results = {}
+        for item in body.get('data', body).get('results', []):
+            move = moves_by_track.get(item.get('trackId'))
+            if move and item.get('success', True):
+                results[move.id] = item
+        return results
+
+    def _dgii_apply_status_results(self, results, source='poll'):
+        """
+        Aplica resultados de estado agrupando las escrituras por estado resultante.
+
+        Las escrituras no pasan por el seguimiento de mail ni por la búsqueda de
+        NC aceptadas del override de `write`: los créditos de NC tipo 34 se crean
+        en un solo lote y los cambios quedan en dgii.status.history en lugar del
+        chatter.
+
+        Args:
+            results (dict): {move_id: datos de estado DGII}
+            source (str): origen para el historial (poll, callback)
+        """
+        moves = self.filtered(lambda m: m.id in results)
+        if not moves:
+            return moves
+
+        now = fields.Datetime.now()
+        ids_by_state = {}
+        changed = []
+        for move in moves:
+            new_state = move._dgii_map_status(results[move.id])
+            ids_by_state.setdefault(new_state, []).append(move.id)
+            if move.dgii_estado != new_state:
+                changed.append((move, move.dgii_estado, new_state))
+
+        bulk = self.with_context(dgii_skip_nc_credit=True, tracking_disable=True)
+        for new_state, move_ids in ids_by_state.items():
+            bulk.browse(move_ids).write({
+                'dgii_estado': new_state,
+                'dgii_last_status_date': now,
+            })
+
+        # Mensaje, respuesta y próxima consulta son distintos por factura: un único UPDATE
+        ceiling = self._get_status_check_ceiling()
+        final_ids = {move_id for state, ids in ids_by_state.items() if state != 'pending' for move_id in ids}
+        checks = [move.dgii_status_check_count + 1 for move in moves]
+        next_checks = [
+            None if move.id in final_ids else self._dgii_next_status_check(count)
+            for move, count in zip(moves, checks)
+        ]
+        self.flush_model(['dgii_response_message', 'dgii_response_raw',
+                          'dgii_status_check_count', 'dgii_next_status_check_at'])
+        self.env.cr.execute("""
+            UPDATE account_move m
+               SET dgii_response_message = v.message,
+                   dgii_response_raw = v.raw,
+                   dgii_status_check_count = v.checks,
+                   dgii_next_status_check_at = v.next_check
+              FROM unnest(%s::int[], %s::text[], %s::text[], %s::int[], %s::timestamp[])
+                   AS v(id, message, raw, checks, next_check)
+             WHERE m.id = v.id
+        """, (
+            moves.ids,
+            [self._format_dgii_messages(results[move_id]) for move_id in moves.ids],
+            [json.dumps(results[move_id], ensure_ascii=False) for move_id in moves.ids],
+            checks,
+            next_checks,
+        ))
+        self.invalidate_model(['dgii_response_message', 'dgii_response_raw',
+                               'dgii_status_check_count', 'dgii_next_status_check_at'])
+
+        # Alertar una sola vez, al alcanzar el tope de consultas
+        moves.filtered(
+            lambda m: m.id not in final_ids and m.dgii_status_check_count == ceiling
+        )._dgii_alert_status_ceiling()
+
+        credits = self.browse([
+            move.id for move, _old_state, new_state in changed if new_state == 'accepted'
+        ])._dgii_create_nc_credits()
+        credit_move_ids = set(credits.credit_move_id.ids)
+
+        self.env['dgii.status.history']._log_changes([{
+            'move_id': move.id,
+            'old_state': old_state,
+            'new_state': new_state,
+            'dgii_status': results[move.id].get('estado'),
+            'note': _('Crédito disponible creado automáticamente.') if move.id in credit_move_ids else None,
+        } for move, old_state, new_state in changed], source=source)
+        return moves
+
+    def _dgii_defer_status_check(self, error=None, source='poll'):
+        """
+        Reprograma la consulta de facturas que quedaron sin resultado (ausentes
+        en la respuesta del lote o en un bloque que falló) con el mismo backoff
+        que las pendientes, para que no se vuelvan a tomar en cada ejecución.
+
+        Args:
+            error (str): motivo de la falla; si se indica, queda en dgii.status.history
+            source (str): origen para el historial (poll, callback)
+        """
+        if not self:
+            return
+        checks = [move.dgii_status_check_count + 1 for move in self]
+        self.flush_model(['dgii_status_check_count', 'dgii_next_status_check_at'])
+        self.env.cr.execute("""
+            UPDATE account_move m
+               SET dgii_status_check_count = v.checks,
+                   dgii_next_status_check_at = v.next_check
+              FROM unnest(%s::int[], %s::int[], %s::timestamp[]) AS v(id, checks, next_check)
+             WHERE m.id = v.id
+        """, (self.ids, checks, [self._dgii_next_status_check(count) for count in checks]))
+        self.invalidate_model(['dgii_status_check_count', 'dgii_next_status_check_at'])
+
+        ceiling = self._get_status_check_ceiling()
+        self.filtered(lambda m: m.dgii_status_check_count == ceiling)._dgii_alert_status_ceiling()
+
+        if error:
+            self.env['dgii.status.history']._log_changes([{
+                'move_id': move.id,
+                'old_state': move.dgii_estado,
+                'new_state': move.dgii_estado or 'pending',
+                'note': _('No se pudo consultar el estado: %s') % error,
+            } for move in self], source=source)
+
+    @api.model
+    def _dgii_callbacks_enabled(self):
+        """Indica si el microservicio notifica estados por callback (secreto configurado)."""
+        return bool(self.env['ir.config_parameter'].sudo().get_param('dgii_ecf.callback_secret'))
+
+    @api.model
+    def _dgii_apply_status_callback(self, items):
+        """
+        Aplica estados notificados por el microservicio (callback). Idempotente:
+        los comprobantes que ya están en el estado final notificado se omiten.
+
+        Args:
+            items (list): dicts con trackId, codigo, estado, mensajes
+
+        Returns:
+            dict: received, applied, unknown (trackIds sin factura)
+        """
+        items_by_track = {item['trackId']: item for item in items if isinstance(item, dict) and item.get('trackId')}
+        moves = self.search([('dgii_track_id', 'in', list(items_by_track))]) if items_by_track else self.browse()
+
+        results = {}
+        for move in moves:
+            item = items_by_track[move.dgii_track_id]
+            new_state = move._dgii_map_status(item)
+            if new_state != 'pending' and move.dgii_estado == new_state:
+                continue
+            results[move.id] = item
+        moves._dgii_apply_status_results(results, source='callback')
+
+        known = set(moves.mapped('dgii_track_id'))
+        return {
+            'received': len(items_by_track),
+            'applied': len(results),
+            'unknown': [track_id for track_id in items_by_track if track_id not in known],
+        }
+
+    def _dgii_update_status_batch(self):
+        """
+        Actualiza el estado DGII de las facturas en lotes de `dgii_ecf.status_batch_size`.
+        Si el microservicio no ofrece consulta en lote, consulta una por una.
+
+        Returns:
+            int: cantidad de facturas con estado recibido
+        """
+        batch_size = self._get_status_batch_size()
+        updated = 0
+        for start in range(0, len(self), batch_size):
+            chunk = self[start:start + batch_size]
             try:
-                move.action_check_dgii_status()
+                results = chunk._dgii_fetch_status_batch()
+            except UserError as exc:
+                _logger.warning('No se pudo consultar estado DGII en lote (%s facturas): %s', len(chunk), exc)
+                chunk._dgii_defer_status_check(error=str(exc))
+                continue
+
+            if results is None:
+                for move in chunk:
+                    try:
+                        with self.env.cr.savepoint():
+                            move.action_check_dgii_status()
+                        updated += 1
+                    except Exception as exc:  # noqa: BLE001
+                        _logger.warning('No se pudo actualizar estado DGII para %s: %s', move.name, exc)
+                        move._dgii_defer_status_check(error=str(exc))
+                continue
+
+            applied = chunk._dgii_apply_status_results(results)
+            # Sin resultado en la respuesta: se reintenta más tarde, no en cada ejecución
+            (chunk - applied)._dgii_defer_status_check()
+            updated += len(applied)
+        return updated
+
+    @api.model
+    def _cron_update_dgii_status(self, time_budget=None):
+        """
+        Cron para actualizar estados pendientes en DGII (consulta en lote).
+        Solo toma facturas con la consulta vencida, las más atrasadas primero.
+
+        Procesa bloques de `dgii_ecf.status_batch_size` facturas hasta agotar
+        `dgii_ecf.cron_time_budget` segundos, con commit por bloque; si queda
+        trabajo pendiente se vuelve a programar de inmediato.
+        """
+        if time_budget is None:
+            time_budget = self.env['dgii.send.queue']._get_cron_time_budget()
+        deadline = time.monotonic() + time_budget
+        batch_size = self._get_status_batch_size()
+        seen_ids = []
+        updated = 0
+        remaining = False
+
+        while True:
+            if time.monotonic() >= deadline:
+                remaining = True
+                break
+            chunk = self.search([
+                ('id', 'not in', seen_ids),
+                ('dgii_track_id', '!=', False),
+                ('dgii_estado', 'in', ['pending', 'draft']),
+                '|',
+                ('dgii_next_status_check_at', '=', False),
+                ('dgii_next_status_check_at', '<=', fields.Datetime.now()),
+            ], order='dgii_next_status_check_at asc nulls first, id', limit=batch_size)
+            if not chunk:
+                break
+            # Las facturas del bloque no se vuelven a tomar en esta ejecución aunque fallen
+            seen_ids.extend(chunk.ids)
+            try:
+                updated += chunk._dgii_update_status_batch()
+                self.env.cr.commit()
             except Exception as exc:  # noqa: BLE001
-                _logger = logging.getLogger(__name__)
-                _logger.warning('No se pudo actualizar estado DGII para %s: %s', move.name, exc)
+                self.env.cr.rollback()
+                _logger.warning('Error actualizando estados DGII de %s facturas: %s', len(chunk), exc)
+                # Registrar la falla y reprogramar el bloque con backoff
+                try:
+                    chunk._dgii_defer_status_check(error=str(exc))
+                    self.env.cr.commit()
+                except Exception:  # noqa: BLE001
+                    self.env.cr.rollback()
+                    _logger.exception('No se pudo reprogramar la consulta de %s facturas', len(chunk))
+
+        if remaining:
+            self.env.ref('odoo_dgii_ecf.ir_cron_update_dgii_status')._trigger()
+        _logger.info('Estados DGII actualizados: %s de %s facturas vencidas%s',
+                     updated, len(seen_ids), ' (continúa)' if remaining else '')
+        return updated
 
     def _format_dgii_messages(self, data):
         """Devuelve un texto legible a partir de la lista de mensajes DGII."""
@@ -1577,7 +2419,8 @@ class AccountMove(models.Model):
         result = super().write(vals)
 
         # Si el estado DGII cambia a 'accepted', verificar si es NC para crear crédito
-        if vals.get('dgii_estado') == 'accepted':
+        # (las actualizaciones en lote crean los créditos con _dgii_create_nc_credits)
+        if vals.get('dgii_estado') == 'accepted' and not self.env.context.get('dgii_skip_nc_credit'):
             for move in self:
                 if move.move_type == 'out_refund' and move.encf and move.encf[1:3] == '34':
                     move._create_credit_from_nc()
@@ -1631,6 +2474,37 @@ class AccountMove(models.Model):
 
         return credit
 
+    def _dgii_create_nc_credits(self):
+        """
+        Crea en lote los créditos de las NC tipo 34 aceptadas que aún no lo tienen.
+        Versión en lote de `_create_credit_from_nc`, sin mensaje de chatter por NC.
+
+        Returns:
+            l10n_do.ecf_credit: créditos creados
+        """
+        credit_model = self.env['l10n_do.ecf_credit']
+        notes = self.filtered(
+            lambda m: m.move_type == 'out_refund' and m.encf and m.encf[1:3] == '34'
+        )
+        if not notes:
+            return credit_model
+
+        existing = set(credit_model.search([('credit_move_id', 'in', notes.ids)]).credit_move_id.ids)
+        notes = notes.filtered(lambda m: m.id not in existing)
+        if not notes:
+            return credit_model
+
+        credits = credit_model.with_context(mail_create_nolog=True, tracking_disable=True).create([{
+            'credit_move_id': note.id,
+            'partner_id': note.partner_id.id,
+            'encf': note.encf,
+            'amount_total': note.amount_total,
+            'amount_available': note.amount_total,
+            'state': 'available',
+        } for note in notes])
+        _logger.info('Créditos creados para %s NC tipo 34 aceptadas', len(credits))
+        return credits
+
     def button_cancel(self):
         """
         Override para revertir créditos aplicados antes de cancelar la factura.
@@ -1705,15 +2579,11 @@ class AccountMove(models.Model):
         if self.state != 'posted':
             raise UserError(_('La factura debe estar confirmada para aplicar créditos.'))
 
-        # Verificar si hay créditos disponibles
-        available_credits = self.env['l10n_do.ecf_credit'].search([
-            ('partner_id', '=', self.partner_id.id),
-            ('company_id', '=', self.company_id.id),
-            ('state', 'in', ['available', 'partial']),
-            ('amount_available', '>', 0),
-        ])
+        # Verificar si hay créditos disponibles (saldo agregado por cliente)
+        _amount, credit_count = self.env['l10n_do.ecf_credit_balance'].sudo()._get_balance(
+            self.partner_id, self.company_id, self.currency_id)
 
-        if not available_credits:
+        if not credit_count:
             raise UserError(_(
                 'No hay créditos disponibles para el cliente %s.'
             ) % self.partner_id.name)
@@ -1729,6 +2599,37 @@ class AccountMove(models.Model):
             },
         }
 
+    def action_auto_apply_credits(self):
+        """
+        Aplica en una sola operación los créditos de NC disponibles de los
+        clientes a las facturas seleccionadas, en orden FIFO.
+        """
+        applications = self.env['l10n_do.ecf_credit']._auto_apply_to_invoices(self)
+        if not applications:
+            raise UserError(_('No hay créditos de NC disponibles para las facturas seleccionadas.'))
+
+        for invoice, invoice_applications in applications.grouped('invoice_move_id').items():
+            invoice.message_post(
+                body=_('Créditos de NC aplicados automáticamente:\n%s') % '\n'.join(
+                    f'{app.credit_encf}: {app.amount_applied}' for app in invoice_applications
+                )
+            )
+
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Créditos Aplicados'),
+                'message': _('Se aplicaron %(count)s créditos por %(amount)s en %(invoices)s facturas.',
+                             count=len(applications),
+                             amount=sum(applications.mapped('amount_applied')),
+                             invoices=len(applications.invoice_move_id)),
+                'type': 'success',
+                'sticky': False,
+                'next': {'type': 'ir.actions.client', 'tag': 'reload'},
+            }
+        }
+
     # ========== ONCHANGE PARA SELECCIÓN AUTOMÁTICA DE TIPO ==========
     @api.onchange('partner_id')
     def _onchange_partner_id_tipo_ecf(self):
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+
+from odoo import api, fields, models, _
+
+from ..tools.resilience import CircuitOpenError
+
+_logger = logging.getLogger(__name__)
+
+
+class DgiiCircuitBreaker(models.Model):
+    """
+    Circuit breaker compartido por todos los workers, un registro por endpoint.
+
+    - closed: las peticiones pasan; los fallos consecutivos se cuentan.
+    - open: tras `dgii_ecf.breaker_failure_threshold` fallos las peticiones
+      fallan de inmediato durante `dgii_ecf.breaker_cooldown` segundos.
+    - half_open: un único worker obtiene la petición de prueba; si tiene
+      éxito el circuito se cierra, si falla vuelve a abrirse.
+
+    Los cambios de estado se escriben con un cursor propio para que se
+    conserven aunque la transacción del usuario haga rollback y para no
+    mantener bloqueada la fila durante transacciones largas.
+    """
+    _name = 'dgii.circuit.breaker'
+    _description = 'Circuit Breaker Microservicio DGII'
+    _order = 'endpoint'
+    _rec_name = 'endpoint'
+
+    endpoint = fields.Char(
+        string='Endpoint',
+        required=True,
+        readonly=True,
+    )
+
+    state = fields.Selection(
+        selection=[
+            ('closed', 'Cerrado'),
+            ('open', 'Abierto'),
+            ('half_open', 'Semiabierto'),
+        ],
+        string='Estado',
+        default='closed',
+        required=True,
+        readonly=True,
+    )
+
+    failure_count = fields.Integer(
+        string='Fallos Consecutivos',
+        readonly=True,
+    )
+
+    opened_at = fields.Datetime(
+        string='Abierto Desde',
+        readonly=True,
+    )
+
+    open_until = fields.Datetime(
+        string='Próximo Intento',
+        readonly=True,
+        help='Momento a partir del cual se permite una petición de prueba'
+    )
+
+    last_failure_at = fields.Datetime(
+        string='Último Fallo',
+        readonly=True,
+    )
+
+    last_error = fields.Text(
+        string='Último Error',
+        readonly=True,
+    )
+
+    # Cache por proceso de endpoints sanos: {(dbname, endpoint): expira_monotonic}
+    _healthy_cache = {}
+    HEALTHY_CACHE_TTL = 2.0
+
+    def init(self):
+        """Un registro por endpoint (requerido por el UPSERT de _record_failure)."""
+        self.env.cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS dgii_circuit_breaker_endpoint_uniq
+                ON dgii_circuit_breaker (endpoint)
+        """)
+
+    # ========== CONFIGURACIÓN ==========
+    @api.model
+    def _get_breaker_settings(self):
+        icp = self.env['ir.config_parameter'].sudo()
+        return {
+            'threshold': max(int(icp.get_param('dgii_ecf.breaker_failure_threshold', 5)), 1),
+            'cooldown': max(int(icp.get_param('dgii_ecf.breaker_cooldown', 60)), 1),
+        }
+
+    def _cache_key(self, endpoint):
+        return (self.env.cr.dbname, endpoint)
+
+    # ========== API USADA POR dgii.http.client ==========
+    @api.model
+    def _before_request(self, endpoint):
+        """
+        Verifica si se permite una petición al endpoint.
+
+        Raises:
+            CircuitOpenError: si el circuito está abierto
+        """
+        key = self._cache_key(endpoint)
+        if self._healthy_cache.get(key, 0) > time.monotonic():
+            return True
+
+        self.env.cr.execute(
+            "SELECT state, failure_count FROM dgii_circuit_breaker WHERE endpoint = %s", (endpoint,))
+        row = self.env.cr.fetchone()
+        if not row or row[0] == 'closed':
+            if not row or not row[1]:
+                self._healthy_cache[key] = time.monotonic() + self.HEALTHY_CACHE_TTL
+            return True
+
+        # Abierto o semiabierto: solo un worker obtiene la petición de prueba
+        cooldown = self._get_breaker_settings()['cooldown']
+        with self.env.registry.cursor() as cr:
+            cr.execute("""
+                UPDATE dgii_circuit_breaker
+                   SET state = 'half_open',
+                       open_until = (now() AT TIME ZONE 'UTC') + make_interval(secs => %s),
+                       write_date = (now() AT TIME ZONE 'UTC')
+                 WHERE endpoint = %s
+                   AND state IN ('open', 'half_open')
+                   AND open_until <= (now() AT TIME ZONE 'UTC')
+             RETURNING id
+            """, (cooldown, endpoint))
+            trial = cr.fetchone()
+        if trial:
+            _logger.info('Circuit breaker %s: petición de prueba (semiabierto)', endpoint)
+            return True
+        raise CircuitOpenError(
+            _('El servicio DGII (%s) no está disponible temporalmente; se reintentará más tarde.') % endpoint)
+
+    @api.model
+    def _record_success(self, endpoint):
+        """Cierra el circuito y reinicia el contador de fallos."""
+        key = self._cache_key(endpoint)
+        if self._healthy_cache.get(key, 0) > time.monotonic():
+            return
+        with self.env.registry.cursor() as cr:
+            cr.execute("""
+                UPDATE dgii_circuit_breaker
+                   SET state = 'closed', failure_count = 0, opened_at = NULL, open_until = NULL,
+                       write_date = (now() AT TIME ZONE 'UTC')
+                 WHERE endpoint = %s
+                   AND (state != 'closed' OR failure_count > 0)
+             RETURNING id
+            """, (endpoint,))
+            if cr.fetchone():
+                _logger.info('Circuit breaker %s: cerrado', endpoint)
+        self._healthy_cache[key] = time.monotonic() + self.HEALTHY_CACHE_TTL
+
+    @api.model
+    def _record_failure(self, endpoint, error):
+        """Cuenta un fallo y abre el circuito al alcanzar el umbral."""
+        self._healthy_cache.pop(self._cache_key(endpoint), None)
+        settings = self._get_breaker_settings()
+        with self.env.registry.cursor() as cr:
+            cr.execute("""
+                INSERT INTO dgii_circuit_breaker AS b
+                       (endpoint, state, failure_count, last_failure_at, last_error,
+                        create_uid, create_date, write_uid, write_date)
+                VALUES (%(endpoint)s, 'closed', 1, (now() AT TIME ZONE 'UTC'), %(error)s,
+                        %(uid)s, (now() AT TIME ZONE 'UTC'), %(uid)s, (now() AT TIME ZONE 'UTC'))
+                ON CONFLICT (endpoint) DO UPDATE
+                   SET failure_count = b.failure_count + 1,
+                       last_failure_at = EXCLUDED.last_failure_at,
+                       last_error = EXCLUDED.last_error,
+                       write_date = EXCLUDED.write_date
+             RETURNING id, state, failure_count
+            """, {'endpoint': endpoint, 'error': str(error)[:2000], 'uid': self.env.uid})
+            breaker_id, state, failures = cr.fetchone()
+            if state == 'half_open' or (state == 'closed' and failures >= settings['threshold']):
+                cr.execute("""
+                    UPDATE dgii_circuit_breaker
+                       SET state = 'open',
+                           opened_at = (now() AT TIME ZONE 'UTC'),
+                           open_until = (now() AT TIME ZONE 'UTC') + make_interval(secs => %s)
+                     WHERE id = %s
+                """, (settings['cooldown'], breaker_id))
+                _logger.warning('Circuit breaker %s: abierto tras %s fallos (%s)', endpoint, failures, error)
+
+    @api.model
+    def _is_open(self, endpoint):
+        """
+        Indica si el circuito del endpoint está abierto y en enfriamiento (sin
+        consumir la petición de prueba). Semiabierto o con el enfriamiento
+        vencido no cuenta como abierto: la siguiente petición es la de prueba.
+        """
+        self.env.cr.execute("""
+            SELECT 1 FROM dgii_circuit_breaker
+             WHERE endpoint = %s
+               AND state = 'open'
+               AND open_until > (now() AT TIME ZONE 'UTC')
+        """, (endpoint,))
+        return bool(self.env.cr.fetchone())
+
+    @api.model
+    def _get_state(self, endpoint):
+        """Estado actual del circuito del endpoint ('closed' si no hay registro)."""
+        self.env.cr.execute(
+            "SELECT state FROM dgii_circuit_breaker WHERE endpoint = %s", (endpoint,))
+        row = self.env.cr.fetchone()
+        return row[0] if row else 'closed'
+
+    # ========== ACCIONES ==========
+    def action_reset(self):
+        """Cierra manualmente el circuito."""
+        self.write({
+            'state': 'closed',
+            'failure_count': 0,
+            'opened_at': False,
+            'open_until': False,
+        })
+        self._healthy_cache.clear()
+        return True
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+
+import requests
+
+from odoo import api, models
+
+from ..tools import http_session, metrics, resilience
+
+_logger = logging.getLogger(__name__)
+
+
+class DgiiHttpClient(models.AbstractModel):
+    """
+    Punto único de salida HTTP hacia el microservicio DGII y las APIs de RNC.
+    Usa sesiones keep-alive compartidas por proceso, timeouts por endpoint,
+    un circuit breaker compartido (dgii.circuit.breaker) y un limitador de
+    tasa adaptativo por endpoint y proceso.
+    """
+    _name = 'dgii.http.client'
+    _description = 'Cliente HTTP DGII'
+
+    # Timeouts por defecto (segundos) por endpoint lógico.
+    # Se pueden sobrescribir con el parámetro de sistema dgii_ecf.timeout_<endpoint>
+    DEFAULT_TIMEOUTS = {
+        'send': 20,
+        'status': 10,
+        'rnc': 10,
+        'directory': 15,
+        'registry': 300,
+    }
+
+    # Tasa máxima por defecto (peticiones/segundo por proceso) por endpoint.
+    # Se puede sobrescribir con dgii_ecf.rate_limit_<endpoint>
+    DEFAULT_RATE_LIMITS = {
+        'send': 10,
+        'status': 20,
+        'rnc': 5,
+        'directory': 5,
+        'registry': 1,
+    }
+
+    # Espera máxima (segundos) por capacidad del limitador antes de fallar.
+    # Se puede sobrescribir con dgii_ecf.rate_limit_max_wait_<endpoint>
+    RATE_LIMIT_MAX_WAIT = 2.0
+
+    # Fracción del timeout usada como latencia objetivo del limitador: por encima,
+    # el servicio se considera degradado. Se puede fijar en segundos con
+    # dgii_ecf.rate_latency_target_<endpoint>
+    LATENCY_TARGET_FRACTION = 0.25
+
+    @api.model
+    def _get_timeout(self, endpoint):
+        """Timeout configurado para un endpoint lógico."""
+        default = self.DEFAULT_TIMEOUTS.get(endpoint, 20)
+        value = self.env['ir.config_parameter'].sudo().get_param(f'dgii_ecf.timeout_{endpoint}')
+        try:
+            return float(value) if value else default
+        except ValueError:
+            _logger.warning('Timeout inválido para %s: %s, usando %s', endpoint, value, default)
+            return default
+
+    @api.model
+    def _get_pool_size(self):
+        """Cantidad máxima de conexiones abiertas por host y proceso."""
+        value = self.env['ir.config_parameter'].sudo().get_param(
+            'dgii_ecf.http_pool_size', http_session.DEFAULT_POOL_SIZE)
+        try:
+            return int(value)
+        except ValueError:
+            return http_session.DEFAULT_POOL_SIZE
+
+    @api.model
+    def _get_rate_limit(self, endpoint):
+        """Tasa máxima configurada para un endpoint lógico."""
+        default = self.DEFAULT_RATE_LIMITS.get(endpoint, 10)
+        value = self.env['ir.config_parameter'].sudo().get_param(f'dgii_ecf.rate_limit_{endpoint}')
+        try:
+            return float(value) if value else default
+        except ValueError:
+            return default
+
+    @api.model
+    def _get_endpoint_float(self, name, endpoint, default):
+        """Valor numérico del parámetro dgii_ecf.<name>_<endpoint>, o `default`."""
+        value = self.env['ir.config_parameter'].sudo().get_param(f'dgii_ecf.{name}_{endpoint}')
+        try:
+            return max(float(value), 0.0) if value else default
+        except ValueError:
+            _logger.warning('Valor inválido para dgii_ecf.%s_%s: %s, usando %s', name, endpoint, value, default)
+            return default
+
+    @api.model
+    def _get_latency_target(self, endpoint, timeout):
+        """Latencia (segundos) a partir de la cual el limitador reduce la tasa del endpoint."""
+        return self._get_endpoint_float(
+            'rate_latency_target', endpoint, timeout * self.LATENCY_TARGET_FRACTION) or timeout
+
+    @api.model
+    def _get_rate_limit_max_wait(self, endpoint):
+        """Espera máxima (segundos) por capacidad del limitador para un endpoint."""
+        return self._get_endpoint_float('rate_limit_max_wait', endpoint, self.RATE_LIMIT_MAX_WAIT)
+
+    @api.model
+    def _is_failure_response(self, response):
+        """Respuestas que indican degradación del servicio (no errores de negocio)."""
+        return response.status_code >= 500 or response.status_code == 429
+
+    @api.model
+    def _request(self, endpoint, method, url, **kwargs):
+        """
+        Realiza una petición HTTP reutilizando la conexión del host.
+
+        Args:
+            endpoint (str): endpoint lógico ('send', 'status', 'rnc', 'directory')
+            method (str): método HTTP
+            url (str): URL completa
+            **kwargs: argumentos de requests (json, params, headers, timeout...)
+
+        Returns:
+            requests.Response
+
+        Raises:
+            requests.RequestException: errores de red/timeout, circuito abierto
+                (CircuitOpenError) o límite de tasa alcanzado (RateLimitedError)
+        """
+        timeout = kwargs.setdefault('timeout', self._get_timeout(endpoint))
+        breaker = self.env['dgii.circuit.breaker'].sudo()
+        breaker._before_request(endpoint)
+
+        limiter = resilience.get_limiter(
+            (self.env.cr.dbname, endpoint), self._get_rate_limit(endpoint),
+            self._get_latency_target(endpoint, timeout))
+        if not limiter.acquire(max_wait=self._get_rate_limit_max_wait(endpoint)):
+            raise resilience.RateLimitedError(
+                'Límite de peticiones alcanzado para %s (%.2f/s)' % (endpoint, limiter.rate))
+
+        metrics_key = (self.env.company.id, self.env.context.get('dgii_tipo_ecf') or '-', endpoint, 'http')
+        start = time.monotonic()
+        try:
+            response = http_session.request(method, url, pool_size=self._get_pool_size(), **kwargs)
+        except requests.RequestException as exc:
+            elapsed = time.monotonic() - start
+            metrics.observe(self.env.cr.dbname, metrics_key, elapsed * 1000)
+            # Una URL o petición mal formada es un error local, no una degradación del servicio
+            if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+                limiter.record(elapsed, ok=False)
+                breaker._record_failure(endpoint, exc)
+            raise
+
+        elapsed = time.monotonic() - start
+        metrics.observe(self.env.cr.dbname, metrics_key, elapsed * 1000)
+        failed = self._is_failure_response(response)
+        limiter.record(elapsed, ok=not failed)
+        if failed:
+            breaker._record_failure(endpoint, f'HTTP {response.status_code}')
+        else:
+            breaker._record_success(endpoint)
+        self.env['dgii.latency.histogram'].sudo()._flush_if_due()
+        return response
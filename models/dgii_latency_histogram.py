@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from odoo import api, fields, models
+
+from ..tools import metrics
+
+_logger = logging.getLogger(__name__)
+
+
+class DgiiLatencyHistogram(models.Model):
+    """
+    Histogramas de latencia por etapa del envío de e-CF, agregados por hora,
+    compañía, tipo de e-CF y endpoint.
+
+    Las mediciones se acumulan en memoria por proceso (tools/metrics.py) y se
+    vuelcan cada `dgii_ecf.metrics_flush_interval` segundos con un UPSERT por
+    serie, por lo que el costo por envío es despreciable.
+    """
+    _name = 'dgii.latency.histogram'
+    _description = 'Histograma de Latencia DGII'
+    _order = 'period desc, endpoint, stage'
+
+    # ========== DIMENSIONES ==========
+    period = fields.Datetime(
+        string='Hora',
+        required=True,
+        readonly=True,
+        index=True,
+        help='Inicio de la hora agregada (UTC)',
+    )
+
+    company_id = fields.Many2one(
+        'res.company',
+        string='Compañía',
+        required=True,
+        readonly=True,
+        ondelete='cascade',
+    )
+
+    tipo_ecf = fields.Char(
+        string='Tipo e-CF',
+        required=True,
+        readonly=True,
+        default='-',
+    )
+
+    endpoint = fields.Char(
+        string='Endpoint',
+        required=True,
+        readonly=True,
+    )
+
+    stage = fields.Selection(
+        selection=[
+            ('validate', 'Validación'),
+            ('build', 'Construcción JSON'),
+            ('http', 'HTTP'),
+            ('remote', 'Procesamiento Microservicio'),
+            ('log', 'Escritura de Logs'),
+            ('total', 'Total'),
+        ],
+        string='Etapa',
+        required=True,
+        readonly=True,
+    )
+
+    # ========== AGREGADOS ==========
+    count = fields.Integer(string='Mediciones', readonly=True)
+    sum_ms = fields.Float(string='Suma (ms)', readonly=True)
+    max_ms = fields.Float(string='Máximo (ms)', readonly=True, aggregator='max')
+    avg_ms = fields.Float(string='Promedio (ms)', compute='_compute_stats')
+    p95_ms = fields.Float(string='p95 (ms)', compute='_compute_stats',
+                          help='Estimado a partir de los buckets (límite superior del bucket)')
+
+    # ========== BUCKETS (ms, no acumulados) ==========
+    bucket_le_10 = fields.Integer(string='≤ 10 ms', readonly=True)
+    bucket_le_25 = fields.Integer(string='≤ 25 ms', readonly=True)
+    bucket_le_50 = fields.Integer(string='≤ 50 ms', readonly=True)
+    bucket_le_100 = fields.Integer(string='≤ 100 ms', readonly=True)
+    bucket_le_250 = fields.Integer(string='≤ 250 ms', readonly=True)
+    bucket_le_500 = fields.Integer(string='≤ 500 ms', readonly=True)
+    bucket_le_1000 = fields.Integer(string='≤ 1 s', readonly=True)
+    bucket_le_2500 = fields.Integer(string='≤ 2.5 s', readonly=True)
+    bucket_le_5000 = fields.Integer(string='≤ 5 s', readonly=True)
+    bucket_le_10000 = fields.Integer(string='≤ 10 s', readonly=True)
+    bucket_le_20000 = fields.Integer(string='≤ 20 s', readonly=True)
+    bucket_inf = fields.Integer(string='> 20 s', readonly=True)
+
+    def init(self):
+        """Una fila por serie y hora (requerido por el UPSERT de _flush_metrics)."""
+        self.env.cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS dgii_latency_histogram_series_uniq
+                ON dgii_latency_histogram (period, company_id, tipo_ecf, endpoint, stage)
+        """)
+
+    @api.depends('count', 'sum_ms', *metrics.BUCKET_FIELDS)
+    def _compute_stats(self):
+        for record in self:
+            record.avg_ms = record.sum_ms / record.count if record.count else 0.0
+            record.p95_ms = record._estimate_percentile(0.95)
+
+    def _estimate_percentile(self, quantile):
+        """Límite superior del bucket que contiene el percentil indicado."""
+        self.ensure_one()
+        if not self.count:
+            return 0.0
+        target = quantile * self.count
+        cumulative = 0
+        for bound, field_name in zip(metrics.BUCKET_BOUNDS_MS, metrics.BUCKET_FIELDS):
+            cumulative += self[field_name]
+            if cumulative >= target:
+                return float(bound)
+        return self.max_ms
+
+    # ========== VOLCADO ==========
+    @api.model
+    def _flush_metrics(self):
+        """Vuelca las series acumuladas en este proceso. Retorna la cantidad de series."""
+        dbname = self.env.cr.dbname
+        series = metrics.drain(dbname)
+        if not series:
+            return 0
+
+        bucket_columns = ', '.join(metrics.BUCKET_FIELDS)
+        bucket_updates = ', '.join(f'{name} = h.{name} + EXCLUDED.{name}' for name in metrics.BUCKET_FIELDS)
+        query = f"""
+            INSERT INTO dgii_latency_histogram AS h
+                   (period, company_id, tipo_ecf, endpoint, stage, count, sum_ms, max_ms, {bucket_columns},
+                    create_uid, create_date, write_uid, write_date)
+            VALUES (date_trunc('hour', now() AT TIME ZONE 'UTC'), %s, %s, %s, %s, %s, %s, %s,
+                    {', '.join(['%s'] * len(metrics.BUCKET_FIELDS))},
+                    %s, (now() AT TIME ZONE 'UTC'), %s, (now() AT TIME ZONE 'UTC'))
+            ON CONFLICT (period, company_id, tipo_ecf, endpoint, stage) DO UPDATE
+               SET count = h.count + EXCLUDED.count,
+                   sum_ms = h.sum_ms + EXCLUDED.sum_ms,
+                   max_ms = GREATEST(h.max_ms, EXCLUDED.max_ms),
+                   {bucket_updates},
+                   write_date = EXCLUDED.write_date
+        """
+        uid = self.env.uid
+        params = [
+            (company_id, tipo_ecf or '-', endpoint, stage,
+             data['count'], data['sum_ms'], data['max_ms'], *data['buckets'], uid, uid)
+            for (company_id, tipo_ecf, endpoint, stage), data in series.items()
+        ]
+        try:
+            self.env.cr.executemany(query, params)
+        except Exception:
+            metrics.restore(dbname, series)
+            raise
+        return len(params)
+
+    @api.model
+    def _flush_if_due(self):
+        """Vuelca con un cursor propio si pasó el intervalo configurado desde el último volcado."""
+        dbname = self.env.cr.dbname
+        interval = int(self.env['ir.config_parameter'].sudo().get_param('dgii_ecf.metrics_flush_interval', 60))
+        if not metrics.flush_due(dbname, interval):
+            return
+        try:
+            with self.env.registry.cursor() as cr:
+                self.with_env(self.env(cr=cr))._flush_metrics()
+        except Exception as exc:  # noqa: BLE001
+            _logger.warning('No se pudieron volcar métricas de latencia DGII: %s', exc)
+
+    @api.model
+    def _purge_old(self):
+        """
+        Elimina las horas más antiguas que `dgii_ecf.latency_retention_days`
+        (90 por defecto; 0 conserva todo). Retorna las filas eliminadas.
+        """
+        days = int(self.env['ir.config_parameter'].sudo().get_param('dgii_ecf.latency_retention_days', 90))
+        if days <= 0:
+            return 0
+        self.env.cr.execute("""
+            DELETE FROM dgii_latency_histogram
+             WHERE period < date_trunc('hour', now() AT TIME ZONE 'UTC') - make_interval(days => %s)
+        """, (days,))
+        return self.env.cr.rowcount
+
+    @api.model
+    def _cron_flush_metrics(self):
+        """Cron: vuelca las métricas del proceso de crons y elimina las horas vencidas."""
+        flushed = self._flush_metrics()
+        purged = self._purge_old()
+        if purged:
+            _logger.info('Latencias DGII: %s filas anteriores a la retención eliminadas', purged)
+        return flushed
+
+    # ========== EXPORTACIÓN ==========
+    @api.model
+    def _prometheus_text(self):
+        """
+        Exporta los histogramas en formato de texto de Prometheus.
+        Los buckets se acumulan sobre todas las horas guardadas (contadores monótonos);
+        la purga por retención se ve en Prometheus como un reinicio del contador.
+        """
+        bucket_sums = ', '.join(f'SUM({name})' for name in metrics.BUCKET_FIELDS)
+        self.env.cr.execute(f"""
+            SELECT c.name, h.tipo_ecf, h.endpoint, h.stage, SUM(h.count), SUM(h.sum_ms), {bucket_sums}
+              FROM dgii_latency_histogram h
+              JOIN res_company c ON c.id = h.company_id
+          GROUP BY c.name, h.tipo_ecf, h.endpoint, h.stage
+          ORDER BY c.name, h.tipo_ecf, h.endpoint, h.stage
+        """)
+        lines = [
+            '# HELP dgii_ecf_stage_duration_ms Duración por etapa del envío de e-CF (ms)',
+            '# TYPE dgii_ecf_stage_duration_ms histogram',
+        ]
+        for row in self.env.cr.fetchall():
+            company, tipo_ecf, endpoint, stage, count, sum_ms = row[:6]
+            company = (company or '').replace('\\', '\\\\').replace('"', '\\"')
+            labels = f'company="{company}",tipo="{tipo_ecf}",endpoint="{endpoint}",stage="{stage}"'
+            cumulative = 0
+            for bound, value in zip(metrics.BUCKET_BOUNDS_MS + ('+Inf',), row[6:]):
+                cumulative += value or 0
+                lines.append(f'dgii_ecf_stage_duration_ms_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'dgii_ecf_stage_duration_ms_sum{{{labels}}} {sum_ms or 0:.3f}')
+            lines.append(f'dgii_ecf_stage_duration_ms_count{{{labels}}} {count or 0}')
+        return '\n'.join(lines) + '\n'
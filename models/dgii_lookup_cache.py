@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+from functools import partial
+
+from odoo import api, fields, models
+
+from ..tools import lookup_cache
+
+_logger = logging.getLogger(__name__)
+
+
+class DgiiLookupCache(models.Model):
+    """
+    Caché compartida de consultas remotas de RNC y del directorio de
+    facturadores electrónicos.
+
+    Dos niveles: un LRU en memoria por proceso (tools/lookup_cache.py) y esta
+    tabla, compartida por todos los workers. La clave es (tipo, RNC
+    normalizado, ambiente); los resultados negativos (no registrado / 404)
+    se guardan con un TTL propio, más corto.
+
+    El LRU solo se llena después del commit (``cr.postcommit``): una entrada
+    escrita o leída en una transacción que termina en rollback no queda en
+    memoria sin su fila.
+    """
+    _name = 'dgii.lookup.cache'
+    _description = 'Caché de Consultas DGII'
+    _order = 'fetched_at desc'
+    _log_access = False
+
+    kind = fields.Selection(
+        selection=[
+            ('rnc', 'Consulta RNC'),
+            ('directory', 'Directorio e-CF'),
+        ],
+        string='Tipo',
+        required=True,
+        readonly=True,
+    )
+    key = fields.Char(string='RNC/Cédula', required=True, readonly=True)
+    environment = fields.Char(string='Ambiente', required=True, readonly=True, default='-')
+    found = fields.Boolean(string='Encontrado', readonly=True)
+    payload = fields.Text(string='Respuesta', readonly=True)
+    fetched_at = fields.Datetime(string='Consultado', readonly=True)
+    expires_at = fields.Datetime(string='Expira', readonly=True, index=True)
+
+    def init(self):
+        """Una entrada por clave (requerido por el UPSERT de _put)."""
+        self.env.cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS dgii_lookup_cache_key_uniq
+                ON dgii_lookup_cache (kind, key, environment)
+        """)
+
+    @api.model
+    def _get_ttls(self):
+        """TTL (segundos) de resultados positivos y negativos."""
+        icp = self.env['ir.config_parameter'].sudo()
+        return (
+            int(icp.get_param('dgii_ecf.lookup_cache_ttl', 86400)),
+            int(icp.get_param('dgii_ecf.lookup_cache_negative_ttl', 3600)),
+        )
+
+    @api.model
+    def _get(self, kind, key, environment='-'):
+        """
+        Busca una consulta vigente en caché.
+
+        Returns:
+            tuple: (hit, payload). payload es None para un resultado negativo.
+        """
+        dbname = self.env.cr.dbname
+        cache_key = (kind, key, environment)
+        value = lookup_cache.get(dbname, cache_key)
+        if value is not None:
+            return True, None if value is lookup_cache.NEGATIVE else value
+
+        self.env.cr.execute("""
+            SELECT found, payload,
+                   EXTRACT(EPOCH FROM expires_at - (now() AT TIME ZONE 'UTC'))
+              FROM dgii_lookup_cache
+             WHERE kind = %s AND key = %s AND environment = %s
+               AND expires_at > (now() AT TIME ZONE 'UTC')
+        """, cache_key)
+        row = self.env.cr.fetchone()
+        if not row:
+            return False, None
+        found, payload, remaining = row
+        value = json.loads(payload) if found and payload else None
+        self._put_local(cache_key, value, float(remaining))
+        return True, value
+
+    @api.model
+    def _put(self, kind, key, payload, environment='-'):
+        """Guarda una consulta; `payload` None registra un resultado negativo."""
+        positive_ttl, negative_ttl = self._get_ttls()
+        ttl = negative_ttl if payload is None else positive_ttl
+        if ttl <= 0:
+            return
+        cache_key = (kind, key, environment)
+        self.env.cr.execute("""
+            INSERT INTO dgii_lookup_cache AS c (kind, key, environment, found, payload, fetched_at, expires_at)
+            VALUES (%s, %s, %s, %s, %s, (now() AT TIME ZONE 'UTC'),
+                    (now() AT TIME ZONE 'UTC') + make_interval(secs => %s))
+            ON CONFLICT (kind, key, environment) DO UPDATE
+               SET found = EXCLUDED.found,
+                   payload = EXCLUDED.payload,
+                   fetched_at = EXCLUDED.fetched_at,
+                   expires_at = EXCLUDED.expires_at
+        """, (*cache_key, payload is not None,
+              json.dumps(payload, ensure_ascii=False) if payload is not None else None, ttl))
+        self._put_local(cache_key, payload, ttl)
+
+    @api.model
+    def _put_local(self, cache_key, payload, ttl):
+        """Guarda la entrada en el LRU del proceso cuando la transacción confirma."""
+        self.env.cr.postcommit.add(partial(
+            lookup_cache.put, self.env.cr.dbname, cache_key,
+            lookup_cache.NEGATIVE if payload is None else payload, ttl,
+        ))
+
+    @api.model
+    def _invalidate(self, keys=None, kind=None):
+        """
+        Elimina entradas de ambos niveles.
+
+        Args:
+            keys (list): RNC normalizados; None invalida todos
+            kind (str): limitar a un tipo ('rnc', 'directory')
+        """
+        where, params = [], []
+        if keys is not None:
+            if not keys:
+                return
+            where.append('key = ANY(%s)')
+            params.append(list(keys))
+        if kind:
+            where.append('kind = %s')
+            params.append(kind)
+        self.env.cr.execute(
+            'DELETE FROM dgii_lookup_cache' + (' WHERE ' + ' AND '.join(where) if where else ''), params)
+        self.invalidate_model()
+
+        key_set = set(keys) if keys is not None else None
+
+        def _matches(cache_key):
+            return (kind is None or cache_key[0] == kind) and (key_set is None or cache_key[1] in key_set)
+
+        # Ya, y de nuevo tras el commit para descartar lo encolado antes en la transacción
+        lookup_cache.invalidate(self.env.cr.dbname, _matches)
+        self.env.cr.postcommit.add(partial(lookup_cache.invalidate, self.env.cr.dbname, _matches))
+
+    def action_invalidate(self):
+        """Botón: elimina las entradas seleccionadas."""
+        for kind in set(self.mapped('kind')):
+            self._invalidate(self.filtered(lambda c: c.kind == kind).mapped('key'), kind=kind)
+
+    @api.model
+    def _cron_purge_expired(self):
+        """Cron: elimina las entradas expiradas."""
+        self.env.cr.execute("DELETE FROM dgii_lookup_cache WHERE expires_at <= (now() AT TIME ZONE 'UTC')")
+        _logger.info('Caché de consultas DGII: %s entradas expiradas eliminadas', self.env.cr.rowcount)
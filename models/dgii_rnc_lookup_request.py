@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+
+from odoo import api, fields, models, _
+
+from .res_partner import RncNotRegisteredError
+
+_logger = logging.getLogger(__name__)
+
+
+class DgiiRncLookupRequest(models.Model):
+    """
+    Consultas de RNC pendientes pedidas desde los onchange de contactos.
+
+    El onchange solo responde desde el padrón local o la caché. Si el RNC no
+    está, registra aquí la consulta y la ejecuta un cron. Hay una sola
+    consulta pendiente por RNC aunque la pidan varios usuarios, y cada
+    usuario que la pidió recibe el resultado por notificación del bus.
+    """
+    _name = 'dgii.rnc.lookup.request'
+    _description = 'Consulta de RNC en Segundo Plano'
+    _order = 'id desc'
+    _rec_name = 'rnc'
+
+    rnc = fields.Char(string='RNC/Cédula', required=True, readonly=True)
+
+    state = fields.Selection(
+        selection=[
+            ('pending', 'Pendiente'),
+            ('done', 'Encontrado'),
+            ('not_found', 'No Inscrito'),
+            ('error', 'Error'),
+        ],
+        string='Estado',
+        default='pending',
+        required=True,
+        readonly=True,
+        index=True,
+    )
+
+    user_ids = fields.Many2many(
+        'res.users',
+        'dgii_rnc_lookup_request_user_rel',
+        'request_id',
+        'user_id',
+        string='Solicitado por',
+        readonly=True,
+    )
+
+    result_name = fields.Char(string='Razón Social', readonly=True)
+    error = fields.Text(string='Error', readonly=True)
+    date_done = fields.Datetime(string='Fecha Consulta', readonly=True)
+
+    # Consultas terminadas que se conservan (días)
+    RETENTION_DAYS = 1
+
+    def init(self):
+        """Una sola consulta pendiente por RNC (deduplicación entre usuarios)."""
+        self.env.cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS dgii_rnc_lookup_request_pending_uniq
+                ON dgii_rnc_lookup_request (rnc)
+             WHERE state = 'pending'
+        """)
+
+    @api.model
+    def _request(self, rnc):
+        """
+        Registra (o se suma a) la consulta pendiente del RNC para el usuario
+        actual, con un cursor propio para que sobreviva al onchange.
+        """
+        uid = self.env.uid
+        with self.env.registry.cursor() as cr:
+            cr.execute("""
+                INSERT INTO dgii_rnc_lookup_request
+                       (rnc, state, create_uid, create_date, write_uid, write_date)
+                VALUES (%s, 'pending', %s, (now() AT TIME ZONE 'UTC'), %s, (now() AT TIME ZONE 'UTC'))
+                ON CONFLICT (rnc) WHERE state = 'pending'
+                DO UPDATE SET write_date = EXCLUDED.write_date
+             RETURNING id
+            """, (rnc, uid, uid))
+            request_id = cr.fetchone()[0]
+            cr.execute("""
+                INSERT INTO dgii_rnc_lookup_request_user_rel (request_id, user_id)
+                VALUES (%s, %s)
+                ON CONFLICT DO NOTHING
+            """, (request_id, uid))
+            env = self.env(cr=cr)
+            env.ref('odoo_dgii_ecf.ir_cron_process_dgii_rnc_lookup')._trigger()
+
+    def _notify_users(self):
+        """Notifica el resultado a los usuarios que pidieron la consulta."""
+        for request in self:
+            if request.state == 'done':
+                params = {
+                    'title': _('RNC %s encontrado') % request.rnc,
+                    'message': _('%s. Los datos se completarán al guardar el contacto.') % request.result_name,
+                    'type': 'success',
+                }
+            elif request.state == 'not_found':
+                params = {
+                    'title': _('RNC %s no inscrito') % request.rnc,
+                    'message': _('El RNC/Cédula no está inscrito como contribuyente en DGII.'),
+                    'type': 'warning',
+                }
+            else:
+                params = {
+                    'title': _('RNC %s no consultado') % request.rnc,
+                    'message': _('No se pudo consultar DGII: %s') % request.error,
+                    'type': 'danger',
+                }
+            for user in request.user_ids:
+                user._bus_send('simple_notification', params)
+
+    def _execute(self):
+        """Consulta el RNC (padrón, caché o API remota) y guarda el resultado."""
+        self.ensure_one()
+        partner_model = self.env['res.partner']
+        vals = {'date_done': fields.Datetime.now()}
+        try:
+            data = partner_model._call_rnc_api(self.rnc)
+            vals.update(state='done', result_name=data.get('nombre_razon_social') or self.rnc)
+        except RncNotRegisteredError:
+            vals['state'] = 'not_found'
+        except Exception as exc:  # noqa: BLE001
+            vals.update(state='error', error=str(exc))
+        self.write(vals)
+        self._notify_users()
+
+    @api.model
+    def _cron_process_requests(self, time_budget=None):
+        """
+        Cron: ejecuta las consultas pendientes (commit por consulta) hasta
+        agotar `dgii_ecf.cron_time_budget` segundos; si quedan se reprograma.
+        """
+        self.env.cr.execute("""
+            DELETE FROM dgii_rnc_lookup_request
+             WHERE state != 'pending'
+               AND date_done < (now() AT TIME ZONE 'UTC') - make_interval(days => %s)
+        """, (self.RETENTION_DAYS,))
+        self.env.cr.commit()
+
+        if time_budget is None:
+            time_budget = self.env['dgii.send.queue']._get_cron_time_budget()
+        deadline = time.monotonic() + time_budget
+        while True:
+            if time.monotonic() >= deadline:
+                self.env.ref('odoo_dgii_ecf.ir_cron_process_dgii_rnc_lookup')._trigger()
+                break
+            self.env.cr.execute("""
+                SELECT id FROM dgii_rnc_lookup_request
+                 WHERE state = 'pending'
+              ORDER BY id
+                 LIMIT 1
+                   FOR UPDATE SKIP LOCKED
+            """)
+            row = self.env.cr.fetchone()
+            if not row:
+                break
+            request = self.browse(row[0])
+            try:
+                request._execute()
+                self.env.cr.commit()
+            except Exception as exc:  # noqa: BLE001
+                self.env.cr.rollback()
+                _logger.warning('Consulta de RNC %s en segundo plano falló: %s', row[0], exc)
+                request.write({'state': 'error', 'error': str(exc), 'date_done': fields.Datetime.now()})
+                self.env.cr.commit()
@@ -0,0 +1,335 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import io
+import logging
+import tempfile
+import zipfile
+
+from odoo import _, api, fields, models
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+# Archivo público de contribuyentes de DGII (ZIP con TXT delimitado por '|', latin-1)
+DEFAULT_REGISTRY_URL = 'https://dgii.gov.do/app/WebApps/Consultas/RNC/DGII_RNC.zip'
+
+# Columnas cargadas con COPY, en el orden del archivo normalizado
+REGISTRY_COLUMNS = ('rnc', 'name', 'trade_name', 'activity', 'registration_date', 'estado', 'regimen_pagos')
+
+# Columnas de la tabla temporal: las del archivo más el hash de la fila
+STAGING_COLUMNS = REGISTRY_COLUMNS + ('row_hash',)
+
+
+class DgiiRncRegistry(models.Model):
+    """
+    Padrón local de contribuyentes importado del archivo masivo de DGII.
+
+    La importación no usa el ORM: el archivo se lee por streaming, se carga
+    con COPY en una tabla temporal y se compara por hash de fila contra el
+    padrón anterior; solo se aplican las altas, cambios y bajas. Las
+    consultas por RNC usan el índice único y no salen a internet; la API
+    remota de RNC queda solo como respaldo (ver ResPartner._call_rnc_api).
+    """
+    _name = 'dgii.rnc.registry'
+    _description = 'Padrón de Contribuyentes DGII'
+    _rec_name = 'rnc'
+    _order = 'rnc'
+    _log_access = False
+
+    rnc = fields.Char(string='RNC/Cédula', required=True, readonly=True)
+    name = fields.Char(string='Razón Social', readonly=True)
+    trade_name = fields.Char(string='Nombre Comercial', readonly=True)
+    activity = fields.Char(string='Actividad Económica', readonly=True)
+    registration_date = fields.Char(string='Fecha de Constitución', readonly=True)
+    estado = fields.Char(string='Estado', readonly=True, index=True)
+    regimen_pagos = fields.Char(string='Régimen de Pagos', readonly=True)
+    updated_at = fields.Datetime(string='Actualizado', readonly=True)
+    row_hash = fields.Char(string='Hash de Fila', readonly=True)
+    active = fields.Boolean(
+        string='Activo',
+        default=True,
+        readonly=True,
+        help='Desmarcado cuando el contribuyente deja de aparecer en el archivo de DGII',
+    )
+
+    # Filas por COPY: limita la memoria usada al leer el archivo completo
+    COPY_CHUNK_SIZE = 50000
+
+    # Fracción mínima del padrón activo que debe traer el archivo para aplicar bajas
+    # (protege contra archivos truncados o descargas incompletas)
+    MIN_SNAPSHOT_RATIO = 0.9
+
+    def init(self):
+        """Índice único por RNC: búsqueda puntual y clave del UPSERT de importación."""
+        self.env.cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS dgii_rnc_registry_rnc_uniq
+                ON dgii_rnc_registry (rnc)
+        """)
+
+    # ========== CONSULTA ==========
+    @api.model
+    def _format_rnc(self, rnc):
+        """Formato con guiones usado por DGII: 9 dígitos 3-5-1, cédula 3-7-1."""
+        if len(rnc) == 9:
+            return f'{rnc[:3]}-{rnc[3:8]}-{rnc[8:]}'
+        if len(rnc) == 11:
+            return f'{rnc[:3]}-{rnc[3:10]}-{rnc[10:]}'
+        return rnc
+
+    @api.model
+    def _lookup(self, rnc):
+        """
+        Consulta un RNC/cédula normalizado en el padrón local.
+
+        Returns:
+            dict: datos con la misma estructura que la API de RNC
+                (ver ResPartner._process_rnc_response), o None si no está o fue dado de baja
+        """
+        if not rnc:
+            return None
+        self.env.cr.execute("""
+            SELECT rnc, name, trade_name, activity, estado, regimen_pagos
+              FROM dgii_rnc_registry
+             WHERE rnc = %s AND active
+        """, (rnc,))
+        row = self.env.cr.fetchone()
+        if not row:
+            return None
+        rnc, name, trade_name, activity, estado, regimen_pagos = row
+        return {
+            'error': False,
+            'codigo_http': 200,
+            'mensaje': 'Consulta Exitosa (padrón local)',
+            'cedula_rnc': self._format_rnc(rnc),
+            'nombre_razon_social': name or '',
+            'nombre_comercial': trade_name or '',
+            'actividad_economica': activity or '',
+            'estado': estado or '',
+            'regimen_de_pagos': regimen_pagos or '',
+        }
+
+    @api.model
+    def _existing_rncs(self, rncs):
+        """RNC/cédulas de `rncs` presentes (activos) en el padrón local."""
+        if not rncs:
+            return set()
+        self.env.cr.execute("""
+            SELECT rnc FROM dgii_rnc_registry
+             WHERE rnc = ANY(%s) AND active
+        """, (list(rncs),))
+        return {row[0] for row in self.env.cr.fetchall()}
+
+    # ========== IMPORTACIÓN ==========
+    @api.model
+    def _parse_line(self, line):
+        """
+        Convierte una línea del archivo DGII en una tupla de REGISTRY_COLUMNS.
+        Formato: RNC|Razón Social|Nombre Comercial|Actividad|...|Fecha|Estado|Régimen
+        """
+        cols = [col.strip() for col in line.rstrip('\r\n').split('|')]
+        if len(cols) < 7:
+            return None
+        rnc = ''.join(ch for ch in cols[0] if ch.isdigit())
+        if not rnc:
+            return None
+        # Las columnas intermedias varían entre versiones del archivo: las tres últimas son fijas
+        return (rnc, cols[1], cols[2], cols[3], cols[-3], cols[-2].upper(), cols[-1])
+
+    @staticmethod
+    def _row_hash(row):
+        """Hash del contenido de una fila (sin el RNC) para detectar cambios."""
+        return hashlib.md5('\x1f'.join(row[1:]).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def _copy_escape(value):
+        """Escapa un valor para el formato de texto de COPY."""
+        if not value:
+            return '\\N'
+        return (value.replace('\\', '\\\\').replace('\t', '\\t')
+                .replace('\n', '\\n').replace('\r', '\\r'))
+
+    @api.model
+    def _open_registry_text(self, fileobj):
+        """Retorna el TXT del padrón como texto latin-1, extrayéndolo si viene en ZIP."""
+        fileobj.seek(0)
+        if zipfile.is_zipfile(fileobj):
+            fileobj.seek(0)
+            archive = zipfile.ZipFile(fileobj)
+            members = [name for name in archive.namelist() if name.lower().endswith('.txt')]
+            if not members:
+                raise UserError(_('El archivo ZIP no contiene el TXT del padrón de contribuyentes.'))
+            raw = archive.open(members[0])
+        else:
+            fileobj.seek(0)
+            raw = fileobj
+        return io.TextIOWrapper(raw, encoding='latin-1', newline='')
+
+    @api.model
+    def _copy_rows(self, table, rows, columns=STAGING_COLUMNS):
+        """Carga un bloque de filas en `table` con COPY FROM STDIN."""
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write('\t'.join(self._copy_escape(value) for value in row))
+            buffer.write('\n')
+        buffer.seek(0)
+        self.env.cr.copy_expert(
+            f"COPY {table} ({', '.join(columns)}) FROM STDIN", buffer)
+
+    @api.model
+    def _load_staging(self, fileobj):
+        """
+        Carga el archivo en la tabla temporal dgii_rnc_registry_load por bloques
+        de COPY_CHUNK_SIZE filas, con el hash de cada fila.
+
+        Returns:
+            int: filas leídas
+        """
+        cr = self.env.cr
+        cr.execute(f"""
+            CREATE TEMP TABLE IF NOT EXISTS dgii_rnc_registry_load (
+                {', '.join(f'{column} varchar' for column in STAGING_COLUMNS)}
+            ) ON COMMIT DROP
+        """)
+        cr.execute("TRUNCATE dgii_rnc_registry_load")
+
+        total = 0
+        rows = []
+        for line in self._open_registry_text(fileobj):
+            row = self._parse_line(line)
+            if row is None:
+                continue
+            rows.append(row + (self._row_hash(row),))
+            if len(rows) >= self.COPY_CHUNK_SIZE:
+                self._copy_rows('dgii_rnc_registry_load', rows)
+                total += len(rows)
+                rows = []
+        if rows:
+            self._copy_rows('dgii_rnc_registry_load', rows)
+            total += len(rows)
+
+        cr.execute("CREATE INDEX ON dgii_rnc_registry_load (rnc)")
+        cr.execute("ANALYZE dgii_rnc_registry_load")
+        return total
+
+    @api.model
+    def _import_file(self, fileobj):
+        """
+        Sincroniza el padrón con un archivo (ZIP o TXT) abierto en modo binario.
+
+        Compara el hash de cada fila con el del padrón anterior y aplica solo
+        la diferencia: altas, cambios (incluye reactivaciones) y bajas de los
+        RNC que ya no aparecen. Luego marca los contactos afectados.
+
+        Returns:
+            dict: read, inserted, updated, deactivated, partners_flagged
+        """
+        cr = self.env.cr
+        read = self._load_staging(fileobj)
+        data_columns = REGISTRY_COLUMNS[1:]
+
+        # Altas y cambios: el UPSERT solo toca filas nuevas, con hash distinto o dadas de baja
+        cr.execute(f"""
+            INSERT INTO dgii_rnc_registry ({', '.join(STAGING_COLUMNS)}, active, updated_at)
+            SELECT DISTINCT ON (rnc) {', '.join(STAGING_COLUMNS)}, true, (now() AT TIME ZONE 'UTC')
+              FROM dgii_rnc_registry_load
+          ORDER BY rnc
+            ON CONFLICT (rnc) DO UPDATE
+               SET {', '.join(f'{column} = EXCLUDED.{column}' for column in data_columns)},
+                   row_hash = EXCLUDED.row_hash,
+                   active = true,
+                   updated_at = EXCLUDED.updated_at
+             WHERE dgii_rnc_registry.row_hash IS DISTINCT FROM EXCLUDED.row_hash
+                OR NOT dgii_rnc_registry.active
+         RETURNING rnc, (xmax = 0) AS inserted
+        """)
+        changed = cr.fetchall()
+        inserted = sum(1 for _rnc, is_new in changed if is_new)
+        changed_rncs = [rnc for rnc, is_new in changed if not is_new]
+
+        # Bajas: activos que no vienen en el archivo, solo si el archivo está completo
+        cr.execute("SELECT count(*) FROM dgii_rnc_registry WHERE active")
+        active_count = cr.fetchone()[0]
+        deactivated = 0
+        if read >= self.MIN_SNAPSHOT_RATIO * active_count:
+            cr.execute("""
+                UPDATE dgii_rnc_registry r
+                   SET active = false,
+                       updated_at = (now() AT TIME ZONE 'UTC')
+                 WHERE r.active
+                   AND NOT EXISTS (SELECT 1 FROM dgii_rnc_registry_load l WHERE l.rnc = r.rnc)
+             RETURNING r.rnc
+            """)
+            deactivated_rncs = [row[0] for row in cr.fetchall()]
+            deactivated = len(deactivated_rncs)
+            changed_rncs += deactivated_rncs
+        else:
+            _logger.warning('Padrón RNC DGII: el archivo trae %s filas para %s activas; '
+                            'se omiten las bajas por posible archivo incompleto', read, active_count)
+
+        self.invalidate_model()
+        self.env['dgii.lookup.cache']._invalidate(changed_rncs, kind='rnc')
+        partners_flagged = self._flag_changed_partners(changed_rncs)
+        stats = {
+            'read': read,
+            'inserted': inserted,
+            'updated': len(changed_rncs) - deactivated,
+            'deactivated': deactivated,
+            'partners_flagged': partners_flagged,
+        }
+        _logger.info('Padrón RNC DGII sincronizado: %s', stats)
+        return stats
+
+    @api.model
+    def _flag_changed_partners(self, rncs):
+        """
+        Marca los contactos validados cuyo RNC cambió en el padrón y cuyo nombre
+        o estado DGII ya no coincide (o que fueron dados de baja).
+
+        Returns:
+            int: contactos marcados
+        """
+        if not rncs:
+            return 0
+        partner_model = self.env['res.partner']
+        partner_model.flush_model(['x_vat_digits', 'name', 'x_estado_dgii', 'x_rnc_validado', 'x_dgii_padron_cambiado'])
+        self.env.cr.execute("""
+            UPDATE res_partner p
+               SET x_dgii_padron_cambiado = true
+              FROM dgii_rnc_registry r
+             WHERE r.rnc = ANY(%s)
+               AND p.x_vat_digits = r.rnc
+               AND p.x_rnc_validado
+               AND NOT COALESCE(p.x_dgii_padron_cambiado, false)
+               AND (NOT r.active
+                    OR upper(COALESCE(p.x_estado_dgii, '')) IS DISTINCT FROM COALESCE(r.estado, '')
+                    OR COALESCE(p.name, '') IS DISTINCT FROM COALESCE(r.name, ''))
+        """, (rncs,))
+        flagged = self.env.cr.rowcount
+        partner_model.invalidate_model(['x_dgii_padron_cambiado'])
+        return flagged
+
+    @api.model
+    def _get_registry_url(self):
+        return self.env['ir.config_parameter'].sudo().get_param(
+            'dgii_ecf.rnc_registry_url') or DEFAULT_REGISTRY_URL
+
+    @api.model
+    def _download_registry(self, fileobj):
+        """Descarga el archivo de DGII en `fileobj` por streaming."""
+        response = self.env['dgii.http.client']._request(
+            'registry', 'get', self._get_registry_url(), stream=True)
+        try:
+            if response.status_code >= 400:
+                raise UserError(_('Error HTTP %s al descargar el padrón de contribuyentes.')
+                                % response.status_code)
+            for chunk in response.iter_content(chunk_size=1024 * 1024):
+                fileobj.write(chunk)
+        finally:
+            response.close()
+
+    @api.model
+    def _cron_import_registry(self):
+        """Cron: descarga el padrón de DGII y aplica solo los cambios."""
+        with tempfile.TemporaryFile() as fileobj:
+            self._download_registry(fileobj)
+            return self._import_file(fileobj)
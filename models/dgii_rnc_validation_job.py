@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+
+from .res_partner import RncNotRegisteredError
+
+_logger = logging.getLogger(__name__)
+
+
+class DgiiRncValidationJob(models.Model):
+    """
+    Validación masiva de RNC de contactos.
+
+    El cron procesa los contactos por bloques en orden de id:
+    - Deduplica los RNC del bloque y descarta sin consultar los que no pasan
+      la validación local (longitud y dígito verificador).
+    - Los consulta en paralelo con un pool de hilos acotado, un cursor por
+      hilo. Cada consulta pasa por el padrón local, la caché y el limitador
+      de tasa de dgii.http.client.
+    - Escribe una vez por RNC distinto y hace commit por bloque.
+
+    El avance queda guardado en el trabajo. Si se interrumpe, continúa
+    desde el último bloque confirmado.
+    """
+    _name = 'dgii.rnc.validation.job'
+    _description = 'Validación Masiva de RNC'
+    _order = 'id desc'
+
+    name = fields.Char(
+        string='Descripción',
+        required=True,
+        default=lambda self: _('Validación RNC %s') % fields.Datetime.to_string(fields.Datetime.now()),
+    )
+
+    state = fields.Selection(
+        selection=[
+            ('pending', 'Pendiente'),
+            ('running', 'En Proceso'),
+            ('done', 'Terminado'),
+            ('cancelled', 'Cancelado'),
+        ],
+        string='Estado',
+        default='pending',
+        required=True,
+        readonly=True,
+        index=True,
+    )
+
+    partner_ids = fields.Many2many(
+        'res.partner',
+        'dgii_rnc_validation_job_partner_rel',
+        'job_id',
+        'partner_id',
+        string='Contactos',
+        readonly=True,
+    )
+
+    # ========== AVANCE ==========
+    partner_count = fields.Integer(string='Contactos', readonly=True)
+    processed_count = fields.Integer(string='Procesados', readonly=True)
+    validated_count = fields.Integer(string='Validados', readonly=True)
+    not_found_count = fields.Integer(string='No Inscritos', readonly=True)
+    invalid_count = fields.Integer(string='No Válidos', readonly=True,
+                                   help='Contactos cuyo RNC/Cédula no pasa la validación local; no se consultan')
+    error_count = fields.Integer(string='Con Error', readonly=True)
+    rnc_count = fields.Integer(string='RNC Consultados', readonly=True,
+                               help='RNC distintos consultados (los contactos con el mismo RNC se consultan una vez)')
+    progress = fields.Float(string='Avance (%)', compute='_compute_progress')
+
+    last_partner_id = fields.Integer(
+        string='Último Contacto Procesado',
+        readonly=True,
+        help='Los bloques se procesan en orden de id; el trabajo continúa desde aquí',
+    )
+    date_started = fields.Datetime(string='Inicio', readonly=True)
+    date_finished = fields.Datetime(string='Fin', readonly=True)
+    last_error = fields.Text(string='Último Error', readonly=True)
+
+    @api.depends('processed_count', 'partner_count')
+    def _compute_progress(self):
+        for job in self:
+            job.progress = 100.0 * job.processed_count / job.partner_count if job.partner_count else 0.0
+
+    # ========== CREACIÓN ==========
+    @api.model
+    def _create_for_partners(self, partners):
+        """Crea un trabajo con los contactos que tienen RNC/Cédula y programa el cron."""
+        partners = partners.filtered('vat')
+        if not partners:
+            raise UserError(_('Ninguno de los contactos seleccionados tiene RNC o Cédula.'))
+        job = self.create({
+            'partner_ids': [(6, 0, partners.ids)],
+            'partner_count': len(partners),
+        })
+        self.env.ref('odoo_dgii_ecf.ir_cron_process_dgii_rnc_validation')._trigger()
+        return job
+
+    @api.model
+    def _get_settings(self):
+        icp = self.env['ir.config_parameter'].sudo()
+        return {
+            'chunk_size': max(int(icp.get_param('dgii_ecf.rnc_validation_chunk_size', 200)), 1),
+            'workers': max(int(icp.get_param('dgii_ecf.rnc_validation_workers', 4)), 1),
+        }
+
+    # ========== CONSULTA EN PARALELO ==========
+    @api.model
+    def _fetch_lookups(self, rncs, max_workers):
+        """
+        Consulta RNC y directorio e-CF de cada RNC en paralelo.
+
+        Returns:
+            dict: {rnc: (resultado, datos_rnc, datos_directorio_o_error)} con
+                resultado 'found', 'not_found' o 'error'
+        """
+        registry = self.env.registry
+        uid = self.env.uid
+        context = dict(self.env.context)
+        dbname = self.env.cr.dbname
+        workers = min(max_workers, len(rncs))
+        if not workers:
+            return {}
+        slices = [rncs[i::workers] for i in range(workers)]
+
+        def _run(rnc_slice):
+            threading.current_thread().dbname = dbname
+            results = {}
+            with registry.cursor() as cr:
+                partner_model = api.Environment(cr, uid, context)['res.partner']
+                for rnc in rnc_slice:
+                    try:
+                        with cr.savepoint():
+                            data = partner_model._call_rnc_api(rnc)
+                            directory = partner_model._call_customer_directory_api(rnc)
+                        results[rnc] = ('found', data, directory)
+                    except RncNotRegisteredError:
+                        results[rnc] = ('not_found', None, None)
+                    except Exception as exc:  # noqa: BLE001
+                        results[rnc] = ('error', None, str(exc))
+            return results
+
+        results = {}
+        if workers == 1:
+            results.update(_run(slices[0]))
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dgii_rnc') as executor:
+                for slice_results in executor.map(_run, slices):
+                    results.update(slice_results)
+        return results
+
+    # ========== PROCESAMIENTO ==========
+    def _next_chunk(self, chunk_size):
+        """Siguiente bloque de contactos del trabajo, en orden de id."""
+        self.ensure_one()
+        self.env.cr.execute("""
+            SELECT partner_id
+              FROM dgii_rnc_validation_job_partner_rel
+             WHERE job_id = %s AND partner_id > %s
+          ORDER BY partner_id
+             LIMIT %s
+        """, (self.id, self.last_partner_id, chunk_size))
+        return self.env['res.partner'].browse([row[0] for row in self.env.cr.fetchall()])
+
+    def _process_chunk(self, partners, max_workers):
+        """
+        Valida un bloque de contactos: una consulta por RNC distinto y una
+        escritura por RNC encontrado.
+
+        Returns:
+            dict: contadores del bloque
+        """
+        partner_model = self.env['res.partner']
+        partners_by_rnc = {}
+        for partner in partners:
+            rnc = partner_model._normalize_rnc(partner.vat)
+            if rnc:
+                partners_by_rnc.setdefault(rnc, []).append(partner.id)
+
+        counts = {'validated': 0, 'not_found': 0, 'invalid': 0, 'error': 0}
+        errors = []
+        rncs = list(partners_by_rnc)
+        for rnc, reason in zip(rncs, partner_model._check_rnc_numbers(rncs)):
+            if reason:
+                counts['invalid'] += len(partners_by_rnc.pop(rnc))
+                errors.append(partner_model._rnc_invalid_message(rnc, reason))
+
+        results = self._fetch_lookups(list(partners_by_rnc), max_workers)
+
+        counts['rnc'] = len(partners_by_rnc)
+        for rnc, partner_ids in partners_by_rnc.items():
+            outcome, data, extra = results.get(rnc, ('error', None, _('Sin respuesta')))
+            if outcome == 'found':
+                vals = partner_model._prepare_rnc_vals(data, rnc)
+                vals.update(partner_model._prepare_directory_vals(extra))
+                partner_model.browse(partner_ids).write(vals)
+                counts['validated'] += len(partner_ids)
+            elif outcome == 'not_found':
+                counts['not_found'] += len(partner_ids)
+            else:
+                counts['error'] += len(partner_ids)
+                errors.append(f'{rnc}: {extra}')
+        # Contactos sin dígitos en el RNC/Cédula
+        counts['invalid'] += len(partners) - counts['invalid'] - sum(len(ids) for ids in partners_by_rnc.values())
+        counts['last_error'] = '\n'.join(errors[-5:]) if errors else False
+        return counts
+
+    def _process(self, deadline):
+        """
+        Procesa bloques del trabajo con commit por bloque hasta terminar o
+        alcanzar `deadline` (time.monotonic()).
+
+        Returns:
+            bool: True si quedó trabajo pendiente
+        """
+        self.ensure_one()
+        settings = self._get_settings()
+        if self.state == 'pending':
+            self.write({'state': 'running', 'date_started': fields.Datetime.now()})
+            self.env.cr.commit()
+
+        while time.monotonic() < deadline:
+            # Cancelado desde la interfaz en otra transacción
+            self.invalidate_recordset(['state'])
+            if self.state == 'cancelled':
+                return False
+            partners = self._next_chunk(settings['chunk_size'])
+            if not partners:
+                self.write({'state': 'done', 'date_finished': fields.Datetime.now()})
+                self.env.cr.commit()
+                return False
+
+            last_partner_id = max(partners.ids)
+            try:
+                counts = self._process_chunk(partners, settings['workers'])
+            except Exception as exc:  # noqa: BLE001
+                self.env.cr.rollback()
+                _logger.warning('Validación RNC %s: error en bloque de %s contactos: %s',
+                                self.id, len(partners), exc)
+                counts = {'validated': 0, 'not_found': 0, 'invalid': 0, 'error': len(partners), 'rnc': 0,
+                          'last_error': str(exc)}
+
+            vals = {
+                'last_partner_id': last_partner_id,
+                'processed_count': self.processed_count + len(partners),
+                'validated_count': self.validated_count + counts['validated'],
+                'not_found_count': self.not_found_count + counts['not_found'],
+                'invalid_count': self.invalid_count + counts['invalid'],
+                'error_count': self.error_count + counts['error'],
+                'rnc_count': self.rnc_count + counts['rnc'],
+            }
+            if counts['last_error']:
+                vals['last_error'] = counts['last_error']
+            self.write(vals)
+            self.env.cr.commit()
+        return True
+
+    @api.model
+    def _cron_process_jobs(self, time_budget=None):
+        """
+        Cron: procesa los trabajos pendientes en orden de creación hasta agotar
+        `dgii_ecf.cron_time_budget` segundos; si queda trabajo se reprograma.
+        """
+        if time_budget is None:
+            time_budget = self.env['dgii.send.queue']._get_cron_time_budget()
+        deadline = time.monotonic() + time_budget
+        remaining = False
+        for job in self.search([('state', 'in', ('pending', 'running'))], order='id'):
+            remaining = job._process(deadline)
+            if remaining:
+                break
+        if remaining:
+            self.env.ref('odoo_dgii_ecf.ir_cron_process_dgii_rnc_validation')._trigger()
+
+    # ========== ACCIONES ==========
+    def action_cancel(self):
+        self.filtered(lambda j: j.state in ('pending', 'running')).write({
+            'state': 'cancelled',
+            'date_finished': fields.Datetime.now(),
+        })
+
+    def action_view_partners(self):
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'name': _('Contactos'),
+            'res_model': 'res.partner',
+            'view_mode': 'list,form',
+            'domain': [('id', 'in', self.partner_ids.ids)],
+        }
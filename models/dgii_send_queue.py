@@ -0,0 +1,690 @@
+# -*- coding: utf-8 -*-
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from psycopg2 import OperationalError
+
+from odoo import api, fields, models, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+
+class DgiiSendQueue(models.Model):
+    """
+    Cola persistente de envíos de e-CF al microservicio DGII.
+
+    Los usuarios encolan facturas de forma instantánea y los workers (cron o
+    proceso dedicado) reclaman lotes con SKIP LOCKED, los procesan en paralelo
+    con un cursor por trabajo y escriben los resultados en bloque.
+
+    Los fallos transitorios (red, timeout, 5xx) se reprograman con backoff
+    exponencial y jitter en `next_attempt_at`; al agotar los intentos el
+    trabajo pasa a 'dead' (cola de fallidos) para reencolarlo en bloque.
+
+    En modo contingencia los trabajos guardan el payload congelado y no los
+    toman los workers normales: el cron de drenaje los envía en orden de
+    e-NCF, a una tasa máxima, cuando el servicio vuelve a estar disponible.
+    """
+    _name = 'dgii.send.queue'
+    _description = 'Cola de Envío e-CF DGII'
+    _order = 'priority desc, id'
+    _rec_name = 'encf'
+
+    # ========== CAMPOS PRINCIPALES ==========
+    move_id = fields.Many2one(
+        'account.move',
+        string='Factura',
+        required=True,
+        ondelete='cascade',
+        index=True,
+    )
+
+    encf = fields.Char(
+        string='e-NCF',
+        index=True,
+    )
+
+    company_id = fields.Many2one(
+        'res.company',
+        string='Compañía',
+        related='move_id.company_id',
+        store=True,
+    )
+
+    state = fields.Selection(
+        selection=[
+            ('pending', 'Pendiente'),
+            ('processing', 'Procesando'),
+            ('done', 'Enviado'),
+            ('error', 'Error'),
+            ('dead', 'Intentos Agotados'),
+            ('cancelled', 'Cancelado'),
+        ],
+        string='Estado',
+        default='pending',
+        required=True,
+        index=True,
+    )
+
+    priority = fields.Selection(
+        selection=[
+            ('0', 'Baja'),
+            ('1', 'Normal'),
+            ('2', 'Alta'),
+        ],
+        string='Prioridad',
+        default='1',
+        required=True,
+    )
+
+    # ========== CONTINGENCIA ==========
+    contingency = fields.Boolean(
+        string='Contingencia',
+        default=False,
+        readonly=True,
+        help='Emitido sin conexión con el servicio; se envía con el drenaje de contingencia',
+    )
+
+    payload = fields.Text(
+        string='Payload Congelado',
+        readonly=True,
+        help='JSON del e-CF tal como se emitió en contingencia',
+    )
+
+    # ========== EJECUCIÓN ==========
+    attempts = fields.Integer(
+        string='Intentos',
+        default=0,
+        readonly=True,
+    )
+
+    next_attempt_at = fields.Datetime(
+        string='Próximo Intento',
+        readonly=True,
+        help='El trabajo no se reclama antes de esta fecha (reintento con backoff)',
+    )
+
+    failure_kind = fields.Selection(
+        selection=[
+            ('transient', 'Transitorio'),
+            ('permanent', 'Permanente'),
+        ],
+        string='Tipo de Fallo',
+        readonly=True,
+    )
+
+    worker = fields.Char(
+        string='Worker',
+        readonly=True,
+        help='Proceso/hilo que reclamó el trabajo',
+    )
+
+    date_enqueued = fields.Datetime(
+        string='Fecha Encolado',
+        default=fields.Datetime.now,
+        readonly=True,
+    )
+
+    date_started = fields.Datetime(
+        string='Inicio Procesamiento',
+        readonly=True,
+    )
+
+    date_done = fields.Datetime(
+        string='Fecha Finalización',
+        readonly=True,
+    )
+
+    error_message = fields.Text(
+        string='Mensaje de Error',
+        readonly=True,
+    )
+
+    def init(self):
+        """Índices para reclamar lotes y evitar trabajos activos duplicados por factura."""
+        self.env.cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS dgii_send_queue_move_active_uniq
+                ON dgii_send_queue (move_id)
+             WHERE state IN ('pending', 'processing')
+        """)
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS dgii_send_queue_claim_idx
+                ON dgii_send_queue (priority DESC, id)
+             WHERE state = 'pending'
+        """)
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS dgii_send_queue_contingency_idx
+                ON dgii_send_queue (encf)
+             WHERE state = 'pending' AND contingency
+        """)
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS dgii_send_queue_next_attempt_idx
+                ON dgii_send_queue (next_attempt_at)
+             WHERE state = 'pending' AND next_attempt_at IS NOT NULL
+        """)
+
+    # ========== ENCOLADO ==========
+    @api.model
+    def enqueue(self, moves, priority='1', contingency=False):
+        """
+        Encola facturas para envío. Ignora las que ya tienen un trabajo activo.
+
+        Args:
+            moves: recordset de account.move
+            priority: prioridad del trabajo ('0', '1', '2')
+            contingency (bool): congelar el payload y dejarlo para el drenaje de contingencia
+
+        Returns:
+            dgii.send.queue: trabajos activos de las facturas indicadas
+        """
+        if not moves:
+            return self.browse()
+
+        active_jobs = self.search([
+            ('move_id', 'in', moves.ids),
+            ('state', 'in', ['pending', 'processing']),
+        ])
+        queued_move_ids = set(active_jobs.mapped('move_id').ids)
+
+        vals_list = []
+        for move in moves:
+            if move.id in queued_move_ids:
+                continue
+            vals = {
+                'move_id': move.id,
+                'encf': move.encf,
+                'priority': priority,
+            }
+            if contingency:
+                vals.update({
+                    'contingency': True,
+                    'payload': json.dumps(move._build_dgii_invoice_data(), ensure_ascii=False, default=str),
+                })
+            vals_list.append(vals)
+
+        new_jobs = self.create(vals_list) if vals_list else self.browse()
+        if new_jobs and not contingency:
+            self.env.ref('odoo_dgii_ecf.ir_cron_process_dgii_send_queue')._trigger()
+        return active_jobs | new_jobs
+
+    @api.model
+    def _enqueue_retry(self, move, error):
+        """
+        Encola el reintento de un envío directo que falló de forma transitoria.
+        Cuenta el intento ya realizado y programa el siguiente con backoff.
+
+        Returns:
+            dgii.send.queue: trabajo activo de la factura
+        """
+        job = self.enqueue(move)
+        if job.state == 'pending' and not job.next_attempt_at:
+            next_attempt = fields.Datetime.now() + timedelta(seconds=self._get_retry_delay(job.attempts + 1))
+            job.write({
+                'attempts': job.attempts + 1,
+                'next_attempt_at': next_attempt,
+                'failure_kind': 'transient',
+                'error_message': error,
+            })
+            self.env.ref('odoo_dgii_ecf.ir_cron_process_dgii_send_queue')._trigger(next_attempt)
+        return job
+
+    # ========== RECLAMO Y PROCESAMIENTO ==========
+    @api.model
+    def _get_queue_settings(self):
+        """Lee tamaño de lote y cantidad de workers desde parámetros del sistema."""
+        icp = self.env['ir.config_parameter'].sudo()
+        batch_send = icp.get_param('dgii_ecf.batch_send_enabled', 'False') == 'True'
+        return {
+            'batch_size': max(int(icp.get_param('dgii_ecf.queue_batch_size', 20)), 1),
+            'max_workers': max(int(icp.get_param('dgii_ecf.queue_workers', 4)), 1),
+            'send_batch_size': max(int(icp.get_param('dgii_ecf.batch_send_size', 50)), 1) if batch_send else 0,
+        }
+
+    @api.model
+    def _get_retry_settings(self):
+        """Intentos máximos y backoff (segundos) desde parámetros del sistema."""
+        icp = self.env['ir.config_parameter'].sudo()
+        return {
+            'max_attempts': max(int(icp.get_param('dgii_ecf.queue_max_attempts', 6)), 1),
+            'backoff_base': max(int(icp.get_param('dgii_ecf.retry_backoff_base', 60)), 1),
+            'backoff_max': max(int(icp.get_param('dgii_ecf.retry_backoff_max', 3600)), 1),
+        }
+
+    @api.model
+    def _get_retry_delay(self, attempts):
+        """
+        Espera antes del siguiente intento: base * 2^(intentos-1), con tope y
+        jitter del 50% para que los reintentos de una caída no lleguen juntos.
+        """
+        settings = self._get_retry_settings()
+        delay = min(settings['backoff_max'], settings['backoff_base'] * 2 ** max(attempts - 1, 0))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    @api.model
+    def _get_worker_name(self):
+        return f"{os.getpid()}/{threading.current_thread().name}"
+
+    @api.model
+    def _claim_batch(self, limit, contingency=False):
+        """
+        Reclama hasta `limit` trabajos pendientes y los marca como 'processing'.
+        SKIP LOCKED permite que varios workers reclamen lotes distintos en paralelo.
+        Hace commit para liberar los bloqueos de fila inmediatamente.
+
+        Con contingency=True reclama solo trabajos de contingencia, en orden de e-NCF.
+        """
+        order = 'encf, id' if contingency else 'priority DESC, id'
+        self.env.cr.execute("""
+            UPDATE dgii_send_queue q
+               SET state = 'processing',
+                   date_started = (now() AT TIME ZONE 'UTC'),
+                   write_date = (now() AT TIME ZONE 'UTC'),
+                   worker = %s,
+                   attempts = q.attempts + 1
+             WHERE q.id IN (
+                    SELECT id
+                      FROM dgii_send_queue
+                     WHERE state = 'pending'
+                       AND contingency IS %s
+                       AND (next_attempt_at IS NULL OR next_attempt_at <= (now() AT TIME ZONE 'UTC'))
+                  ORDER BY """ + order + """
+                     LIMIT %s
+                       FOR UPDATE SKIP LOCKED
+             )
+         RETURNING q.id
+        """, (self._get_worker_name(), bool(contingency), limit))
+        job_ids = [row[0] for row in self.env.cr.fetchall()]
+        self.env.cr.commit()
+        self.invalidate_model(['state', 'date_started', 'worker', 'attempts'])
+        return self.browse(job_ids)
+
+    def _execute_send(self, batch=False):
+        """
+        Ejecuta el envío de los trabajos. Debe llamarse con un cursor propio:
+        el resultado en la factura se confirma junto con el envío. Solo los
+        errores previos a la respuesta del servicio se propagan.
+
+        Args:
+            batch (bool): enviar todas las facturas en una sola petición de lote
+
+        Returns:
+            list: dicts con job_id, state, error, transient
+        """
+        moves = self.move_id
+        payloads = {job.move_id.id: json.loads(job.payload) for job in self if job.payload}
+        if batch:
+            provider = self.env['ecf.api.provider']
+            results = moves._dgii_send_batch(payloads=payloads)
+        else:
+            self.ensure_one()
+            provider = moves._get_dgii_provider()
+            results = {moves.id: moves._dgii_send(provider, invoice_data=payloads.get(moves.id))}
+
+        # El servicio ya aceptó los envíos: cada resultado se aplica por separado y un
+        # fallo local no revierte los demás ni deja el trabajo para reenviarse
+        outcomes = []
+        for job in self:
+            result = results.get(job.move_id.id)
+            if result and result['success']:
+                try:
+                    with self.env.cr.savepoint():
+                        job.move_id._dgii_apply_send_result(provider, result)
+                except Exception as exc:  # noqa: BLE001
+                    _logger.exception('No se pudo registrar el envío DGII aceptado de %s', job.encf)
+                    outcomes.append({
+                        'job_id': job.id,
+                        'state': 'error',
+                        'error': _('El e-CF fue recibido por el servicio (TrackID %(track)s), pero no se '
+                                   'pudo registrar el resultado en la factura: %(error)s',
+                                   track=result['track_id'] or _('N/D'), error=str(exc)),
+                        'transient': False,
+                    })
+                    continue
+                outcomes.append({'job_id': job.id, 'state': 'done', 'error': False, 'transient': False})
+            else:
+                error = (result and result['error']) or _('Error desconocido')
+                transient = bool(result and result.get('transient'))
+                outcomes.append({'job_id': job.id, 'state': 'error', 'error': error, 'transient': transient})
+        return outcomes
+
+    def _process_claimed(self, max_workers, batch_size=0):
+        """
+        Procesa los trabajos reclamados en paralelo, un cursor por tarea.
+        Con batch_size > 0 cada tarea envía un lote de facturas en una sola petición.
+        """
+        registry = self.env.registry
+        uid = self.env.uid
+        context = dict(self.env.context)
+        dbname = self.env.cr.dbname
+        batch = batch_size > 0
+        chunk_size = batch_size if batch else 1
+        chunks = [self.ids[i:i + chunk_size] for i in range(0, len(self.ids), chunk_size)]
+
+        def _run(job_ids):
+            threading.current_thread().dbname = dbname
+            with registry.cursor() as cr:
+                env = api.Environment(cr, uid, context)
+                jobs = env['dgii.send.queue'].browse(job_ids)
+                try:
+                    return jobs._execute_send(batch=batch)
+                except Exception as exc:  # noqa: BLE001
+                    cr.rollback()
+                    _logger.warning('Error procesando trabajos de envío DGII %s: %s', job_ids, exc)
+                    # Red y conflictos de concurrencia se reintentan; el resto requiere corrección
+                    transient = isinstance(exc, OperationalError) or \
+                        env['account.move']._dgii_is_transient_exception(exc)
+                    return [{'job_id': job_id, 'state': 'error', 'error': str(exc), 'transient': transient}
+                            for job_id in job_ids]
+
+        workers = min(max_workers, len(chunks))
+        if workers <= 1:
+            chunk_outcomes = [_run(chunk) for chunk in chunks]
+        else:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dgii_send') as executor:
+                chunk_outcomes = list(executor.map(_run, chunks))
+        return [outcome for outcomes in chunk_outcomes for outcome in outcomes]
+
+    @api.model
+    def _write_results(self, outcomes):
+        """
+        Escribe el resultado de los trabajos agrupando por estado y mensaje.
+        Los fallos transitorios con intentos disponibles vuelven a 'pending'
+        con backoff; los que agotaron los intentos pasan a 'dead'.
+        """
+        now = fields.Datetime.now()
+        max_attempts = self._get_retry_settings()['max_attempts']
+        attempts = {job.id: job.attempts for job in self.browse([o['job_id'] for o in outcomes])}
+
+        groups = {}
+        retries = {}
+        for outcome in outcomes:
+            state, error = outcome['state'], outcome['error']
+            if state == 'error' and outcome.get('transient'):
+                if attempts.get(outcome['job_id'], 0) < max_attempts:
+                    retries.setdefault(error, []).append(outcome['job_id'])
+                    continue
+                state = 'dead'
+            groups.setdefault((state, error, outcome.get('transient')), []).append(outcome['job_id'])
+
+        for (state, error, transient), job_ids in groups.items():
+            self.browse(job_ids).write({
+                'state': state,
+                'error_message': error or False,
+                'failure_kind': ('transient' if transient else 'permanent') if state != 'done' else False,
+                'next_attempt_at': False,
+                'date_done': now,
+            })
+
+        for error, job_ids in retries.items():
+            self._schedule_retry(job_ids, error)
+
+    @api.model
+    def _schedule_retry(self, job_ids, error):
+        """
+        Devuelve los trabajos a 'pending' con backoff exponencial y jitter.
+        El retraso se calcula en SQL por fila para escribir todo el grupo en un UPDATE.
+        """
+        settings = self._get_retry_settings()
+        self.env.cr.execute("""
+            UPDATE dgii_send_queue
+               SET state = 'pending',
+                   worker = NULL,
+                   failure_kind = 'transient',
+                   error_message = %(error)s,
+                   write_date = (now() AT TIME ZONE 'UTC'),
+                   next_attempt_at = (now() AT TIME ZONE 'UTC') + make_interval(secs =>
+                       LEAST(%(max)s, %(base)s * power(2, GREATEST(attempts - 1, 0)))
+                       * (0.5 + random() * 0.5))
+             WHERE id IN %(ids)s
+         RETURNING next_attempt_at
+        """, {
+            'error': error or None,
+            'max': settings['backoff_max'],
+            'base': settings['backoff_base'],
+            'ids': tuple(job_ids),
+        })
+        next_attempt = min(row[0] for row in self.env.cr.fetchall())
+        self.invalidate_model(['state', 'worker', 'failure_kind', 'error_message', 'next_attempt_at'])
+        self.env.ref('odoo_dgii_ecf.ir_cron_process_dgii_send_queue')._trigger(next_attempt)
+        _logger.info('Cola DGII: %s trabajos reprogramados (primer reintento %s)', len(job_ids), next_attempt)
+
+    @api.model
+    def _requeue_stale(self, minutes=15):
+        """Devuelve a 'pending' los trabajos abandonados por un worker caído."""
+        self.env.cr.execute("""
+            UPDATE dgii_send_queue
+               SET state = 'pending', worker = NULL
+             WHERE state = 'processing'
+               AND date_started < (now() AT TIME ZONE 'UTC') - make_interval(mins => %s)
+        """, (minutes,))
+        return self.env.cr.rowcount
+
+    @api.model
+    def _process_next_batch(self, batch_size, max_workers, send_batch_size=0):
+        """Reclama, procesa y confirma un lote. Retorna la cantidad procesada."""
+        jobs = self._claim_batch(batch_size)
+        if not jobs:
+            return 0
+        outcomes = jobs._process_claimed(max_workers, batch_size=send_batch_size)
+        self._write_results(outcomes)
+        self.env.cr.commit()
+        return len(jobs)
+
+    @api.model
+    def _cron_process_queue(self, time_budget=None):
+        """
+        Cron: procesa lotes de la cola (commit por lote) hasta vaciarla o agotar
+        `dgii_ecf.cron_time_budget` segundos; si queda trabajo se reprograma.
+        """
+        if time_budget is None:
+            time_budget = self._get_cron_time_budget()
+        deadline = time.monotonic() + time_budget
+        settings = self._get_queue_settings()
+        requeued = self._requeue_stale()
+        if requeued:
+            _logger.warning('Cola DGII: %s trabajos abandonados devueltos a pendiente', requeued)
+            self.env.cr.commit()
+
+        processed = 0
+        while True:
+            if time.monotonic() >= deadline:
+                self.env.ref('odoo_dgii_ecf.ir_cron_process_dgii_send_queue')._trigger()
+                break
+            count = self._process_next_batch(**settings)
+            if not count:
+                break
+            processed += count
+        _logger.info('Cola DGII: %s trabajos procesados', processed)
+        return processed
+
+    @api.model
+    def _get_cron_time_budget(self):
+        """Segundos que cada ejecución de cron puede trabajar antes de reprogramarse."""
+        icp = self.env['ir.config_parameter'].sudo()
+        return max(int(icp.get_param('dgii_ecf.cron_time_budget', 50)), 1)
+
+    @api.model
+    def _cron_drain_contingency(self, time_budget=None):
+        """
+        Cron: envía los e-CF emitidos en contingencia en orden de e-NCF, sin
+        superar `dgii_ecf.contingency_drain_rate` envíos por segundo. Se detiene
+        si el servicio vuelve a fallar y se reprograma si queda pendiente.
+
+        Si el circuito de envío no está cerrado (enfriamiento vencido o
+        semiabierto), el primer lote es un único e-CF: es la petición de prueba
+        que cierra el circuito y termina la contingencia automática.
+        """
+        Move = self.env['account.move']
+        breaker = self.env['dgii.circuit.breaker'].sudo()
+        if Move._dgii_is_contingency():
+            return 0
+
+        settings = self._get_queue_settings()
+        icp = self.env['ir.config_parameter'].sudo()
+        max_rate = max(float(icp.get_param('dgii_ecf.contingency_drain_rate', 20)), 0.1)
+        deadline = time.monotonic() + (time_budget or self._get_cron_time_budget())
+
+        processed = 0
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            trial = breaker._get_state('send') != 'closed'
+            if trial:
+                jobs = self._claim_batch(1, contingency=True)
+            else:
+                jobs = self._claim_batch(settings['batch_size'], contingency=True)
+            if not jobs:
+                break
+            if trial:
+                outcomes = jobs._process_claimed(1)
+            else:
+                outcomes = jobs._process_claimed(settings['max_workers'], batch_size=settings['send_batch_size'])
+            self._write_results(outcomes)
+            self.env.cr.commit()
+            processed += len(jobs)
+
+            if Move._dgii_is_contingency() or (trial and breaker._get_state('send') != 'closed'):
+                _logger.warning('Drenaje de contingencia detenido: el servicio DGII volvió a fallar')
+                break
+            # Ritmo máximo: cada lote ocupa al menos len(jobs) / max_rate segundos
+            remaining = len(jobs) / max_rate - (time.monotonic() - started)
+            if remaining > 0:
+                time.sleep(min(remaining, max(deadline - time.monotonic(), 0)))
+        else:
+            self.env.ref('odoo_dgii_ecf.ir_cron_drain_dgii_contingency')._trigger()
+
+        if processed:
+            progress = self._get_contingency_progress()
+            _logger.info('Drenaje de contingencia: %s enviados, %s pendientes (%s%%)',
+                         processed, progress['remaining'], progress['percent'])
+        return processed
+
+    @api.model
+    def _get_contingency_progress(self):
+        """
+        Progreso del backlog de contingencia actual.
+
+        Returns:
+            dict: remaining, done, failed, percent, rate_per_minute, eta_minutes
+        """
+        self.env.cr.execute("""
+            WITH backlog AS (
+                SELECT MIN(date_enqueued) AS since
+                  FROM dgii_send_queue
+                 WHERE contingency AND state IN ('pending', 'processing')
+            )
+            SELECT COUNT(*) FILTER (WHERE q.state IN ('pending', 'processing')),
+                   COUNT(*) FILTER (WHERE q.state = 'done'),
+                   COUNT(*) FILTER (WHERE q.state IN ('error', 'dead')),
+                   COUNT(*) FILTER (WHERE q.state = 'done'
+                                      AND q.date_done >= (now() AT TIME ZONE 'UTC') - interval '5 minutes')
+              FROM dgii_send_queue q, backlog
+             WHERE q.contingency
+               AND q.date_enqueued >= COALESCE(backlog.since, (now() AT TIME ZONE 'UTC') - interval '1 day')
+        """)
+        remaining, done, failed, recent = self.env.cr.fetchone()
+        total = remaining + done + failed
+        rate = recent / 5.0
+        return {
+            'remaining': remaining,
+            'done': done,
+            'failed': failed,
+            'percent': round(100.0 * (done + failed) / total, 1) if total else 100.0,
+            'rate_per_minute': rate,
+            'eta_minutes': round(remaining / rate, 1) if rate else None,
+        }
+
+    @api.model
+    def action_contingency_status(self):
+        """Muestra el modo actual y el progreso del drenaje de contingencia."""
+        progress = self._get_contingency_progress()
+        active = self.env['account.move']._dgii_is_contingency()
+        message = _(
+            'Modo contingencia: %(mode)s\n'
+            'Pendientes: %(remaining)s | Enviados: %(done)s | Fallidos: %(failed)s (%(percent)s%%)\n'
+            'Ritmo: %(rate)s/min | Tiempo estimado: %(eta)s min'
+        ) % {
+            'mode': _('ACTIVO') if active else _('inactivo'),
+            'remaining': progress['remaining'],
+            'done': progress['done'],
+            'failed': progress['failed'],
+            'percent': progress['percent'],
+            'rate': progress['rate_per_minute'],
+            'eta': progress['eta_minutes'] if progress['eta_minutes'] is not None else '-',
+        }
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Contingencia e-CF'),
+                'message': message,
+                'type': 'warning' if active or progress['remaining'] else 'info',
+                'sticky': True,
+            }
+        }
+
+    @api.model
+    def run_worker(self, max_runtime=None, idle_sleep=5):
+        """
+        Punto de entrada para un worker de larga duración (p.ej. desde odoo-bin shell):
+
+            env['dgii.send.queue'].run_worker()
+
+        Procesa lotes continuamente y duerme `idle_sleep` segundos cuando la cola está vacía.
+        """
+        deadline = time.monotonic() + max_runtime if max_runtime else None
+        _logger.info('Worker de cola DGII iniciado (%s)', self._get_worker_name())
+        while deadline is None or time.monotonic() < deadline:
+            settings = self._get_queue_settings()
+            if not self._process_next_batch(**settings):
+                self.env.cr.commit()
+                time.sleep(idle_sleep)
+        return True
+
+    # ========== ACCIONES ==========
+    def action_requeue(self):
+        """Vuelve a encolar trabajos con error, con intentos agotados o cancelados."""
+        jobs = self.filtered(lambda j: j.state in ('error', 'dead', 'cancelled'))
+        if not jobs:
+            raise UserError(_('Solo se pueden reencolar trabajos con error, con intentos agotados o cancelados.'))
+        # Evitar duplicar trabajos activos de la misma factura
+        active_moves = self.search([
+            ('move_id', 'in', jobs.mapped('move_id').ids),
+            ('state', 'in', ['pending', 'processing']),
+        ]).mapped('move_id')
+        to_requeue = self.browse()
+        for job in jobs:
+            if job.move_id not in active_moves | to_requeue.mapped('move_id'):
+                to_requeue |= job
+        to_requeue.write({
+            'state': 'pending',
+            'attempts': 0,
+            'next_attempt_at': False,
+            'failure_kind': False,
+            'error_message': False,
+            'date_done': False,
+        })
+        self.env.ref('odoo_dgii_ecf.ir_cron_process_dgii_send_queue')._trigger()
+        return True
+
+    def action_cancel(self):
+        """Cancela trabajos pendientes."""
+        self.filtered(lambda j: j.state == 'pending').write({'state': 'cancelled'})
+        return True
+
+    def action_view_move(self):
+        """Abre la factura relacionada."""
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': 'account.move',
+            'res_id': self.move_id.id,
+            'view_mode': 'form',
+            'target': 'current',
+        }
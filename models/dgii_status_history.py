@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+from odoo import api, fields, models
+
+DGII_ESTADO_SELECTION = [
+    ('draft', 'Borrador'),
+    ('pending', 'Pendiente'),
+    ('accepted', 'Aceptado'),
+    ('rejected', 'Rechazado'),
+    ('error', 'Error'),
+]
+
+
+class DgiiStatusHistory(models.Model):
+    """
+    Historial compacto de cambios de estado DGII por comprobante.
+
+    Reemplaza el mensaje de chatter por factura en las actualizaciones de
+    estado en lote: las filas se insertan con un único INSERT por lote
+    (ver `_log_changes`), sin pasar por el ORM ni por mail.
+    """
+    _name = 'dgii.status.history'
+    _description = 'Historial de Estados DGII'
+    _order = 'date desc, id desc'
+    _log_access = False
+
+    move_id = fields.Many2one(
+        'account.move',
+        string='Factura',
+        required=True,
+        readonly=True,
+        index=True,
+        ondelete='cascade',
+    )
+
+    company_id = fields.Many2one(
+        'res.company',
+        string='Compañía',
+        related='move_id.company_id',
+        store=True,
+    )
+
+    encf = fields.Char(string='e-NCF', readonly=True, index=True)
+    track_id = fields.Char(string='TrackID', readonly=True)
+
+    date = fields.Datetime(
+        string='Fecha',
+        required=True,
+        readonly=True,
+        default=fields.Datetime.now,
+    )
+
+    old_state = fields.Selection(
+        selection=DGII_ESTADO_SELECTION,
+        string='Estado Anterior',
+        readonly=True,
+    )
+
+    new_state = fields.Selection(
+        selection=DGII_ESTADO_SELECTION,
+        string='Estado Nuevo',
+        required=True,
+        readonly=True,
+    )
+
+    dgii_status = fields.Char(
+        string='Estado Reportado',
+        readonly=True,
+        help='Texto del estado devuelto por DGII (p. ej. "Aceptado Condicional")',
+    )
+
+    note = fields.Text(string='Nota', readonly=True)
+
+    source = fields.Selection(
+        selection=[
+            ('manual', 'Consulta Manual'),
+            ('poll', 'Consulta Programada'),
+            ('callback', 'Callback'),
+        ],
+        string='Origen',
+        readonly=True,
+    )
+
+    @api.model
+    def _log_changes(self, rows, source='poll'):
+        """
+        Inserta varias filas de historial en una sola sentencia.
+
+        Args:
+            rows (list): dicts con move_id, old_state, new_state y opcionalmente
+                dgii_status y note; encf, track_id y compañía se toman de la factura
+            source (str): origen del cambio
+
+        Returns:
+            int: filas insertadas
+        """
+        if not rows:
+            return 0
+        self.env['account.move'].flush_model(['encf', 'dgii_track_id', 'company_id'])
+        self.env.cr.execute("""
+            INSERT INTO dgii_status_history
+                   (move_id, company_id, encf, track_id, date, old_state, new_state,
+                    dgii_status, note, source)
+            SELECT m.id, m.company_id, m.encf, m.dgii_track_id, (now() AT TIME ZONE 'UTC'),
+                   v.old_state, v.new_state, v.dgii_status, v.note, %s
+              FROM unnest(%s::int[], %s::varchar[], %s::varchar[], %s::varchar[], %s::text[])
+                   AS v(move_id, old_state, new_state, dgii_status, note)
+              JOIN account_move m ON m.id = v.move_id
+        """, (
+            source,
+            [row['move_id'] for row in rows],
+            [row.get('old_state') or None for row in rows],
+            [row['new_state'] for row in rows],
+            [row.get('dgii_status') or None for row in rows],
+            [row.get('note') or None for row in rows],
+        ))
+        self.env['account.move'].invalidate_model(['dgii_status_history_ids'])
+        return self.env.cr.rowcount
@@ -41,6 +41,7 @@ class DgiiTransactionLog(models.Model):
             ('generate_encf', 'Generación e-NCF'),
             ('build_json', 'Construcción JSON'),
             ('send_invoice', 'Envío Factura'),
+            ('send_batch', 'Envío en Lote'),
             ('send_summary', 'Envío Resumen (Tipo 32)'),
             ('check_status', 'Consulta Estado'),
             ('send_approval', 'Envío Aprobación'),
@@ -234,7 +235,9 @@ class DgiiTransactionLog(models.Model):
 
     @api.model
     def log_api_call(self, move, url, method, payload, response, duration_ms=0):
-        """Log específico para llamadas a API."""
+        """Log específico para llamadas a API. Sin duration_ms usa el tiempo de la respuesta."""
+        if not duration_ms and getattr(response, 'elapsed', None):
+            duration_ms = int(response.elapsed.total_seconds() * 1000)
         state = 'success'
         error_msg = None
         dgii_track_id = None
@@ -19,6 +19,36 @@ class EcfApiLogExtension(models.Model):
         help='Factura relacionada con esta transacción API'
     )
 
+    idempotency_key = fields.Char(
+        string='Clave de Idempotencia',
+        index=True,
+        help='Clave de idempotencia enviada con la petición (compartida por todos los reintentos)'
+    )
+
+    def init(self):
+        """Índice compuesto para búsquedas de logs por proveedor y e-NCF más recientes."""
+        super().init()
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS ecf_api_log_provider_encf_date_idx
+                ON ecf_api_log (provider_id, encf, create_date DESC)
+        """)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        """
+        Asocia el log a la factura al crearlo cuando el envío se hace desde
+        una factura (contexto dgii_log_move_id), sin búsquedas posteriores.
+        """
+        move_id = self.env.context.get('dgii_log_move_id')
+        idempotency_key = self.env.context.get('dgii_idempotency_key')
+        if move_id or idempotency_key:
+            for vals in vals_list:
+                if move_id:
+                    vals.setdefault('move_id', move_id)
+                if idempotency_key:
+                    vals.setdefault('idempotency_key', idempotency_key)
+        return super().create(vals_list)
+
     def action_view_move(self):
         """Abre la factura relacionada."""
         self.ensure_one()
@@ -3,7 +3,9 @@
 Extensión del modelo ecf.api.provider de l10n_do_e_cf_tests para
 soportar envío desde facturas con move_id.
 """
-from odoo import api, fields, models, _
+from odoo import models
+
+from ..tools.resilience import CircuitOpenError
 
 import logging
 _logger = logging.getLogger(__name__)
@@ -15,7 +17,8 @@ class EcfApiProviderExtension(models.Model):
 
     def send_ecf_from_invoice(self, ecf_json, move, origin='invoice'):
         """
-        Envía un e-CF desde una factura y guarda la relación en el log.
+        Envía un e-CF desde una factura. El log de ecf.api.log se crea con
+        move_id e idempotency_key desde el contexto (ver EcfApiLogExtension.create).
 
         Args:
             ecf_json: dict con el JSON del ECF
@@ -27,23 +30,30 @@ class EcfApiProviderExtension(models.Model):
         """
         self.ensure_one()
 
-        # Llamar al método original
-        result = self.send_ecf(
+        # Fallar rápido si el servicio de envío está degradado (circuito abierto)
+        breaker = self.env['dgii.circuit.breaker'].sudo()
+        try:
+            breaker._before_request('send')
+        except CircuitOpenError as exc:
+            return False, None, None, str(exc), None, None
+
+        # Llamar al método original; el log se crea ya asociado a la factura
+        result = self.with_context(
+            dgii_log_move_id=move.id,
+            dgii_idempotency_key=self.env.context.get('dgii_idempotency_key') or move.dgii_idempotency_key,
+        ).send_ecf(
             ecf_json=ecf_json,
             rnc=move.company_id.vat,
             encf=move.encf,
             origin=origin,
         )
 
-        # Buscar el log recién creado y asignar el move_id
-        ApiLog = self.env['ecf.api.log']
-        log = ApiLog.search([
-            ('encf', '=', move.encf),
-            ('provider_id', '=', self.id),
-        ], order='create_date desc', limit=1)
-
-        if log:
-            log.write({'move_id': move.id})
-            _logger.info(f"[API Provider] Log {log.id} asociado a factura {move.name}")
+        # Solo las fallas del servicio (red, timeout, 5xx) cuentan para el circuito;
+        # los errores locales de validación o construcción no lo abren
+        success, _response_data, _track_id, error_msg, raw_response, _signed_xml = result
+        if success or raw_response:
+            breaker._record_success('send')
+        elif move._dgii_is_transient_error(error_msg):
+            breaker._record_failure('send', error_msg)
 
         return result
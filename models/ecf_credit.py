@@ -1,7 +1,17 @@
 # -*- coding: utf-8 -*-
+import logging
+from collections import defaultdict
+from datetime import date
+
+import psycopg2
+
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError, ValidationError
 
+from ..tools import credit_allocation
+
+_logger = logging.getLogger(__name__)
+
 
 class EcfCredit(models.Model):
     """
@@ -162,6 +172,32 @@ class EcfCredit(models.Model):
          'Ya existe un crédito con este e-NCF en la compañía.'),
     ]
 
+    # ========== SALDO AGREGADO POR CLIENTE ==========
+    # Campos que cambian el aporte del crédito a l10n_do.ecf_credit_balance
+    BALANCE_FIELDS = frozenset({'partner_id', 'credit_move_id', 'amount_available', 'state'})
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super().create(vals_list)
+        self.env['l10n_do.ecf_credit_balance'].sudo()._apply_changes({}, records)
+        return records
+
+    def write(self, vals):
+        if not self.BALANCE_FIELDS.intersection(vals):
+            return super().write(vals)
+        balance = self.env['l10n_do.ecf_credit_balance'].sudo()
+        before = balance._snapshot(self)
+        result = super().write(vals)
+        balance._apply_changes(before, self)
+        return result
+
+    def unlink(self):
+        balance = self.env['l10n_do.ecf_credit_balance'].sudo()
+        before = balance._snapshot(self)
+        result = super().unlink()
+        balance._apply_changes(before, self.browse())
+        return result
+
     # ========== MÉTODOS DE NEGOCIO ==========
     def apply_credit(self, invoice_move, amount, user=None):
         """
@@ -315,12 +351,166 @@ class EcfCredit(models.Model):
         if self.state == 'void':
             return
 
-        if self.amount_available <= 0:
-            self.state = 'consumed'
-        elif self.amount_available < self.amount_total:
-            self.state = 'partial'
-        else:
-            self.state = 'available'
+        self.state = self._get_state_for_available(self.amount_available)
+
+    def _get_state_for_available(self, amount_available):
+        """Estado que corresponde a un saldo disponible (sin escribir)."""
+        self.ensure_one()
+        if self.state == 'void':
+            return 'void'
+        if amount_available <= 0:
+            return 'consumed'
+        if amount_available < self.amount_total:
+            return 'partial'
+        return 'available'
+
+    # ========== ASIGNACIÓN AUTOMÁTICA (FIFO) ==========
+    @api.model
+    def _auto_apply_to_invoices(self, invoices, user=None):
+        """
+        Aplica los créditos disponibles de los clientes a sus facturas
+        abiertas en orden FIFO, en una sola operación.
+
+        - Créditos: no vencidos, por vencimiento (sin vencimiento al final),
+          fecha de creación e id.
+        - Facturas: por fecha de vencimiento, fecha de factura e id, hasta su
+          saldo pendiente.
+        - Se asigna por (cliente, compañía, moneda) con
+          tools.credit_allocation.allocate_fifo.
+
+        Los créditos se bloquean una vez (FOR UPDATE NOWAIT, en orden de id)
+        antes de calcular la asignación. Las aplicaciones se crean en lote, con
+        una escritura por crédito y una conciliación por aplicación en el orden
+        del plan; si alguna no se puede conciliar, no se aplica nada.
+
+        Args:
+            invoices: account.move (se ignoran las que no son facturas de
+                cliente publicadas con saldo pendiente)
+            user: usuario que realiza la operación (opcional)
+
+        Returns:
+            l10n_do.ecf_credit_application: aplicaciones creadas
+        """
+        application_model = self.env['l10n_do.ecf_credit_application']
+        invoices = invoices.filtered(
+            lambda m: m.move_type == 'out_invoice' and m.state == 'posted'
+            and not m.currency_id.is_zero(m.amount_residual)
+        )
+        if not invoices:
+            return application_model
+
+        credits = self.search([
+            ('partner_id', 'in', invoices.partner_id.ids),
+            ('company_id', 'in', invoices.company_id.ids),
+            ('state', 'in', ['available', 'partial']),
+            ('amount_available', '>', 0),
+            '|', ('date_expiry', '=', False), ('date_expiry', '>=', fields.Date.context_today(self)),
+        ])
+        if not credits:
+            return application_model
+
+        # Un bloqueo por crédito, en orden de id para no interbloquear ejecuciones concurrentes
+        try:
+            with self.env.cr.savepoint():
+                self.env.cr.execute("""
+                    SELECT id FROM l10n_do_ecf_credit
+                     WHERE id = ANY(%s)
+                  ORDER BY id
+                       FOR UPDATE NOWAIT
+                """, [credits.ids])
+        except psycopg2.OperationalError:
+            raise UserError(_(
+                'Otro usuario está aplicando créditos de estos clientes. Intente de nuevo en unos segundos.'
+            ))
+        credits.invalidate_recordset(['amount_available', 'state'])
+        credits = credits.filtered(lambda c: c.state in ('available', 'partial') and c.amount_available > 0)
+
+        def _key(record):
+            return record.partner_id.id, record.company_id.id, record.currency_id.id
+
+        credits_by_key = defaultdict(list)
+        for credit in credits.sorted(lambda c: (c.date_expiry or date.max, c.date_created, c.id)):
+            credits_by_key[_key(credit)].append(credit)
+        invoices_by_key = defaultdict(list)
+        for invoice in invoices.sorted(
+                lambda m: (m.invoice_date_due or m.invoice_date or date.max, m.invoice_date or date.max, m.id)):
+            invoices_by_key[_key(invoice)].append(invoice)
+
+        plan = []
+        for key, key_invoices in invoices_by_key.items():
+            key_credits = credits_by_key.get(key)
+            if not key_credits:
+                continue
+            plan += credit_allocation.allocate_fifo(
+                [(credit.id, credit.amount_available) for credit in key_credits],
+                [(invoice.id, invoice.amount_residual) for invoice in key_invoices],
+                key_invoices[0].currency_id.round,
+            )
+        if not plan:
+            return application_model
+
+        user = user or self.env.user
+        applications = application_model.create([{
+            'credit_id': credit_id,
+            'invoice_move_id': invoice_id,
+            'amount_applied': amount,
+            'user_id': user.id,
+        } for credit_id, invoice_id, amount in plan])
+
+        applied = defaultdict(float)
+        for credit_id, _invoice_id, amount in plan:
+            applied[credit_id] += amount
+        for credit in self.browse(list(applied)):
+            remaining = credit.currency_id.round(credit.amount_available - applied[credit.id])
+            credit.write({
+                'amount_available': remaining,
+                'state': credit._get_state_for_available(remaining),
+            })
+
+        self._reconcile_applications(applications)
+        _logger.info('Créditos de NC aplicados en FIFO: %s aplicaciones en %s facturas',
+                     len(applications), len(applications.invoice_move_id))
+        return applications
+
+    @api.model
+    def _reconcile_applications(self, applications):
+        """
+        Concilia la cuenta por cobrar de la NC con la de la factura de cada
+        aplicación, en el orden de la asignación FIFO, de modo que cada NC
+        salda las facturas que le asignó el plan.
+
+        Un fallo revierte toda la operación: una aplicación sin conciliar no
+        rebaja el saldo pendiente de la factura y se volvería a asignar en la
+        siguiente ejecución.
+
+        Raises:
+            UserError: si una aplicación no se puede conciliar
+        """
+        for application in applications:
+            invoice = application.invoice_move_id
+            lines = (invoice | application.credit_id.credit_move_id).line_ids.filtered(
+                lambda l: l.account_id.account_type == 'asset_receivable' and not l.reconciled
+            )
+            groups = [
+                group_lines for group_lines in lines.grouped('account_id').values()
+                if any(l.balance > 0 for l in group_lines) and any(l.balance < 0 for l in group_lines)
+            ]
+            if not groups:
+                raise UserError(_(
+                    'No se pudo conciliar el crédito %(credit)s con la factura %(invoice)s: '
+                    'no tienen saldos abiertos en la misma cuenta por cobrar.',
+                    credit=application.credit_encf, invoice=invoice.display_name,
+                ))
+            try:
+                for group_lines in groups:
+                    group_lines.reconcile()
+            except UserError:
+                raise
+            except Exception as e:  # noqa: BLE001
+                raise UserError(_(
+                    'No se pudo conciliar el crédito %(credit)s con la factura %(invoice)s: %(error)s',
+                    credit=application.credit_encf, invoice=invoice.display_name, error=str(e),
+                )) from e
 
     def action_void(self):
         """Anula el crédito."""
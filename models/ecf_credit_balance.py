@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+import logging
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+
+class EcfCreditBalance(models.Model):
+    """
+    Saldo agregado de créditos de NC por cliente, compañía y moneda.
+
+    Se mantiene en la misma transacción que los créditos: cada creación,
+    cambio de saldo o estado (aplicación, reversión, anulación) y
+    eliminación de un l10n_do.ecf_credit suma su diferencia aquí con un
+    UPSERT. Así, consultar el saldo de un cliente es leer una fila por
+    índice, sin buscar y sumar sus créditos.
+    """
+    _name = 'l10n_do.ecf_credit_balance'
+    _description = 'Saldo de Créditos de NC por Cliente'
+    _log_access = False
+    _rec_name = 'partner_id'
+    _order = 'partner_id'
+
+    partner_id = fields.Many2one('res.partner', string='Cliente', required=True, readonly=True,
+                                 ondelete='cascade')
+    company_id = fields.Many2one('res.company', string='Compañía', required=True, readonly=True,
+                                 ondelete='cascade')
+    currency_id = fields.Many2one('res.currency', string='Moneda', required=True, readonly=True,
+                                  ondelete='cascade')
+    amount_available = fields.Monetary(string='Saldo Disponible', currency_field='currency_id', readonly=True)
+    credit_count = fields.Integer(string='Créditos Disponibles', readonly=True,
+                                  help='Créditos disponibles o parcialmente usados con saldo')
+    updated_at = fields.Datetime(string='Actualizado', readonly=True)
+
+    # Estados de crédito que aportan saldo
+    OPEN_STATES = ('available', 'partial')
+
+    def init(self):
+        self.env.cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS l10n_do_ecf_credit_balance_key_uniq
+                ON l10n_do_ecf_credit_balance (partner_id, company_id, currency_id)
+        """)
+        self._rebuild()
+
+    @api.model
+    def _rebuild(self):
+        """Recalcula todos los saldos desde los créditos (instalación o reparación)."""
+        self.env['l10n_do.ecf_credit'].flush_model(
+            ['partner_id', 'company_id', 'currency_id', 'amount_available', 'state'])
+        self.env.cr.execute("DELETE FROM l10n_do_ecf_credit_balance")
+        self.env.cr.execute("""
+            INSERT INTO l10n_do_ecf_credit_balance
+                   (partner_id, company_id, currency_id, amount_available, credit_count, updated_at)
+            SELECT partner_id, company_id, currency_id, sum(amount_available), count(*),
+                   (now() AT TIME ZONE 'UTC')
+              FROM l10n_do_ecf_credit
+             WHERE state IN %s
+               AND amount_available > 0
+               AND company_id IS NOT NULL
+               AND currency_id IS NOT NULL
+          GROUP BY partner_id, company_id, currency_id
+        """, (self.OPEN_STATES,))
+        self.invalidate_model()
+
+    @api.model
+    def _find_drift(self):
+        """
+        Compara el agregado con la suma de los créditos abiertos.
+
+        Returns:
+            list: claves (cliente, compañía, moneda) cuyo saldo o cantidad no coinciden
+        """
+        self.env['l10n_do.ecf_credit'].flush_model(
+            ['partner_id', 'company_id', 'currency_id', 'amount_available', 'state'])
+        self.env.cr.execute("""
+            WITH expected AS (
+                SELECT partner_id, company_id, currency_id,
+                       sum(amount_available) AS amount, count(*) AS cnt
+                  FROM l10n_do_ecf_credit
+                 WHERE state IN %s
+                   AND amount_available > 0
+                   AND company_id IS NOT NULL
+                   AND currency_id IS NOT NULL
+              GROUP BY partner_id, company_id, currency_id
+            )
+            SELECT coalesce(e.partner_id, b.partner_id),
+                   coalesce(e.company_id, b.company_id),
+                   coalesce(e.currency_id, b.currency_id)
+              FROM expected e
+         FULL JOIN l10n_do_ecf_credit_balance b
+                ON b.partner_id = e.partner_id
+               AND b.company_id = e.company_id
+               AND b.currency_id = e.currency_id
+             WHERE coalesce(e.amount, 0) != coalesce(b.amount_available, 0)
+                OR coalesce(e.cnt, 0) != coalesce(b.credit_count, 0)
+        """, (self.OPEN_STATES,))
+        return self.env.cr.fetchall()
+
+    @api.model
+    def _cron_check_balances(self):
+        """Cron: recalcula los saldos si el agregado se desvió de los créditos."""
+        drift = self._find_drift()
+        if not drift:
+            return
+        _logger.warning('Saldos de créditos de NC desviados en %s clientes; se recalculan. Ejemplos: %s',
+                        len(drift), drift[:10])
+        self._rebuild()
+
+    @api.model
+    def _open_values(self, credit):
+        """Clave y aporte (saldo, cantidad) de un crédito al agregado."""
+        key = (credit.partner_id.id, credit.company_id.id, credit.currency_id.id)
+        if credit.state in self.OPEN_STATES and credit.amount_available > 0:
+            return key, credit.amount_available, 1
+        return key, 0.0, 0
+
+    @api.model
+    def _snapshot(self, credits):
+        """{credit_id: (clave, saldo, cantidad)} antes de un cambio."""
+        return {credit.id: self._open_values(credit) for credit in credits}
+
+    @api.model
+    def _apply_changes(self, before, credits):
+        """
+        Suma al agregado la diferencia entre `before` (ver `_snapshot`) y el
+        estado actual de `credits`. Los créditos eliminados se pasan solo en
+        `before`.
+        """
+        deltas = {}
+        for credit_id, (key, amount, count) in before.items():
+            delta = deltas.setdefault(key, [0.0, 0])
+            delta[0] -= amount
+            delta[1] -= count
+        for credit in credits:
+            key, amount, count = self._open_values(credit)
+            delta = deltas.setdefault(key, [0.0, 0])
+            delta[0] += amount
+            delta[1] += count
+        rows = [(key, amount, count) for key, (amount, count) in deltas.items()
+                if all(key) and (amount or count)]
+        if not rows:
+            return
+        self.env.cr.execute("""
+            INSERT INTO l10n_do_ecf_credit_balance AS b
+                   (partner_id, company_id, currency_id, amount_available, credit_count, updated_at)
+            SELECT partner_id, company_id, currency_id, amount, cnt, (now() AT TIME ZONE 'UTC')
+              FROM unnest(%s::int[], %s::int[], %s::int[], %s::numeric[], %s::int[])
+                   AS d(partner_id, company_id, currency_id, amount, cnt)
+            ON CONFLICT (partner_id, company_id, currency_id) DO UPDATE
+               SET amount_available = b.amount_available + EXCLUDED.amount_available,
+                   credit_count = b.credit_count + EXCLUDED.credit_count,
+                   updated_at = EXCLUDED.updated_at
+        """, (
+            [key[0] for key, _amount, _count in rows],
+            [key[1] for key, _amount, _count in rows],
+            [key[2] for key, _amount, _count in rows],
+            [amount for _key, amount, _count in rows],
+            [count for _key, _amount, count in rows],
+        ))
+        self.invalidate_model(['amount_available', 'credit_count', 'updated_at'])
+
+    @api.model
+    def _get_balance(self, partner, company, currency):
+        """
+        Saldo disponible de créditos de NC del cliente.
+
+        Returns:
+            tuple: (saldo, cantidad de créditos disponibles)
+        """
+        self.env.cr.execute("""
+            SELECT amount_available, credit_count
+              FROM l10n_do_ecf_credit_balance
+             WHERE partner_id = %s AND company_id = %s AND currency_id = %s
+        """, (partner.id, company.id, currency.id))
+        row = self.env.cr.fetchone()
+        return (row[0], row[1]) if row else (0.0, 0)
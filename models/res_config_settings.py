@@ -1,5 +1,5 @@
 # -*- coding: utf-8 -*-
-from odoo import api, fields, models
+from odoo import _, api, fields, models
 
 
 class ResConfigSettings(models.TransientModel):
@@ -23,6 +23,139 @@ class ResConfigSettings(models.TransientModel):
         default='test',
         help='Ambiente a utilizar en el microservicio dgii-ecf'
     )
+    dgii_ecf_callback_secret = fields.Char(
+        string='Secreto de Callbacks',
+        help='Secreto compartido con el microservicio para firmar (HMAC-SHA256) los callbacks de '
+             'estado en /dgii_ecf/status_callback. Vacío desactiva el endpoint.'
+    )
+    dgii_ecf_http_pool_size = fields.Integer(
+        string='Conexiones HTTP por Host',
+        default=10,
+        help='Conexiones keep-alive que cada proceso mantiene abiertas hacia el microservicio'
+    )
+    dgii_ecf_breaker_failure_threshold = fields.Integer(
+        string='Fallos para Abrir Circuito',
+        default=5,
+        help='Fallos consecutivos (timeouts, errores de conexión, HTTP 5xx/429) tras los que '
+             'las peticiones al endpoint fallan de inmediato'
+    )
+    dgii_ecf_breaker_cooldown = fields.Integer(
+        string='Espera del Circuito (s)',
+        default=60,
+        help='Segundos que el circuito permanece abierto antes de una petición de prueba'
+    )
+    dgii_ecf_rate_limit_send = fields.Float(
+        string='Envíos por Segundo',
+        default=10,
+        help='Tasa máxima de envíos por proceso; se reduce automáticamente si el servicio se degrada'
+    )
+    dgii_ecf_auto_send_on_post = fields.Boolean(
+        string='Enviar al Confirmar',
+        help='Encola automáticamente el envío a DGII de cada factura al confirmarse (después del commit)'
+    )
+    dgii_ecf_batch_send_enabled = fields.Boolean(
+        string='Envío en Lote',
+        help='La cola envía varios e-CF por petición al endpoint /invoice/send-batch del microservicio'
+    )
+    dgii_ecf_batch_send_size = fields.Integer(
+        string='e-CF por Petición',
+        default=50,
+        help='Cantidad máxima de e-CF incluidos en cada petición de lote'
+    )
+    dgii_ecf_queue_batch_size = fields.Integer(
+        string='Tamaño de Lote (Cola)',
+        default=20,
+        help='Cantidad de envíos que reclama cada worker de la cola por lote'
+    )
+    dgii_ecf_queue_workers = fields.Integer(
+        string='Envíos Paralelos (Cola)',
+        default=4,
+        help='Cantidad de envíos simultáneos por worker de la cola'
+    )
+
+    dgii_ecf_queue_max_attempts = fields.Integer(
+        string='Intentos Máximos',
+        default=6,
+        help='Intentos ante fallos transitorios antes de pasar el envío a la cola de fallidos'
+    )
+    dgii_ecf_retry_backoff_base = fields.Integer(
+        string='Espera Inicial de Reintento (s)',
+        default=60,
+        help='Espera antes del primer reintento; se duplica en cada intento (con jitter)'
+    )
+
+    dgii_ecf_contingency_mode = fields.Boolean(
+        string='Modo Contingencia',
+        help='Emitir sin conexión: los e-CF se validan y encolan con su payload congelado y se '
+             'envían en orden de e-NCF al desactivar el modo. Se activa solo mientras el '
+             'circuito de envío está abierto.'
+    )
+    dgii_ecf_contingency_drain_rate = fields.Float(
+        string='Envíos por Segundo (Drenaje)',
+        default=20,
+        help='Tasa máxima al enviar el backlog acumulado en contingencia'
+    )
+
+    dgii_ecf_rnc_registry_url = fields.Char(
+        string='URL del Padrón RNC',
+        help='Archivo de contribuyentes de DGII (ZIP o TXT) importado diariamente al padrón local'
+    )
+
+    dgii_ecf_lookup_cache_ttl = fields.Integer(
+        string='Vigencia de Caché (s)',
+        default=86400,
+        help='Tiempo que se reutiliza una consulta de RNC o del directorio e-CF con resultado'
+    )
+    dgii_ecf_lookup_cache_negative_ttl = fields.Integer(
+        string='Vigencia de "No Encontrado" (s)',
+        default=3600,
+        help='Tiempo que se reutiliza una consulta sin resultado (RNC no inscrito, fuera del directorio)'
+    )
+
+    dgii_ecf_rnc_whitelist = fields.Char(
+        string='RNC/Cédulas Permitidos',
+        help='Números (separados por coma) aceptados aunque su dígito verificador no cuadre'
+    )
+    dgii_ecf_rnc_known_invalid = fields.Char(
+        string='RNC/Cédulas No Válidos',
+        help='Números (separados por coma) rechazados sin consultar aunque su dígito verificador cuadre'
+    )
+
+    dgii_ecf_directory_api_key = fields.Char(
+        string='API Key del Directorio e-CF',
+        help='Clave enviada en X-API-Key al consultar el directorio de facturadores electrónicos. '
+             'Vacía, no se consulta ni se actualiza el directorio'
+    )
+    dgii_ecf_directory_refresh_days = fields.Integer(
+        string='Vigencia del Directorio (días)',
+        default=7,
+        help='Días tras los cuales el cron vuelve a consultar el directorio e-CF de un cliente facturado'
+    )
+
+    dgii_ecf_rnc_validation_chunk_size = fields.Integer(
+        string='Contactos por Bloque',
+        default=200,
+        help='Contactos validados por transacción en la validación masiva de RNC'
+    )
+    dgii_ecf_rnc_validation_workers = fields.Integer(
+        string='Consultas Paralelas',
+        default=4,
+        help='Hilos de consulta simultáneos en la validación masiva de RNC'
+    )
+
+    def action_dgii_import_rnc_registry(self):
+        """Programa la importación inmediata del padrón de contribuyentes."""
+        self.env.ref('odoo_dgii_ecf.ir_cron_import_dgii_rnc_registry')._trigger()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _('Padrón de Contribuyentes'),
+                'message': _('La importación del padrón se ejecutará en segundo plano.'),
+                'type': 'info',
+                'sticky': False,
+            }
+        }
 
     def set_values(self):
         super().set_values()
@@ -30,6 +163,29 @@ class ResConfigSettings(models.TransientModel):
         params.set_param('dgii_ecf.api_base_url', self.dgii_ecf_api_base_url or '')
         params.set_param('dgii_ecf.api_key', self.dgii_ecf_api_key or '')
         params.set_param('dgii_ecf.environment', self.dgii_ecf_environment or 'test')
+        params.set_param('dgii_ecf.callback_secret', self.dgii_ecf_callback_secret or '')
+        params.set_param('dgii_ecf.http_pool_size', self.dgii_ecf_http_pool_size or 10)
+        params.set_param('dgii_ecf.breaker_failure_threshold', self.dgii_ecf_breaker_failure_threshold or 5)
+        params.set_param('dgii_ecf.breaker_cooldown', self.dgii_ecf_breaker_cooldown or 60)
+        params.set_param('dgii_ecf.rate_limit_send', self.dgii_ecf_rate_limit_send or 10)
+        params.set_param('dgii_ecf.auto_send_on_post', self.dgii_ecf_auto_send_on_post)
+        params.set_param('dgii_ecf.batch_send_enabled', self.dgii_ecf_batch_send_enabled)
+        params.set_param('dgii_ecf.batch_send_size', self.dgii_ecf_batch_send_size or 50)
+        params.set_param('dgii_ecf.queue_batch_size', self.dgii_ecf_queue_batch_size or 20)
+        params.set_param('dgii_ecf.queue_workers', self.dgii_ecf_queue_workers or 4)
+        params.set_param('dgii_ecf.contingency_mode', self.dgii_ecf_contingency_mode)
+        params.set_param('dgii_ecf.contingency_drain_rate', self.dgii_ecf_contingency_drain_rate or 20)
+        params.set_param('dgii_ecf.queue_max_attempts', self.dgii_ecf_queue_max_attempts or 6)
+        params.set_param('dgii_ecf.retry_backoff_base', self.dgii_ecf_retry_backoff_base or 60)
+        params.set_param('dgii_ecf.rnc_registry_url', self.dgii_ecf_rnc_registry_url or '')
+        params.set_param('dgii_ecf.lookup_cache_ttl', self.dgii_ecf_lookup_cache_ttl)
+        params.set_param('dgii_ecf.lookup_cache_negative_ttl', self.dgii_ecf_lookup_cache_negative_ttl)
+        params.set_param('dgii_ecf.rnc_whitelist', self.dgii_ecf_rnc_whitelist or '')
+        params.set_param('dgii_ecf.rnc_known_invalid', self.dgii_ecf_rnc_known_invalid or '')
+        params.set_param('dgii_ecf.directory_api_key', self.dgii_ecf_directory_api_key or '')
+        params.set_param('dgii_ecf.directory_refresh_days', self.dgii_ecf_directory_refresh_days or 7)
+        params.set_param('dgii_ecf.rnc_validation_chunk_size', self.dgii_ecf_rnc_validation_chunk_size or 200)
+        params.set_param('dgii_ecf.rnc_validation_workers', self.dgii_ecf_rnc_validation_workers or 4)
 
     @api.model
     def get_values(self):
@@ -39,5 +195,28 @@ class ResConfigSettings(models.TransientModel):
             dgii_ecf_api_base_url=params.get_param('dgii_ecf.api_base_url', default=''),
             dgii_ecf_api_key=params.get_param('dgii_ecf.api_key', default=''),
             dgii_ecf_environment=params.get_param('dgii_ecf.environment', default='test'),
+            dgii_ecf_callback_secret=params.get_param('dgii_ecf.callback_secret', default=''),
+            dgii_ecf_http_pool_size=int(params.get_param('dgii_ecf.http_pool_size', default=10)),
+            dgii_ecf_breaker_failure_threshold=int(params.get_param('dgii_ecf.breaker_failure_threshold', default=5)),
+            dgii_ecf_breaker_cooldown=int(params.get_param('dgii_ecf.breaker_cooldown', default=60)),
+            dgii_ecf_rate_limit_send=float(params.get_param('dgii_ecf.rate_limit_send', default=10)),
+            dgii_ecf_auto_send_on_post=params.get_param('dgii_ecf.auto_send_on_post', default='False') == 'True',
+            dgii_ecf_batch_send_enabled=params.get_param('dgii_ecf.batch_send_enabled', default='False') == 'True',
+            dgii_ecf_batch_send_size=int(params.get_param('dgii_ecf.batch_send_size', default=50)),
+            dgii_ecf_queue_batch_size=int(params.get_param('dgii_ecf.queue_batch_size', default=20)),
+            dgii_ecf_queue_workers=int(params.get_param('dgii_ecf.queue_workers', default=4)),
+            dgii_ecf_contingency_mode=params.get_param('dgii_ecf.contingency_mode', default='False') == 'True',
+            dgii_ecf_contingency_drain_rate=float(params.get_param('dgii_ecf.contingency_drain_rate', default=20)),
+            dgii_ecf_queue_max_attempts=int(params.get_param('dgii_ecf.queue_max_attempts', default=6)),
+            dgii_ecf_retry_backoff_base=int(params.get_param('dgii_ecf.retry_backoff_base', default=60)),
+            dgii_ecf_rnc_registry_url=params.get_param('dgii_ecf.rnc_registry_url', default=''),
+            dgii_ecf_lookup_cache_ttl=int(params.get_param('dgii_ecf.lookup_cache_ttl', default=86400)),
+            dgii_ecf_lookup_cache_negative_ttl=int(params.get_param('dgii_ecf.lookup_cache_negative_ttl', default=3600)),
+            dgii_ecf_rnc_whitelist=params.get_param('dgii_ecf.rnc_whitelist', default=''),
+            dgii_ecf_rnc_known_invalid=params.get_param('dgii_ecf.rnc_known_invalid', default=''),
+            dgii_ecf_directory_api_key=params.get_param('dgii_ecf.directory_api_key', default=''),
+            dgii_ecf_directory_refresh_days=int(params.get_param('dgii_ecf.directory_refresh_days', default=7)),
+            dgii_ecf_rnc_validation_chunk_size=int(params.get_param('dgii_ecf.rnc_validation_chunk_size', default=200)),
+            dgii_ecf_rnc_validation_workers=int(params.get_param('dgii_ecf.rnc_validation_workers', default=4)),
         )
         return res
@@ -2,17 +2,33 @@
 import logging
 import requests
 import re
+import time
+from datetime import timedelta
+
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError, ValidationError
+from odoo.fields import Domain
+from odoo.tools.sql import column_exists, create_column
+
+from ..tools import rnc_validator
 
 _logger = logging.getLogger(__name__)
 
 
+class RncNotRegisteredError(Exception):
+    """El RNC/Cédula consultado no está inscrito como contribuyente en DGII."""
+
+
+class RncInvalidError(RncNotRegisteredError):
+    """El RNC/Cédula no pasa la validación local (longitud o dígito verificador)."""
+
+
 class ResPartner(models.Model):
     """Extensión del modelo res.partner para validación de RNC mediante API externa."""
     _inherit = 'res.partner'
 
     # Hacer el campo name no obligatorio cuando hay RNC
+    # (índice trigram para búsquedas por fragmento del nombre)
     name = fields.Char(required=False)
 
     # ========== CAMPOS DGII ==========
@@ -63,6 +79,23 @@ class ResPartner(models.Model):
         help='Fecha y hora de la última validación del RNC'
     )
 
+    x_dgii_padron_cambiado = fields.Boolean(
+        string='Cambios en Padrón DGII',
+        readonly=True,
+        copy=False,
+        help='El nombre o el estado del contribuyente cambió en el padrón de DGII (o fue dado de baja) '
+             'desde la última validación. Se desmarca al validar de nuevo el RNC.'
+    )
+
+    x_vat_digits = fields.Char(
+        string='RNC/Cédula (Dígitos)',
+        compute='_compute_x_vat_digits',
+        store=True,
+        index=True,
+        unaccent=False,
+        help='RNC/Cédula sin guiones ni espacios, indexado para búsquedas por número completo o parcial'
+    )
+
     x_tipo_contribuyente = fields.Selection(
         selection=[
             ('consumo_final', 'Consumidor Final'),
@@ -131,6 +164,52 @@ class ResPartner(models.Model):
         help='Fecha y hora de la última consulta al directorio de facturadores electrónicos'
     )
 
+    def _auto_init(self):
+        # Llenar la columna por SQL en la instalación, sin recomputar millones de contactos en Python
+        if not column_exists(self.env.cr, 'res_partner', 'x_vat_digits'):
+            create_column(self.env.cr, 'res_partner', 'x_vat_digits', 'varchar')
+            self.env.cr.execute("""
+                UPDATE res_partner
+                   SET x_vat_digits = NULLIF(regexp_replace(vat, '[^0-9]', '', 'g'), '')
+                 WHERE vat IS NOT NULL
+            """)
+        return super()._auto_init()
+
+    def init(self):
+        super().init()
+        # Además del btree (igualdad), trigram para números y nombres parciales.
+        # El nombre lleva su propio índice: res_partner__name_index ya existe
+        # como btree del core y un index='trigram' en el campo no lo reemplaza.
+        if self.env.registry.has_trigram:
+            self.env.cr.execute("""
+                CREATE INDEX IF NOT EXISTS res_partner_x_vat_digits_trgm_idx
+                    ON res_partner USING gin (x_vat_digits gin_trgm_ops)
+            """)
+            self.env.cr.execute("""
+                CREATE INDEX IF NOT EXISTS res_partner_name_trgm_idx
+                    ON res_partner USING gin (name gin_trgm_ops)
+            """)
+
+    @api.depends('vat')
+    def _compute_x_vat_digits(self):
+        for partner in self:
+            partner.x_vat_digits = self._normalize_rnc(partner.vat) or False
+
+    @api.model
+    def _search_display_name(self, operator, value):
+        """
+        Búsqueda por RNC/Cédula en cualquier formato: si el texto son solo
+        dígitos, guiones y espacios, además de la búsqueda estándar (nombre
+        completo, email, referencia, VAT) se busca en x_vat_digits con índice.
+        """
+        domain = super()._search_display_name(operator, value)
+        if operator in ('ilike', 'like', '=', '=ilike') and isinstance(value, str):
+            digits = self._normalize_rnc(value)
+            if len(digits) >= 3 and not re.sub(r'[\d\s\-]', '', value):
+                vat_operator = '=' if operator in ('=', '=ilike') else 'like'
+                return Domain.OR([domain, [('x_vat_digits', vat_operator, digits)]])
+        return domain
+
     # ========== VALIDACIONES ==========
     @api.constrains('name', 'vat')
     def _check_name_or_vat(self):
@@ -146,7 +225,7 @@ class ResPartner(models.Model):
     def _onchange_name_detect_rnc(self):
         """
         Detecta si el usuario escribe un RNC/Cédula en el campo nombre
-        y automáticamente busca en DGII para autocompletar.
+        y autocompleta desde el padrón local o la caché (sin esperar a DGII).
         """
         if not self.name or self.x_rnc_validado:
             return
@@ -166,15 +245,7 @@ class ResPartner(models.Model):
             if len(chars_no_digits) == 0:  # Solo tenía números, guiones o espacios
                 # Mover el RNC al campo VAT
                 self.vat = rnc_normalized
-                # Poner nombre temporal
-                self.name = f'Buscando RNC: {rnc_normalized}...'
-                # Intentar buscar automáticamente
-                try:
-                    response = self._call_rnc_api(rnc_normalized)
-                    self._process_rnc_response_onchange(response, rnc_normalized)
-                except Exception:
-                    # Si falla la API, dejar el nombre temporal
-                    self.name = f'RNC: {rnc_normalized}'
+                return self._autocomplete_rnc_onchange(rnc_normalized)
 
     @api.onchange('vat')
     def _onchange_vat_autofill_name(self):
@@ -193,13 +264,48 @@ class ResPartner(models.Model):
                 # Normalizar el RNC para mostrarlo limpio
                 rnc_limpio = self._normalize_rnc(self.vat)
                 if rnc_limpio:
-                    # Intentar buscar automáticamente
-                    try:
-                        response = self._call_rnc_api(rnc_limpio)
-                        self._process_rnc_response_onchange(response, rnc_limpio)
-                    except Exception:
-                        # Si falla, poner nombre temporal
-                        self.name = f'RNC: {rnc_limpio}'
+                    return self._autocomplete_rnc_onchange(rnc_limpio)
+
+    def _lookup_rnc_local(self, rnc):
+        """
+        Consulta el RNC solo en el padrón local y la caché, sin llamadas de red.
+
+        Returns:
+            tuple: (estado, datos) con estado 'found', 'not_found' o None si no
+                hay información local
+        """
+        registry_data = self.env['dgii.rnc.registry'].sudo()._lookup(rnc)
+        if registry_data:
+            return 'found', registry_data
+        hit, cached = self.env['dgii.lookup.cache'].sudo()._get('rnc', rnc)
+        if not hit:
+            return None, None
+        return ('found', cached) if cached is not None else ('not_found', None)
+
+    def _autocomplete_rnc_onchange(self, rnc):
+        """
+        Autocompleta el formulario con datos locales. Si no los hay, deja un
+        nombre temporal y encola la consulta a DGII; el resultado llega al
+        usuario por notificación y los datos se completan al guardar.
+        Los números que no pasan la validación local no se consultan.
+        """
+        reason = self._check_rnc_number(rnc)
+        if reason:
+            self.name = f'RNC: {rnc}'
+            if reason == rnc_validator.REASON_LENGTH:
+                return None
+            return {'warning': {
+                'title': _('RNC/Cédula no válido'),
+                'message': self._rnc_invalid_message(rnc, reason),
+            }}
+        status, response = self._lookup_rnc_local(rnc)
+        if status == 'found':
+            self._process_rnc_response_onchange(response, rnc)
+        elif status is None:
+            self.name = f'Buscando RNC: {rnc}...'
+            self.env['dgii.rnc.lookup.request'].sudo()._request(rnc)
+        else:
+            self.name = f'RNC: {rnc}'
 
     # ========== MÉTODOS DE VALIDACIÓN RNC ==========
     def _normalize_rnc(self, rnc):
@@ -217,6 +323,68 @@ class ResPartner(models.Model):
         # Eliminar guiones, espacios y caracteres especiales
         return re.sub(r'[^0-9]', '', rnc)
 
+    @api.model
+    def _get_rnc_validation_lists(self):
+        """
+        Listas configurables de la validación local.
+
+        Returns:
+            tuple: (no_validos, permitidos) como frozenset de números normalizados
+        """
+        params = self.env['ir.config_parameter'].sudo()
+
+        def _parse(key):
+            return frozenset(filter(None, (
+                self._normalize_rnc(value)
+                for value in (params.get_param(key) or '').replace('\n', ',').split(',')
+            )))
+
+        known_invalid = rnc_validator.DEFAULT_KNOWN_INVALID | _parse('dgii_ecf.rnc_known_invalid')
+        whitelist = rnc_validator.DEFAULT_WHITELIST | _parse('dgii_ecf.rnc_whitelist')
+        return known_invalid, whitelist
+
+    @api.model
+    def _check_rnc_numbers(self, rncs):
+        """
+        Valida localmente una lista de RNC/Cédulas normalizados (longitud,
+        dígito verificador y listas configuradas), sin consultas remotas.
+
+        Un dígito verificador incorrecto solo se rechaza si el número tampoco
+        está en el padrón local ni como encontrado en la caché: DGII/JCE han
+        emitido números reales que no cumplen el algoritmo.
+
+        Returns:
+            list: motivo de rechazo (rnc_validator.REASON_*) o None por cada número
+        """
+        known_invalid, whitelist = self._get_rnc_validation_lists()
+        reasons = rnc_validator.validate_many(rncs, known_invalid, whitelist)
+        suspects = {rnc for rnc, reason in zip(rncs, reasons) if reason == rnc_validator.REASON_CHECK_DIGIT}
+        if not suspects:
+            return reasons
+        confirmed = self.env['dgii.rnc.registry'].sudo()._existing_rncs(suspects)
+        cache = self.env['dgii.lookup.cache'].sudo()
+        for rnc in suspects - confirmed:
+            hit, cached = cache._get('rnc', rnc)
+            if hit and cached is not None:
+                confirmed.add(rnc)
+        return [None if rnc in confirmed else reason for rnc, reason in zip(rncs, reasons)]
+
+    @api.model
+    def _check_rnc_number(self, rnc):
+        return self._check_rnc_numbers([rnc])[0]
+
+    @api.model
+    def _rnc_invalid_message(self, rnc, reason):
+        messages = {
+            rnc_validator.REASON_EMPTY: _('El RNC/Cédula está vacío.'),
+            rnc_validator.REASON_DIGITS: _('El RNC/Cédula "%s" contiene caracteres que no son dígitos.'),
+            rnc_validator.REASON_LENGTH: _('El RNC/Cédula "%s" debe tener 9 dígitos (RNC) u 11 dígitos (Cédula).'),
+            rnc_validator.REASON_KNOWN_INVALID: _('El RNC/Cédula "%s" está en la lista de números no válidos.'),
+            rnc_validator.REASON_CHECK_DIGIT: _('El dígito verificador del RNC/Cédula "%s" no es correcto.'),
+        }
+        message = messages.get(reason, messages[rnc_validator.REASON_CHECK_DIGIT])
+        return message % rnc if '%s' in message else message
+
     def action_validate_rnc(self):
         """
         Acción del botón para validar y autocompletar datos del RNC
@@ -237,6 +405,13 @@ class ResPartner(models.Model):
                 'El RNC o Cédula ingresado no es válido.'
             ))
 
+        reason = self._check_rnc_number(rnc_normalized)
+        if reason:
+            raise UserError(self._rnc_invalid_message(rnc_normalized, reason))
+
+        # Validación explícita: descartar consultas en caché de este RNC
+        self.env['dgii.lookup.cache'].sudo()._invalidate([rnc_normalized])
+
         # Llamar a la API
         try:
             response = self._call_rnc_api(rnc_normalized)
@@ -275,9 +450,33 @@ class ResPartner(models.Model):
             }
         }
 
+    def action_validate_rnc_batch(self):
+        """Crea un trabajo de validación masiva de RNC para los contactos seleccionados."""
+        job = self.env['dgii.rnc.validation.job'].sudo()._create_for_partners(self)
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': 'dgii.rnc.validation.job',
+            'res_id': job.id,
+            'view_mode': 'form',
+            'target': 'current',
+        }
+
+    def _rnc_not_registered_error(self, rnc):
+        """Error para un RNC/Cédula no inscrito como contribuyente."""
+        return RncNotRegisteredError(_(
+            'El RNC/Cédula "%s" no está inscrito como contribuyente en DGII.\n\n'
+            'Por favor verifique:\n'
+            '• Que el número esté correcto\n'
+            '• Que el contribuyente esté registrado en DGII\n'
+            '• Que sea un RNC/Cédula válido'
+        ) % rnc)
+
     def _call_rnc_api(self, rnc):
         """
-        Realiza la llamada a la API de Megaplus para consultar el RNC.
+        Consulta el RNC en el padrón local de DGII (dgii.rnc.registry) y, si no
+        está, en la API de Megaplus. Las respuestas de la API (incluido "no
+        inscrito") se guardan en dgii.lookup.cache. Los números que no pasan
+        la validación local se rechazan sin consultar.
 
         Args:
             rnc (str): RNC normalizado a consultar
@@ -286,13 +485,30 @@ class ResPartner(models.Model):
             dict: Respuesta de la API en formato JSON
 
         Raises:
+            RncInvalidError: Si el número no pasa la validación local
             Exception: Si hay error en la llamada a la API
         """
+        reason = self._check_rnc_number(rnc)
+        if reason:
+            raise RncInvalidError(self._rnc_invalid_message(rnc, reason))
+
+        # Padrón local: sin salir a internet
+        registry_data = self.env['dgii.rnc.registry'].sudo()._lookup(rnc)
+        if registry_data:
+            return registry_data
+
+        cache = self.env['dgii.lookup.cache'].sudo()
+        hit, cached = cache._get('rnc', rnc)
+        if hit:
+            if cached is None:
+                raise self._rnc_not_registered_error(rnc)
+            return cached
+
         api_url = 'https://rnc.megaplus.com.do/api/consulta'
         params = {'rnc': rnc}
 
         try:
-            response = requests.get(api_url, params=params, timeout=10)
+            response = self.env['dgii.http.client']._request('rnc', 'get', api_url, params=params)
 
             # Intentar parsear JSON antes de verificar status
             try:
@@ -306,17 +522,13 @@ class ResPartner(models.Model):
                 codigo = data.get('codigo_http', response.status_code)
 
                 if codigo == 404:
-                    raise Exception(_(
-                        'El RNC/Cédula "%s" no está inscrito como contribuyente en DGII.\n\n'
-                        'Por favor verifique:\n'
-                        '• Que el número esté correcto\n'
-                        '• Que el contribuyente esté registrado en DGII\n'
-                        '• Que sea un RNC/Cédula válido'
-                    ) % rnc)
+                    cache._put('rnc', rnc, None)
+                    raise self._rnc_not_registered_error(rnc)
                 else:
                     raise Exception(_('Error de la API DGII: %s (Código: %s)') % (mensaje, codigo))
 
             # Si todo está bien, devolver los datos
+            cache._put('rnc', rnc, data)
             return data
 
         except requests.exceptions.Timeout:
@@ -326,35 +538,57 @@ class ResPartner(models.Model):
         except requests.exceptions.RequestException as e:
             raise Exception(_('Error al consultar RNC: %s') % str(e))
 
-    def _call_customer_directory_api(self, rnc, environment='prod'):
+    @api.model
+    def _get_directory_api_key(self):
+        """Clave X-API-Key del servicio de directorio (dgii_ecf.directory_api_key), o vacío."""
+        return self.env['ir.config_parameter'].sudo().get_param('dgii_ecf.directory_api_key') or ''
+
+    def _call_customer_directory_api(self, rnc, environment='prod', raise_on_error=False):
         """
         Consulta el directorio de clientes de facturación electrónica de DGII.
         Obtiene las URLs de recepción, aceptación y opcional del contribuyente.
+        Las respuestas (incluido "no registrado") se guardan en dgii.lookup.cache.
 
         Args:
             rnc (str): RNC normalizado a consultar
             environment (str): Ambiente de consulta ('prod' o 'test')
+            raise_on_error (bool): propagar los errores en vez de retornar None,
+                para distinguir "no registrado" de "no se pudo consultar"
 
         Returns:
             dict: Respuesta de la API con URLs del directorio o None si no está registrado
 
         Raises:
-            Exception: Si hay error en la llamada a la API
+            Exception: Si hay error en la llamada a la API (solo con raise_on_error)
         """
+        if self._check_rnc_number(rnc):
+            return None
+
+        cache = self.env['dgii.lookup.cache'].sudo()
+        hit, cached = cache._get('directory', rnc, environment)
+        if hit:
+            return cached
+
+        api_key = self._get_directory_api_key()
+        if not api_key:
+            _logger.info('Directorio e-CF sin clave (dgii_ecf.directory_api_key): se omite la consulta de %s', rnc)
+            if raise_on_error:
+                raise Exception(_('Configure la clave del servicio de directorio e-CF en Ajustes → DGII e-CF.'))
+            return None
+
         api_url = f'https://dgii.ithesk.com/api/invoice/customer-directory/{rnc}'
         params = {'environment': environment}
-        headers = {
-            'X-API-Key': 'development_api_key_123',
-            'Accept': 'application/json',
-        }
+        headers = {'Accept': 'application/json', 'X-API-Key': api_key}
 
         try:
             _logger.info(f"Consultando directorio e-CF para RNC: {rnc}")
-            response = requests.get(api_url, params=params, headers=headers, timeout=15)
+            response = self.env['dgii.http.client']._request(
+                'directory', 'get', api_url, params=params, headers=headers)
 
             # Si el cliente no está en el directorio (404), retornar None
             if response.status_code == 404:
                 _logger.info(f"RNC {rnc} no está registrado en el directorio de facturadores electrónicos")
+                cache._put('directory', rnc, None, environment)
                 return None
 
             # Intentar parsear JSON
@@ -362,36 +596,176 @@ class ResPartner(models.Model):
                 data = response.json()
             except ValueError:
                 _logger.warning(f"Respuesta del directorio no es JSON válido: {response.text[:200]}")
+                if raise_on_error:
+                    raise Exception(_('La respuesta del directorio e-CF no es un JSON válido.'))
                 return None
 
             # Verificar si hay error en la respuesta
             if data.get('error') is True or data.get('success') is False:
                 mensaje = data.get('message', data.get('mensaje', 'Error desconocido'))
                 _logger.warning(f"Error en directorio e-CF: {mensaje}")
+                if raise_on_error:
+                    raise Exception(_('Error del directorio e-CF: %s') % mensaje)
                 return None
 
             _logger.info(f"Respuesta directorio e-CF para RNC {rnc}: {data}")
+            cache._put('directory', rnc, data, environment)
             return data
 
         except requests.exceptions.Timeout:
             _logger.warning(f"Timeout consultando directorio e-CF para RNC: {rnc}")
+            if raise_on_error:
+                raise
             return None
         except requests.exceptions.ConnectionError:
             _logger.warning(f"Error de conexión consultando directorio e-CF para RNC: {rnc}")
+            if raise_on_error:
+                raise
             return None
         except requests.exceptions.RequestException as e:
             _logger.warning(f"Error consultando directorio e-CF: {e}")
+            if raise_on_error:
+                raise
             return None
 
-    def _process_directory_response(self, response):
+    # ========== ACTUALIZACIÓN PROGRAMADA DEL DIRECTORIO E-CF ==========
+    @api.model
+    def _get_directory_refresh_candidates(self, limit, exclude_ids=()):
         """
-        Procesa la respuesta del directorio de clientes y actualiza los campos.
+        Contactos facturados recientemente cuyo directorio e-CF está vencido.
+
+        La prioridad combina volumen y antigüedad: facturas publicadas en los
+        últimos `dgii_ecf.directory_refresh_window_days` días multiplicadas por
+        los días desde la última consulta (los nunca consultados primero).
+
+        Args:
+            limit (int): contactos a retornar
+            exclude_ids (iterable): contactos a omitir (con error en esta ejecución)
+
+        Returns:
+            list: [(partner_id, vat)] en orden de prioridad
+        """
+        params = self.env['ir.config_parameter'].sudo()
+        max_age_days = max(int(params.get_param('dgii_ecf.directory_refresh_days', 7)), 1)
+        window_days = max(int(params.get_param('dgii_ecf.directory_refresh_window_days', 90)), 1)
+        today = fields.Date.context_today(self)
+        self.env.cr.execute("""
+            SELECT p.id, p.vat
+              FROM res_partner p
+              JOIN (SELECT commercial_partner_id AS partner_id, count(*) AS volume
+                      FROM account_move
+                     WHERE move_type IN ('out_invoice', 'out_refund')
+                       AND state = 'posted'
+                       AND invoice_date >= %s
+                  GROUP BY commercial_partner_id) m ON m.partner_id = p.id
+             WHERE p.active
+               AND p.vat IS NOT NULL
+               AND p.id != ALL(%s)
+               AND (p.x_dgii_directorio_ultima_actualizacion IS NULL
+                    OR p.x_dgii_directorio_ultima_actualizacion
+                       < (now() AT TIME ZONE 'UTC') - make_interval(days => %s))
+          ORDER BY p.x_dgii_directorio_ultima_actualizacion IS NOT NULL,
+                   m.volume * EXTRACT(EPOCH FROM (now() AT TIME ZONE 'UTC')
+                                                 - p.x_dgii_directorio_ultima_actualizacion) DESC,
+                   m.volume DESC,
+                   p.id
+             LIMIT %s
+        """, (today - timedelta(days=window_days), list(exclude_ids), max_age_days, limit))
+        return self.env.cr.fetchall()
+
+    @api.model
+    def _refresh_directory_batch(self, candidates):
+        """
+        Consulta el directorio e-CF de un lote de contactos (una consulta por
+        RNC distinto) y escribe los resultados agrupados por valores iguales.
+
+        Returns:
+            dict: {'updated': n, 'not_found': n, 'error': n, 'failed_ids': [ids con error]}
+        """
+        partners_by_rnc = {}
+        for partner_id, vat in candidates:
+            partners_by_rnc.setdefault(self._normalize_rnc(vat), []).append(partner_id)
+
+        now = fields.Datetime.now()
+        # Sin directorio (o RNC no válido): se marca la consulta para no repetirla hasta que venza
+        not_found_vals = {
+            'x_dgii_directorio_validado': False,
+            'x_dgii_directorio_ultima_actualizacion': now,
+        }
+        rncs = list(partners_by_rnc)
+        reasons = dict(zip(rncs, self._check_rnc_numbers(rncs)))
+        self.env['dgii.lookup.cache'].sudo()._invalidate(
+            [rnc for rnc in rncs if not reasons[rnc]], kind='directory')
+
+        counts = {'updated': 0, 'not_found': 0, 'error': 0, 'failed_ids': []}
+        writes = {}
+        for rnc, partner_ids in partners_by_rnc.items():
+            if reasons[rnc]:
+                vals = not_found_vals
+            else:
+                try:
+                    response = self._call_customer_directory_api(rnc, raise_on_error=True)
+                except Exception as exc:  # noqa: BLE001
+                    _logger.warning('Actualización de directorio e-CF: error con RNC %s: %s', rnc, exc)
+                    counts['error'] += len(partner_ids)
+                    counts['failed_ids'] += partner_ids
+                    continue
+                vals = self._prepare_directory_vals(response) or not_found_vals
+            counts['updated' if vals is not not_found_vals else 'not_found'] += len(partner_ids)
+            key = tuple(sorted(vals.items()))
+            writes.setdefault(key, (vals, []))[1].extend(partner_ids)
+
+        for vals, partner_ids in writes.values():
+            self.browse(partner_ids).with_context(tracking_disable=True).write(vals)
+        return counts
+
+    @api.model
+    def _cron_refresh_directory(self, time_budget=None):
+        """
+        Cron: actualiza el directorio e-CF de los contactos facturados, por
+        lotes de `dgii_ecf.directory_refresh_batch_size` con commit por lote,
+        hasta agotar `dgii_ecf.cron_time_budget` segundos; si quedan contactos
+        vencidos se reprograma. Sin `dgii_ecf.directory_api_key` no hace nada.
+        """
+        if not self._get_directory_api_key():
+            _logger.warning('Directorio e-CF sin clave (dgii_ecf.directory_api_key): se omite la actualización')
+            return
+        if time_budget is None:
+            time_budget = self.env['dgii.send.queue']._get_cron_time_budget()
+        batch_size = max(int(self.env['ir.config_parameter'].sudo().get_param(
+            'dgii_ecf.directory_refresh_batch_size', 50)), 1)
+        deadline = time.monotonic() + time_budget
+        totals = {'updated': 0, 'not_found': 0, 'error': 0}
+        failed_ids = set()
+        while True:
+            if time.monotonic() >= deadline:
+                self.env.ref('odoo_dgii_ecf.ir_cron_refresh_dgii_directory')._trigger()
+                break
+            # Los contactos con error conservan su fecha: se omiten hasta la próxima ejecución
+            candidates = self._get_directory_refresh_candidates(batch_size, failed_ids)
+            if not candidates:
+                break
+            counts = self._refresh_directory_batch(candidates)
+            self.env.cr.commit()
+            failed_ids.update(counts.pop('failed_ids'))
+            for key, value in counts.items():
+                totals[key] += value
+        _logger.info('Directorio e-CF actualizado: %(updated)s con URLs, %(not_found)s sin directorio, '
+                     '%(error)s con error', totals)
+
+    @api.model
+    def _prepare_directory_vals(self, response):
+        """
+        Valores a escribir a partir de la respuesta del directorio de clientes.
 
         Args:
             response (dict): Respuesta de la API del directorio
+
+        Returns:
+            dict: valores para write (vacío si no hay respuesta)
         """
         if not response:
-            return
+            return {}
 
         vals = {
             'x_dgii_directorio_validado': True,
@@ -421,19 +795,33 @@ class ResPartner(models.Model):
         if data.get('facturadorElectronico') or data.get('facturador_electronico'):
             vals['x_facturador_electronico'] = 'SI'
 
+        return vals
+
+    def _process_directory_response(self, response):
+        """
+        Procesa la respuesta del directorio de clientes y actualiza los campos.
+
+        Args:
+            response (dict): Respuesta de la API del directorio
+        """
+        vals = self._prepare_directory_vals(response)
+        if not vals:
+            return
+
         _logger.info(f"Actualizando partner con datos del directorio: {vals}")
         self.write(vals)
 
-    def _process_rnc_response(self, response, rnc_normalized):
+    @api.model
+    def _prepare_rnc_vals(self, response, rnc_normalized):
         """
-        Procesa la respuesta de la API y actualiza los campos del partner.
+        Valores a escribir a partir de la respuesta de la API de RNC.
 
         Args:
             response (dict): Respuesta de la API
             rnc_normalized (str): RNC normalizado
 
-        Raises:
-            UserError: Si el estado no es ACTIVO
+        Returns:
+            dict: valores para write
         """
         # Mapeo según estructura real de la API Megaplus:
         # {
@@ -457,6 +845,7 @@ class ResPartner(models.Model):
             'vat': vat_formatted,
             'x_rnc_validado': True,
             'x_rnc_ultima_actualizacion': fields.Datetime.now(),
+            'x_dgii_padron_cambiado': False,
         }
 
         # Nombre comercial
@@ -479,22 +868,7 @@ class ResPartner(models.Model):
 
         # Estado
         if 'estado' in response:
-            estado = response.get('estado', '').upper()
-            vals['x_estado_dgii'] = estado
-
-            # Advertir si no está activo
-            if estado != 'ACTIVO':
-                # Se podría bloquear aquí, pero por ahora solo advertimos
-                try:
-                    self.message_post(
-                        body=_('⚠️ ADVERTENCIA: El RNC consultado tiene estado "%s" en DGII. '
-                               'Se recomienda verificar antes de realizar operaciones.') % estado,
-                        message_type='notification',
-                        subtype_xmlid='mail.mt_note'
-                    )
-                except:
-                    # Si falla el message_post (no tiene mail instalado), continuar
-                    pass
+            vals['x_estado_dgii'] = response.get('estado', '').upper()
 
         # Administración local
         if 'administracion_local' in response:
@@ -530,6 +904,36 @@ class ResPartner(models.Model):
             # Si no está activo, dejarlo como consumo final
             vals['x_tipo_contribuyente'] = 'consumo_final'
 
+        return vals
+
+    def _process_rnc_response(self, response, rnc_normalized):
+        """
+        Procesa la respuesta de la API y actualiza los campos del partner.
+
+        Args:
+            response (dict): Respuesta de la API
+            rnc_normalized (str): RNC normalizado
+
+        Raises:
+            UserError: Si el estado no es ACTIVO
+        """
+        vals = self._prepare_rnc_vals(response, rnc_normalized)
+
+        # Advertir si no está activo
+        estado = vals.get('x_estado_dgii')
+        if estado is not None and estado != 'ACTIVO':
+            # Se podría bloquear aquí, pero por ahora solo advertimos
+            try:
+                self.message_post(
+                    body=_('⚠️ ADVERTENCIA: El RNC consultado tiene estado "%s" en DGII. '
+                           'Se recomienda verificar antes de realizar operaciones.') % estado,
+                    message_type='notification',
+                    subtype_xmlid='mail.mt_note'
+                )
+            except:
+                # Si falla el message_post (no tiene mail instalado), continuar
+                pass
+
         # Actualizar campos
         _logger.warning("========== _process_rnc_response ==========")
         _logger.warning(f"Partner ID: {self.id}")
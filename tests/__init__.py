@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+from . import test_ecf_credit_balance
+from . import test_rnc_validator
+from . import test_credit_allocation
+from . import test_resilience
+from . import test_lookup_cache
+from . import test_send_queue
+from . import test_send_batch
+from . import test_status_callback
+from . import test_status_results
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+from odoo.tests.common import BaseCase
+
+from odoo.addons.odoo_dgii_ecf.tools import credit_allocation
+
+
+def _round(amount):
+    return round(amount, 2)
+
+
+class TestCreditAllocation(BaseCase):
+
+    def test_empty(self):
+        self.assertEqual(credit_allocation.allocate_fifo([], [(1, 100.0)]), [])
+        self.assertEqual(credit_allocation.allocate_fifo([(1, 100.0)], []), [])
+
+    def test_credit_spans_invoices_in_order(self):
+        plan = credit_allocation.allocate_fifo([(10, 100.0)], [(1, 60.0), (2, 80.0)], _round)
+        self.assertEqual(plan, [(10, 1, 60.0), (10, 2, 40.0)])
+
+    def test_invoice_consumes_several_credits(self):
+        plan = credit_allocation.allocate_fifo([(10, 30.0), (11, 50.0)], [(1, 70.0)], _round)
+        self.assertEqual(plan, [(10, 1, 30.0), (11, 1, 40.0)])
+
+    def test_credit_fully_used_across_credits_and_invoices(self):
+        plan = credit_allocation.allocate_fifo(
+            [(10, 100.0), (11, 50.0)], [(1, 60.0), (2, 80.0), (3, 20.0)], _round)
+        self.assertEqual(plan, [(10, 1, 60.0), (10, 2, 40.0), (11, 2, 40.0), (11, 3, 10.0)])
+
+    def test_total_is_the_smaller_side(self):
+        credits = [(10, 25.0), (11, 25.0)]
+        invoices = [(1, 10.0), (2, 15.0)]
+        plan = credit_allocation.allocate_fifo(credits, invoices, _round)
+        self.assertEqual(sum(amount for _credit, _invoice, amount in plan), 25.0)
+        self.assertEqual({credit for credit, _invoice, _amount in plan}, {10})
+
+    def test_exact_match(self):
+        plan = credit_allocation.allocate_fifo([(10, 50.0)], [(1, 50.0), (2, 10.0)], _round)
+        self.assertEqual(plan, [(10, 1, 50.0)])
+
+    def test_skips_settled_invoices_and_empty_credits(self):
+        plan = credit_allocation.allocate_fifo(
+            [(10, 0.0), (11, 20.0)], [(1, 0.0), (2, -5.0), (3, 15.0)], _round)
+        self.assertEqual(plan, [(11, 3, 15.0)])
+
+    def test_rounding(self):
+        plan = credit_allocation.allocate_fifo([(10, 0.1), (11, 0.2)], [(1, 0.3)], _round)
+        self.assertEqual(plan, [(10, 1, 0.1), (11, 1, 0.2)])
+        self.assertEqual(_round(sum(amount for _credit, _invoice, amount in plan)), 0.3)
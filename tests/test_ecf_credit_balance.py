@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from odoo.tests.common import TransactionCase, tagged
+
+
+@tagged('post_install', '-at_install')
+class TestEcfCreditBalance(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.balance_model = cls.env['l10n_do.ecf_credit_balance'].sudo()
+        cls.partner = cls.env['res.partner'].create({'name': 'Cliente Saldo NC'})
+
+    def test_aggregate_matches_credits(self):
+        self.assertEqual(self.balance_model._find_drift(), [])
+
+    def test_cron_repairs_drift(self):
+        company, currency = self.env.company, self.env.company.currency_id
+        self.env.cr.execute("""
+            INSERT INTO l10n_do_ecf_credit_balance
+                   (partner_id, company_id, currency_id, amount_available, credit_count)
+            VALUES (%s, %s, %s, 50, 1)
+        """, (self.partner.id, company.id, currency.id))
+        self.assertEqual(self.balance_model._get_balance(self.partner, company, currency), (50, 1))
+        self.assertIn((self.partner.id, company.id, currency.id), self.balance_model._find_drift())
+
+        self.balance_model._cron_check_balances()
+        self.assertEqual(self.balance_model._find_drift(), [])
+        self.assertEqual(self.balance_model._get_balance(self.partner, company, currency), (0.0, 0))
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+from odoo.tests.common import BaseCase
+
+from odoo.addons.odoo_dgii_ecf.tools import lookup_cache
+
+DBNAME = 'test_dgii_lookup_cache'
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+class TestLookupCache(BaseCase):
+
+    def setUp(self):
+        super().setUp()
+        self.clock = FakeClock()
+        self.patch(lookup_cache, 'time', self.clock)
+        self.patch(lookup_cache, 'MAX_ENTRIES', 3)
+        lookup_cache.invalidate(DBNAME)
+        self.addCleanup(lookup_cache.invalidate, DBNAME)
+
+    def test_evicts_least_recently_used(self):
+        for key in ('a', 'b', 'c'):
+            lookup_cache.put(DBNAME, key, key.upper(), 60)
+        self.assertEqual(lookup_cache.get(DBNAME, 'a'), 'A')  # 'a' pasa a ser la más reciente
+
+        lookup_cache.put(DBNAME, 'd', 'D', 60)
+        self.assertIsNone(lookup_cache.get(DBNAME, 'b'))
+        self.assertEqual(lookup_cache.get(DBNAME, 'a'), 'A')
+        self.assertEqual(lookup_cache.get(DBNAME, 'c'), 'C')
+        self.assertEqual(lookup_cache.get(DBNAME, 'd'), 'D')
+
+    def test_expiry_is_capped(self):
+        lookup_cache.put(DBNAME, 'short', 1, 10)
+        lookup_cache.put(DBNAME, 'long', 2, 86400)
+        self.clock.now += 11
+        self.assertIsNone(lookup_cache.get(DBNAME, 'short'))
+        self.assertEqual(lookup_cache.get(DBNAME, 'long'), 2)
+        self.clock.now += lookup_cache.LOCAL_TTL_MAX
+        self.assertIsNone(lookup_cache.get(DBNAME, 'long'))
+
+    def test_negative_and_zero_ttl(self):
+        lookup_cache.put(DBNAME, 'missing', lookup_cache.NEGATIVE, 60)
+        self.assertIs(lookup_cache.get(DBNAME, 'missing'), lookup_cache.NEGATIVE)
+        lookup_cache.put(DBNAME, 'skipped', 'X', 0)
+        self.assertIsNone(lookup_cache.get(DBNAME, 'skipped'))
+
+    def test_invalidate_by_predicate(self):
+        lookup_cache.put(DBNAME, ('rnc', '131793916'), 'A', 60)
+        lookup_cache.put(DBNAME, ('directory', '131793916'), 'B', 60)
+        lookup_cache.invalidate(DBNAME, lambda key: key[0] == 'rnc')
+        self.assertIsNone(lookup_cache.get(DBNAME, ('rnc', '131793916')))
+        self.assertEqual(lookup_cache.get(DBNAME, ('directory', '131793916')), 'B')
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+from contextlib import nullcontext
+
+from odoo.tests.common import BaseCase, TransactionCase, tagged
+
+from odoo.addons.odoo_dgii_ecf.tools import resilience
+from odoo.addons.odoo_dgii_ecf.tools.resilience import CircuitOpenError
+
+
+class TestAdaptiveRateLimiter(BaseCase):
+
+    def test_acquire_until_empty(self):
+        limiter = resilience.AdaptiveRateLimiter(max_rate=2, latency_target=1.0)
+        self.assertTrue(limiter.acquire())
+        self.assertTrue(limiter.acquire())
+        self.assertFalse(limiter.acquire(max_wait=0))
+
+    def test_error_halves_rate_down_to_minimum(self):
+        limiter = resilience.AdaptiveRateLimiter(max_rate=8, latency_target=1.0)
+        limiter.record(0.1, ok=False)
+        self.assertEqual(limiter.rate, 4)
+        limiter.record(5.0, ok=True)  # lenta: cuenta como degradación
+        self.assertEqual(limiter.rate, 2)
+        for _i in range(10):
+            limiter.record(0.1, ok=False)
+        self.assertEqual(limiter.rate, resilience.MIN_RATE)
+
+    def test_success_recovers_up_to_maximum(self):
+        limiter = resilience.AdaptiveRateLimiter(max_rate=4, latency_target=1.0)
+        limiter.record(0.1, ok=False)
+        limiter.record(0.1, ok=True)
+        self.assertAlmostEqual(limiter.rate, 2.2)
+        for _i in range(20):
+            limiter.record(0.1, ok=True)
+        self.assertEqual(limiter.rate, 4)
+
+    def test_configure_caps_current_rate(self):
+        limiter = resilience.get_limiter(('test', 'configure'), 10, 1.0)
+        self.assertIs(resilience.get_limiter(('test', 'configure'), 3, 1.0), limiter)
+        self.assertEqual(limiter.max_rate, 3)
+        self.assertEqual(limiter.rate, 3)
+
+
+@tagged('post_install', '-at_install')
+class TestCircuitBreaker(TransactionCase):
+
+    ENDPOINT = 'test_endpoint'
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.breaker = cls.env['dgii.circuit.breaker'].sudo()
+        params = cls.env['ir.config_parameter'].sudo()
+        params.set_param('dgii_ecf.breaker_failure_threshold', 2)
+        params.set_param('dgii_ecf.breaker_cooldown', 60)
+
+    def setUp(self):
+        super().setUp()
+        # Los cambios de estado usan un cursor propio: en pruebas, el de la transacción
+        self.patch(self.registry, 'cursor', lambda *args, **kwargs: nullcontext(self.cr))
+        self.breaker._healthy_cache.clear()
+        self.addCleanup(self.breaker._healthy_cache.clear)
+
+    def _expire_cooldown(self):
+        self.cr.execute("""
+            UPDATE dgii_circuit_breaker
+               SET open_until = (now() AT TIME ZONE 'UTC') - interval '1 second'
+             WHERE endpoint = %s
+        """, (self.ENDPOINT,))
+
+    def test_opens_at_threshold(self):
+        self.breaker._record_failure(self.ENDPOINT, 'timeout')
+        self.assertEqual(self.breaker._get_state(self.ENDPOINT), 'closed')
+        self.assertTrue(self.breaker._before_request(self.ENDPOINT))
+
+        self.breaker._record_failure(self.ENDPOINT, 'timeout')
+        self.assertEqual(self.breaker._get_state(self.ENDPOINT), 'open')
+        self.assertTrue(self.breaker._is_open(self.ENDPOINT))
+        with self.assertRaises(CircuitOpenError):
+            self.breaker._before_request(self.ENDPOINT)
+
+    def test_single_trial_after_cooldown(self):
+        self.breaker._record_failure(self.ENDPOINT, 'timeout')
+        self.breaker._record_failure(self.ENDPOINT, 'timeout')
+        self._expire_cooldown()
+        self.assertFalse(self.breaker._is_open(self.ENDPOINT))
+
+        self.assertTrue(self.breaker._before_request(self.ENDPOINT))
+        self.assertEqual(self.breaker._get_state(self.ENDPOINT), 'half_open')
+        with self.assertRaises(CircuitOpenError):
+            self.breaker._before_request(self.ENDPOINT)
+
+    def test_trial_success_closes(self):
+        self.breaker._record_failure(self.ENDPOINT, 'timeout')
+        self.breaker._record_failure(self.ENDPOINT, 'timeout')
+        self._expire_cooldown()
+        self.breaker._before_request(self.ENDPOINT)
+
+        self.breaker._record_success(self.ENDPOINT)
+        self.assertEqual(self.breaker._get_state(self.ENDPOINT), 'closed')
+        self.assertTrue(self.breaker._before_request(self.ENDPOINT))
+
+    def test_trial_failure_reopens(self):
+        self.breaker._record_failure(self.ENDPOINT, 'timeout')
+        self.breaker._record_failure(self.ENDPOINT, 'timeout')
+        self._expire_cooldown()
+        self.breaker._before_request(self.ENDPOINT)
+
+        self.breaker._record_failure(self.ENDPOINT, 'timeout')
+        self.assertEqual(self.breaker._get_state(self.ENDPOINT), 'open')
+        self.assertTrue(self.breaker._is_open(self.ENDPOINT))
+
+
+@tagged('post_install', '-at_install')
+class TestHttpClientLimits(TransactionCase):
+
+    def setUp(self):
+        super().setUp()
+        self.client = self.env['dgii.http.client']
+        self.params = self.env['ir.config_parameter'].sudo()
+
+    def test_defaults_follow_timeout(self):
+        self.assertEqual(self.client._get_latency_target('send', 20.0), 5.0)
+        self.assertEqual(self.client._get_rate_limit_max_wait('send'), self.client.RATE_LIMIT_MAX_WAIT)
+
+    def test_per_endpoint_parameters(self):
+        self.params.set_param('dgii_ecf.rate_latency_target_status', '1.5')
+        self.params.set_param('dgii_ecf.rate_limit_max_wait_status', '0')
+        self.assertEqual(self.client._get_latency_target('status', 10.0), 1.5)
+        self.assertEqual(self.client._get_rate_limit_max_wait('status'), 0.0)
+        # Los demás endpoints no se ven afectados
+        self.assertEqual(self.client._get_latency_target('send', 20.0), 5.0)
+
+    def test_invalid_parameters_use_defaults(self):
+        self.params.set_param('dgii_ecf.rate_latency_target_rnc', 'rápido')
+        self.params.set_param('dgii_ecf.rate_limit_max_wait_rnc', 'x')
+        self.assertEqual(self.client._get_latency_target('rnc', 10.0), 2.5)
+        self.assertEqual(self.client._get_rate_limit_max_wait('rnc'), self.client.RATE_LIMIT_MAX_WAIT)
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+from odoo.tests.common import BaseCase, TransactionCase, tagged
+
+from odoo.addons.odoo_dgii_ecf.tools import rnc_validator
+
+
+class TestRncValidator(BaseCase):
+
+    def test_valid_numbers(self):
+        for number in ('131793916', '101010632', '00113918205', '40212345678'):
+            self.assertIsNone(rnc_validator.validate(number), number)
+
+    def test_invalid_numbers(self):
+        cases = {
+            '': rnc_validator.REASON_EMPTY,
+            '13179391A': rnc_validator.REASON_DIGITS,
+            '1317939': rnc_validator.REASON_LENGTH,
+            '000000000': rnc_validator.REASON_KNOWN_INVALID,
+            '00000000000': rnc_validator.REASON_KNOWN_INVALID,
+            '131793917': rnc_validator.REASON_CHECK_DIGIT,
+            '00113918204': rnc_validator.REASON_CHECK_DIGIT,
+        }
+        for number, reason in cases.items():
+            self.assertEqual(rnc_validator.validate(number), reason, number)
+
+    def test_whitelisted_numbers(self):
+        """Números reales con dígito verificador incorrecto se aceptan por defecto."""
+        for number in ('101581601', '00100759932', '40200700675'):
+            self.assertIsNone(rnc_validator.validate(number), number)
+            self.assertEqual(rnc_validator.validate(number, whitelist=frozenset()),
+                             rnc_validator.REASON_CHECK_DIGIT, number)
+
+    def test_normalize(self):
+        self.assertEqual(rnc_validator.normalize('131-79391-6'), '131793916')
+        self.assertEqual(rnc_validator.normalize(' 001-1391820-5 '), '00113918205')
+        self.assertEqual(rnc_validator.normalize(None), '')
+
+    def test_validate_many_keeps_order(self):
+        reasons = rnc_validator.validate_many(['131793916', '131793917', '101581601', '12'])
+        self.assertEqual(reasons, [
+            None, rnc_validator.REASON_CHECK_DIGIT, None, rnc_validator.REASON_LENGTH,
+        ])
+
+
+@tagged('post_install', '-at_install')
+class TestPartnerRncCheck(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.partner_model = cls.env['res.partner']
+        cls.params = cls.env['ir.config_parameter'].sudo()
+
+    def test_configured_whitelist_keeps_defaults(self):
+        self.params.set_param('dgii_ecf.rnc_whitelist', '131-79391-7')
+        reasons = self.partner_model._check_rnc_numbers(['131793917', '101581601', '00100759932'])
+        self.assertEqual(reasons, [None, None, None])
+
+    def test_configured_known_invalid(self):
+        self.params.set_param('dgii_ecf.rnc_known_invalid', '131793916')
+        self.assertEqual(self.partner_model._check_rnc_number('131793916'),
+                         rnc_validator.REASON_KNOWN_INVALID)
+
+    def test_check_digit_confirmed_by_registry(self):
+        self.assertEqual(self.partner_model._check_rnc_number('131793917'),
+                         rnc_validator.REASON_CHECK_DIGIT)
+        self.env['dgii.rnc.registry'].create({'rnc': '131793917', 'name': 'CONTRIBUYENTE DE PRUEBA'})
+        self.assertIsNone(self.partner_model._check_rnc_number('131793917'))
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+from contextlib import nullcontext
+
+from odoo.tests.common import tagged
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+from odoo.addons.odoo_dgii_ecf.tools import ecf_stub_server
+
+
+@tagged('post_install', '-at_install')
+class TestSendBatch(AccountTestInvoicingCommon):
+    """Envío en lote contra el microservicio simulado de tools/ecf_stub_server.py."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env['ir.config_parameter'].sudo().set_param('dgii_ecf.batch_send_enabled', 'True')
+        cls.company_data['default_journal_sale'].write({
+            'dgii_tipo_ecf': '31',
+            'dgii_establecimiento': '001',
+            'dgii_punto_emision': '001',
+        })
+        cls.partner_a.vat = '131793916'
+
+        # El sufijo decide la respuesta del simulador: 9 rechazado, 8 indisponible
+        cls.accepted, cls.rejected, cls.unavailable = [
+            cls._create_ecf(f'E3100100100000{suffix}') for suffix in ('001', '009', '008')]
+        cls.moves = cls.accepted | cls.rejected | cls.unavailable
+
+    @classmethod
+    def _create_ecf(cls, encf):
+        move = cls.init_invoice('out_invoice', partner=cls.partner_a, amounts=[100.0], post=True)
+        move.encf = encf
+        return move
+
+    def setUp(self):
+        super().setUp()
+        # Un simulador por prueba: recuerda los e-NCF recibidos
+        server, base_url = ecf_stub_server.serve_in_thread()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.env['ir.config_parameter'].sudo().set_param('dgii_ecf.api_base_url', base_url)
+
+        # Circuit breaker e histograma escriben con un cursor propio: en pruebas, el de la transacción
+        self.patch(self.registry, 'cursor', lambda *args, **kwargs: nullcontext(self.cr))
+        self.env['dgii.circuit.breaker']._healthy_cache.clear()
+
+    def _payloads(self, moves):
+        return {move.id: {'encf': move.encf, 'total': move.amount_total} for move in moves}
+
+    def _logs(self, move):
+        return self.env['dgii.transaction.log'].search([
+            ('move_id', '=', move.id),
+            ('operation_type', '=', 'send_batch'),
+        ])
+
+    def test_mixed_batch_maps_results_per_item(self):
+        results = self.moves._dgii_send_batch(payloads=self._payloads(self.moves))
+        self.assertEqual(set(results), set(self.moves.ids))
+
+        accepted = results[self.accepted.id]
+        self.assertTrue(accepted['success'])
+        self.assertTrue(accepted['track_id'])
+        self.assertIn(self.accepted.encf, accepted['signed_xml'])
+
+        rejected = results[self.rejected.id]
+        self.assertFalse(rejected['success'])
+        self.assertFalse(rejected['track_id'])
+        self.assertIn('rechazó', rejected['error'])
+        self.assertFalse(rejected['transient'])
+
+        unavailable = results[self.unavailable.id]
+        self.assertFalse(unavailable['success'])
+        self.assertTrue(unavailable['transient'])
+
+    def test_mixed_batch_logs_each_move(self):
+        results = self.moves._dgii_send_batch(payloads=self._payloads(self.moves))
+        for move in self.moves:
+            log = self._logs(move)
+            self.assertEqual(len(log), 1)
+            self.assertEqual(log.encf, move.encf)
+            self.assertEqual(log.response_status_code, 200)
+            self.assertEqual(log.state, 'success' if results[move.id]['success'] else 'error')
+        self.assertEqual(self._logs(self.accepted).dgii_track_id, results[self.accepted.id]['track_id'])
+        self.assertIn('rechazó', self._logs(self.rejected).error_message)
+
+    def test_invalid_move_is_not_sent(self):
+        draft = self.init_invoice('out_invoice', partner=self.partner_a, amounts=[50.0])
+        draft.encf = 'E31001001000000002'
+        moves = self.accepted | draft
+        results = moves._dgii_send_batch(payloads=self._payloads(moves))
+        self.assertFalse(results[draft.id]['success'])
+        self.assertFalse(results[draft.id]['transient'])
+        self.assertFalse(self._logs(draft))
+        self.assertTrue(results[self.accepted.id]['success'])
+
+    def test_resend_reuses_track_id(self):
+        payloads = self._payloads(self.accepted)
+        first = self.accepted._dgii_send_batch(payloads=payloads)[self.accepted.id]
+        second = self.accepted._dgii_send_batch(payloads=payloads)[self.accepted.id]
+        self.assertTrue(second['success'])
+        self.assertTrue(second['already_received'])
+        self.assertEqual(second['track_id'], first['track_id'])
+
+    def test_network_error_is_transient(self):
+        self.env['ir.config_parameter'].sudo().set_param('dgii_ecf.api_base_url', 'http://127.0.0.1:9/api')
+        results = self.moves._dgii_send_batch(payloads=self._payloads(self.moves))
+        for move in self.moves:
+            self.assertFalse(results[move.id]['success'])
+            self.assertTrue(results[move.id]['transient'])
+
+    def test_local_request_error_is_permanent(self):
+        self.env['ir.config_parameter'].sudo().set_param('dgii_ecf.api_base_url', 'http://')
+        results = self.moves._dgii_send_batch(payloads=self._payloads(self.moves))
+        for move in self.moves:
+            self.assertFalse(results[move.id]['success'])
+            self.assertFalse(results[move.id]['transient'])
+
+    def test_error_classification(self):
+        move_model = self.env['account.move']
+        self.assertTrue(move_model._dgii_is_transient_error('Read timed out. (read timeout=20)'))
+        self.assertTrue(move_model._dgii_is_transient_error('Error HTTP 503 desde microservicio'))
+        # Sin respuesta HTTP pero con un error local: no se reintenta
+        self.assertFalse(move_model._dgii_is_transient_error('El cliente no tiene RNC configurado'))
+        self.assertFalse(move_model._dgii_is_transient_error(False))
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+from datetime import timedelta
+
+from odoo import SUPERUSER_ID, api, fields
+from odoo.sql_db import db_connect
+from odoo.tests.common import TransactionCase, tagged
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+
+
+@tagged('post_install', '-at_install')
+class TestSendQueue(AccountTestInvoicingCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.queue = cls.env['dgii.send.queue']
+        cls.moves = cls.env['account.move']
+        for _i in range(3):
+            cls.moves |= cls.init_invoice('out_invoice', amounts=[100.0])
+
+    def setUp(self):
+        super().setUp()
+        # _claim_batch confirma para liberar los bloqueos; en la prueba no debe salir de la transacción
+        self.patch(self.env.cr, 'commit', lambda: None)
+
+    def _claim(self, limit=10):
+        self.env.flush_all()
+        return self.queue._claim_batch(limit)
+
+    def _outcome(self, job, state='error', error='timeout', transient=True):
+        return {'job_id': job.id, 'state': state, 'error': error, 'transient': transient}
+
+    def test_claim_batch_priority_limit_and_next_attempt(self):
+        low = self.queue.enqueue(self.moves[0], priority='0')
+        high = self.queue.enqueue(self.moves[1], priority='2')
+        later = self.queue.enqueue(self.moves[2])
+        later.write({'next_attempt_at': fields.Datetime.now() + timedelta(hours=1)})
+
+        claimed = self._claim(limit=1)
+        self.assertEqual(claimed, high)
+        self.assertEqual(high.state, 'processing')
+        self.assertEqual(high.attempts, 1)
+        self.assertTrue(high.worker)
+
+        # El trabajo con reintento futuro no se reclama todavía
+        self.assertEqual(self._claim(), low)
+        self.assertEqual(later.state, 'pending')
+        self.assertFalse(self._claim())
+
+    def test_enqueue_ignores_active_jobs(self):
+        job = self.queue.enqueue(self.moves[0])
+        self.assertEqual(self.queue.enqueue(self.moves[0]), job)
+        self.assertEqual(self.queue.search_count([('move_id', '=', self.moves[0].id)]), 1)
+
+    def test_transient_failures_retry_until_dead(self):
+        self.env['ir.config_parameter'].sudo().set_param('dgii_ecf.queue_max_attempts', 2)
+        job = self.queue.enqueue(self.moves[0])
+
+        self.assertEqual(self._claim(), job)
+        self.queue._write_results([self._outcome(job)])
+        self.assertEqual(job.state, 'pending')
+        self.assertEqual(job.failure_kind, 'transient')
+        self.assertEqual(job.error_message, 'timeout')
+        self.assertGreater(job.next_attempt_at, fields.Datetime.now() - timedelta(seconds=1))
+        self.assertFalse(job.worker)
+
+        # Vence el backoff: segundo y último intento
+        job.write({'next_attempt_at': fields.Datetime.now() - timedelta(seconds=1)})
+        self.assertEqual(self._claim(), job)
+        self.assertEqual(job.attempts, 2)
+        self.queue._write_results([self._outcome(job)])
+        self.assertEqual(job.state, 'dead')
+        self.assertEqual(job.failure_kind, 'transient')
+        self.assertFalse(job.next_attempt_at)
+        self.assertTrue(job.date_done)
+
+    def test_permanent_failure_is_not_retried(self):
+        job = self.queue.enqueue(self.moves[0])
+        self._claim()
+        self.queue._write_results([self._outcome(job, error='RNC inválido', transient=False)])
+        self.assertEqual(job.state, 'error')
+        self.assertEqual(job.failure_kind, 'permanent')
+        self.assertFalse(job.next_attempt_at)
+
+    def test_write_results_groups_mixed_outcomes(self):
+        jobs = self.queue.enqueue(self.moves)
+        self._claim()
+        self.queue._write_results([
+            self._outcome(jobs[0], state='done', error=False, transient=False),
+            self._outcome(jobs[1], error='RNC inválido', transient=False),
+            self._outcome(jobs[2]),
+        ])
+        self.assertEqual(jobs.mapped('state'), ['done', 'error', 'pending'])
+        self.assertFalse(jobs[0].failure_kind)
+        self.assertFalse(jobs[0].error_message)
+
+    def test_requeue_stale(self):
+        stale, active = self.queue.enqueue(self.moves[:2])
+        self._claim()
+        self.env.cr.execute("""
+            UPDATE dgii_send_queue
+               SET date_started = (now() AT TIME ZONE 'UTC') - interval '30 minutes'
+             WHERE id = %s
+        """, (stale.id,))
+
+        self.assertEqual(self.queue._requeue_stale(minutes=15), 1)
+        self.queue.invalidate_model(['state', 'worker'])
+        self.assertEqual(stale.state, 'pending')
+        self.assertFalse(stale.worker)
+        self.assertEqual(active.state, 'processing')
+
+    def test_execute_send_keeps_applied_results(self):
+        good, bad = self.moves[:2]
+        jobs = self.queue.enqueue(good | bad)
+
+        def _send_batch(moves, payloads=None):
+            return {move.id: {'success': True, 'track_id': f'TRK-{move.id}', 'error': False} for move in moves}
+
+        def _apply(move, provider, result):
+            move.write({'dgii_track_id': result['track_id']})
+            if move == bad:
+                raise ValueError('fallo local')
+
+        self.patch(self.registry['account.move'], '_dgii_send_batch', _send_batch)
+        self.patch(self.registry['account.move'], '_dgii_apply_send_result', _apply)
+
+        outcomes = {o['job_id']: o for o in jobs._execute_send(batch=True)}
+        self.assertEqual(outcomes[jobs[0].id]['state'], 'done')
+        self.assertEqual(good.dgii_track_id, f'TRK-{good.id}')
+
+        # El fallo al aplicar revierte solo esa factura y no se reenvía automáticamente
+        failed = outcomes[jobs[1].id]
+        self.assertEqual(failed['state'], 'error')
+        self.assertFalse(failed['transient'])
+        self.assertIn(f'TRK-{bad.id}', failed['error'])
+        bad.invalidate_recordset(['dgii_track_id'])
+        self.assertFalse(bad.dgii_track_id)
+
+
+@tagged('post_install', '-at_install')
+class TestSendQueueLocking(TransactionCase):
+    """SKIP LOCKED requiere filas confirmadas y dos conexiones reales."""
+
+    def _cursor(self):
+        cr = db_connect(self.env.cr.dbname).cursor()
+        self.addCleanup(cr.close)
+        return cr
+
+    def setUp(self):
+        super().setUp()
+        with db_connect(self.env.cr.dbname).cursor() as cr:
+            env = api.Environment(cr, SUPERUSER_ID, {})
+            journal = env['account.journal'].create({
+                'name': 'Cola DGII (prueba de bloqueo)',
+                'code': 'DQLK',
+                'type': 'general',
+            })
+            moves = env['account.move'].create([{'journal_id': journal.id} for _i in range(2)])
+            jobs = env['dgii.send.queue'].create([{'move_id': move.id} for move in moves])
+            cr.commit()
+        self.job_ids = jobs.ids
+        self.addCleanup(self._cleanup, journal.id, moves.ids)
+
+    def _cleanup(self, journal_id, move_ids):
+        with db_connect(self.env.cr.dbname).cursor() as cr:
+            cr.execute("DELETE FROM dgii_send_queue WHERE move_id IN %s", (tuple(move_ids),))
+            cr.execute("DELETE FROM account_move WHERE id IN %s", (tuple(move_ids),))
+            cr.execute("DELETE FROM account_journal WHERE id = %s", (journal_id,))
+            cr.commit()
+
+    def test_claim_batch_skips_locked_rows(self):
+        locked_id, free_id = self.job_ids
+
+        # Otro worker tiene la fila bloqueada mientras procesa
+        lock_cr = self._cursor()
+        lock_cr.execute("SELECT id FROM dgii_send_queue WHERE id = %s FOR UPDATE", (locked_id,))
+
+        claim_cr = self._cursor()
+        claimed = api.Environment(claim_cr, SUPERUSER_ID, {})['dgii.send.queue']._claim_batch(10)
+        self.assertIn(free_id, claimed.ids)
+        self.assertNotIn(locked_id, claimed.ids)
+
+        lock_cr.rollback()
+        claim_cr.execute("SELECT state FROM dgii_send_queue WHERE id = %s", (locked_id,))
+        self.assertEqual(claim_cr.fetchone()[0], 'pending')
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import hmac
+import json
+import time
+
+from odoo.tests.common import HttpCase, tagged
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+
+CALLBACK_URL = '/dgii_ecf/status_callback'
+SECRET = 'secreto-de-prueba'
+
+
+@tagged('post_install', '-at_install')
+class TestStatusCallback(AccountTestInvoicingCommon, HttpCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.env['ir.config_parameter'].sudo().set_param('dgii_ecf.callback_secret', SECRET)
+        cls.move = cls.init_invoice('out_invoice', amounts=[100.0], post=True)
+        cls.move.write({
+            'encf': 'E3100100100000001',
+            'dgii_track_id': 'TRK-CALLBACK-1',
+            'dgii_estado': 'pending',
+        })
+        cls.results = [{'trackId': 'TRK-CALLBACK-1', 'codigo': 1, 'estado': 'Aceptado', 'mensajes': []}]
+
+    def _post(self, results, timestamp=None, secret=SECRET, headers=None):
+        body = json.dumps({'results': results}).encode('utf-8')
+        timestamp = str(int(time.time()) if timestamp is None else timestamp)
+        signature = hmac.new(secret.encode(), timestamp.encode() + b'.' + body, hashlib.sha256).hexdigest()
+        request_headers = {
+            'Content-Type': 'application/json',
+            'X-DGII-Timestamp': timestamp,
+            'X-DGII-Signature': f'sha256={signature}',
+        }
+        request_headers.update(headers or {})
+        return self.url_open(CALLBACK_URL, data=body, headers={k: v for k, v in request_headers.items() if v})
+
+    def _assert_rejected(self, response, error):
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json(), {'success': False, 'error': error})
+        self.move.invalidate_recordset(['dgii_estado'])
+        self.assertEqual(self.move.dgii_estado, 'pending')
+        self.assertFalse(self.env['dgii.status.history'].search([('move_id', '=', self.move.id)]))
+
+    def test_valid_signature_applies_status(self):
+        response = self._post(self.results)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'success': True,
+            'data': {'received': 1, 'applied': 1, 'unknown': []},
+        })
+        self.move.invalidate_recordset(['dgii_estado'])
+        self.assertEqual(self.move.dgii_estado, 'accepted')
+        history = self.env['dgii.status.history'].search([('move_id', '=', self.move.id)])
+        self.assertEqual(len(history), 1)
+        self.assertEqual((history.old_state, history.new_state, history.source), ('pending', 'accepted', 'callback'))
+
+        # Reenvío del mismo callback: idempotente
+        response = self._post(self.results)
+        self.assertEqual(response.json()['data']['applied'], 0)
+
+    def test_unknown_track_id(self):
+        response = self._post([{'trackId': 'TRK-DESCONOCIDO', 'codigo': 1}])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['unknown'], ['TRK-DESCONOCIDO'])
+
+    def test_bad_signature(self):
+        self._assert_rejected(self._post(self.results, secret='otro-secreto'), 'Firma inválida')
+
+    def test_stale_timestamp(self):
+        stale = int(time.time()) - 301
+        self._assert_rejected(self._post(self.results, timestamp=stale), 'Timestamp inválido')
+
+    def test_future_timestamp(self):
+        future = int(time.time()) + 301
+        self._assert_rejected(self._post(self.results, timestamp=future), 'Timestamp inválido')
+
+    def test_missing_signature_header(self):
+        self._assert_rejected(self._post(self.results, headers={'X-DGII-Signature': None}), 'Firma inválida')
+
+    def test_missing_timestamp_header(self):
+        self._assert_rejected(self._post(self.results, headers={'X-DGII-Timestamp': None}), 'Timestamp inválido')
+
+    def test_disabled_without_secret(self):
+        self.env['ir.config_parameter'].sudo().set_param('dgii_ecf.callback_secret', False)
+        response = self._post(self.results)
+        self.assertEqual(response.status_code, 404)
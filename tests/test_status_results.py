@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+import json
+
+from odoo.tests.common import tagged
+
+from odoo.addons.account.tests.common import AccountTestInvoicingCommon
+
+
+@tagged('post_install', '-at_install')
+class TestStatusResults(AccountTestInvoicingCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.accepted = cls._create_pending('out_invoice', 'E3100100100000001')
+        cls.rejected = cls._create_pending('out_invoice', 'E3100100100000002')
+        cls.in_process = cls._create_pending('out_invoice', 'E3100100100000003')
+        cls.credit_note = cls._create_pending('out_refund', 'E3400100100000001')
+        cls.untouched = cls._create_pending('out_invoice', 'E3100100100000004')
+        cls.moves = cls.accepted | cls.rejected | cls.in_process | cls.credit_note | cls.untouched
+
+        cls.results = {
+            cls.accepted.id: {'codigo': 1, 'estado': 'Aceptado', 'mensajes': []},
+            cls.rejected.id: {'codigo': 2, 'estado': 'Rechazado',
+                              'mensajes': [{'codigo': '613', 'valor': 'RNC del comprador inválido'}]},
+            cls.in_process.id: {'codigo': 0, 'estado': 'En Proceso', 'mensajes': []},
+            cls.credit_note.id: {'codigo': '1', 'estado': 'Aceptado', 'mensajes': []},
+        }
+
+    @classmethod
+    def _create_pending(cls, move_type, encf):
+        move = cls.init_invoice(move_type, amounts=[100.0], post=True)
+        move.write({'encf': encf, 'dgii_track_id': f'TRK-{encf}', 'dgii_estado': 'pending'})
+        return move
+
+    def _history(self, move):
+        return self.env['dgii.status.history'].search([('move_id', '=', move.id)])
+
+    def _credits(self, moves):
+        return self.env['l10n_do.ecf_credit'].search([('credit_move_id', 'in', moves.ids)])
+
+    def test_mixed_results_update_states(self):
+        applied = self.moves._dgii_apply_status_results(self.results)
+        self.assertEqual(applied, self.moves - self.untouched)
+        self.assertEqual(
+            [move.dgii_estado for move in self.moves],
+            ['accepted', 'rejected', 'pending', 'accepted', 'pending'],
+        )
+
+        # Los pendientes se vuelven a consultar; los finales no
+        self.assertEqual(self.in_process.dgii_status_check_count, 1)
+        self.assertTrue(self.in_process.dgii_next_status_check_at)
+        self.assertFalse(self.accepted.dgii_next_status_check_at)
+        self.assertFalse(self.rejected.dgii_next_status_check_at)
+        self.assertEqual(json.loads(self.rejected.dgii_response_raw), self.results[self.rejected.id])
+        self.assertFalse(self.untouched.dgii_status_check_count)
+
+    def test_history_rows_for_changes_only(self):
+        self.moves._dgii_apply_status_results(self.results, source='callback')
+
+        history = self._history(self.accepted)
+        self.assertEqual(len(history), 1)
+        self.assertEqual(
+            (history.old_state, history.new_state, history.dgii_status, history.source),
+            ('pending', 'accepted', 'Aceptado', 'callback'),
+        )
+        self.assertEqual(history.encf, self.accepted.encf)
+        self.assertEqual(history.track_id, self.accepted.dgii_track_id)
+        self.assertEqual(self._history(self.rejected).new_state, 'rejected')
+        self.assertFalse(self._history(self.in_process))
+        self.assertFalse(self._history(self.untouched))
+
+    def test_accepted_credit_note_creates_credit(self):
+        self.moves._dgii_apply_status_results(self.results)
+
+        credit = self._credits(self.moves)
+        self.assertEqual(credit.credit_move_id, self.credit_note)
+        self.assertEqual(credit.partner_id, self.credit_note.partner_id)
+        self.assertEqual(credit.encf, self.credit_note.encf)
+        self.assertEqual(credit.amount_available, self.credit_note.amount_total)
+        self.assertEqual(credit.state, 'available')
+        self.assertTrue(self._history(self.credit_note).note)
+
+        # Aplicar de nuevo el mismo resultado no duplica el crédito ni el historial
+        self.moves._dgii_apply_status_results(self.results)
+        self.assertEqual(self._credits(self.moves), credit)
+        self.assertEqual(len(self._history(self.credit_note)), 1)
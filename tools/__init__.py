@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+from . import http_session
+from . import resilience
+from . import metrics
+from . import lookup_cache
+from . import rnc_validator
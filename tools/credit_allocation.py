@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""
+Asignación FIFO de créditos de NC a facturas abiertas.
+
+Los créditos se consumen en el orden recibido (el llamador los ordena por
+vencimiento y fecha) contra las facturas en su orden (más antiguas
+primero). Cada asignación es el menor entre el saldo del crédito y el
+saldo pendiente de la factura. El total asignado es el máximo posible:
+el menor entre la suma de los créditos y la suma de los saldos.
+
+Uso:
+    plan = credit_allocation.allocate_fifo(
+        [(credit_id, disponible), ...], [(invoice_id, pendiente), ...], currency.round)
+    # [(credit_id, invoice_id, monto), ...]
+"""
+
+
+def allocate_fifo(credits, invoices, round_amount=None):
+    """
+    Calcula la asignación de créditos a facturas.
+
+    Args:
+        credits (list): [(credit_id, saldo_disponible)] en orden de consumo
+        invoices (list): [(invoice_id, saldo_pendiente)] en orden de pago
+        round_amount (callable): redondeo de la moneda (opcional)
+
+    Returns:
+        list: [(credit_id, invoice_id, monto)] en orden de aplicación
+    """
+    round_amount = round_amount or (lambda amount: amount)
+    pending = [[invoice_id, round_amount(residual)] for invoice_id, residual in invoices if residual > 0]
+    plan = []
+    index = 0
+    for credit_id, available in credits:
+        available = round_amount(available)
+        while available > 0 and index < len(pending):
+            invoice = pending[index]
+            amount = round_amount(min(available, invoice[1]))
+            if amount > 0:
+                plan.append((credit_id, invoice[0], amount))
+                available = round_amount(available - amount)
+                invoice[1] = round_amount(invoice[1] - amount)
+            if invoice[1] <= 0 or amount <= 0:
+                index += 1
+        if index >= len(pending):
+            break
+    return plan
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Servidor local que imita los endpoints del microservicio dgii-ecf.
+
+Permite probar sin conexión el envío en lote y la consulta de estados.
+Solo usa la biblioteca estándar, por lo que se ejecuta sin Odoo:
+
+    python tools/ecf_stub_server.py --port 3000
+
+y se configura en Ajustes → DGII e-CF la URL base ``http://localhost:3000/api``.
+
+Endpoints:
+    POST /api/invoice/send-batch      envío de varios e-CF en una petición
+    GET  /api/invoice/status/<track>  estado de un trackId
+    POST /api/invoice/status-batch    estado de varios trackId en una petición
+
+Reglas de simulación:
+    * Un e-CF sin ``encf`` o sin ``invoiceData`` se rechaza con error por ítem.
+    * Los e-NCF que terminan en '9' se devuelven como no aceptados (error DGII).
+    * Los e-NCF que terminan en '8' fallan por indisponibilidad temporal de DGII.
+    * Un e-NCF o ``idempotencyKey`` ya recibido devuelve ``alreadyReceived`` con
+      el trackId original, igual que el microservicio real ante un reintento.
+"""
+import argparse
+import hashlib
+import hmac
+import json
+import threading
+import time
+import urllib.request
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+API_PREFIX = '/api'
+
+
+class EcfStubState:
+    """Estado en memoria compartido por las peticiones."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.track_ids = {}
+        self.idempotency_keys = {}
+
+    def register(self, encf, idempotency_key=None):
+        """Registra el e-NCF. Retorna (trackId, ya_recibido)."""
+        with self.lock:
+            known_encf = self.idempotency_keys.get(idempotency_key) if idempotency_key else None
+            track_id = self.track_ids.get(known_encf or encf)
+            if track_id:
+                return track_id, True
+            track_id = str(uuid.uuid4())
+            self.track_ids[encf] = track_id
+            if idempotency_key:
+                self.idempotency_keys[idempotency_key] = encf
+            return track_id, False
+
+    def encf_for_track(self, track_id):
+        with self.lock:
+            for encf, known in self.track_ids.items():
+                if known == track_id:
+                    return encf
+        return None
+
+
+def process_batch_item(state, item):
+    """Construye el resultado simulado de un ítem de lote."""
+    encf = item.get('encf')
+    base = {'clientRef': item.get('clientRef') or encf, 'encf': encf}
+    if not encf or not item.get('invoiceData'):
+        return dict(base, success=False, error='Ítem inválido: encf e invoiceData son obligatorios')
+    if encf.endswith('9'):
+        return dict(base, success=False, error='DGII rechazó el e-CF (simulado)', codigo=2, estado='Rechazado')
+    if encf.endswith('8'):
+        return dict(base, success=False, error='Servicio DGII no disponible temporalmente (simulado)')
+
+    track_id, already_received = state.register(encf, item.get('idempotencyKey'))
+    if already_received:
+        return dict(base, success=False, alreadyReceived=True, trackId=track_id,
+                    error='El e-CF ya fue recibido')
+    digest = hashlib.sha256(json.dumps(item['invoiceData'], sort_keys=True).encode()).hexdigest()
+    return dict(
+        base,
+        success=True,
+        trackId=track_id,
+        codigo=0,
+        estado='En Proceso',
+        signedXml=f'<ECF><eNCF>{encf}</eNCF><Signature>{digest}</Signature></ECF>',
+        securityCode=digest[:6].upper(),
+        qrCodeUrl=f'https://ecf.dgii.gov.do/testecf/consultatimbre?encf={encf}&codigoseguridad={digest[:6]}',
+        mensajes=[],
+    )
+
+
+def status_item(state, track_id):
+    """Estado simulado de un trackId: los conocidos se devuelven aceptados."""
+    encf = state.encf_for_track(track_id)
+    if not encf:
+        return {'trackId': track_id, 'success': False, 'error': 'trackId desconocido'}
+    return {'trackId': track_id, 'success': True, 'encf': encf, 'codigo': 1, 'estado': 'Aceptado', 'mensajes': []}
+
+
+def send_status_callback(url, secret, results):
+    """
+    Envía a Odoo un callback de estado firmado, como lo haría el microservicio.
+
+    Args:
+        url (str): URL de Odoo, ej. http://localhost:8069/dgii_ecf/status_callback
+        secret (str): valor de dgii_ecf.callback_secret
+        results (list): dicts con trackId, codigo, estado, mensajes
+
+    Returns:
+        dict: respuesta JSON de Odoo
+    """
+    body = json.dumps({'results': results}).encode('utf-8')
+    timestamp = str(int(time.time()))
+    signature = hmac.new(secret.encode(), timestamp.encode() + b'.' + body, hashlib.sha256).hexdigest()
+    req = urllib.request.Request(url, data=body, method='POST', headers={
+        'Content-Type': 'application/json',
+        'X-DGII-Timestamp': timestamp,
+        'X-DGII-Signature': f'sha256={signature}',
+    })
+    with urllib.request.urlopen(req, timeout=10) as response:
+        return json.loads(response.read().decode('utf-8'))
+
+
+def make_handler(state):
+    class EcfStubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'  # keep-alive
+
+        def _send_json(self, status, body):
+            payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def _read_json(self):
+            length = int(self.headers.get('Content-Length') or 0)
+            raw = self.rfile.read(length) if length else b'{}'
+            try:
+                return json.loads(raw.decode('utf-8'))
+            except ValueError:
+                return None
+
+        def do_POST(self):  # noqa: N802
+            if self.path == f'{API_PREFIX}/invoice/status-batch':
+                body = self._read_json()
+                if body is None or not isinstance(body.get('trackIds'), list):
+                    return self._send_json(400, {'success': False, 'error': 'Se esperaba una lista "trackIds"'})
+                results = [status_item(state, track_id) for track_id in body['trackIds']]
+                return self._send_json(200, {'success': True, 'data': {'results': results}})
+            if self.path != f'{API_PREFIX}/invoice/send-batch':
+                return self._send_json(404, {'success': False, 'error': 'Not found'})
+            body = self._read_json()
+            if body is None or not isinstance(body.get('invoices'), list):
+                return self._send_json(400, {'success': False, 'error': 'Se esperaba una lista "invoices"'})
+            results = [process_batch_item(state, item) for item in body['invoices']]
+            return self._send_json(200, {'success': True, 'data': {'results': results}})
+
+        def do_GET(self):  # noqa: N802
+            prefix = f'{API_PREFIX}/invoice/status/'
+            if not self.path.startswith(prefix):
+                return self._send_json(404, {'success': False, 'error': 'Not found'})
+            item = status_item(state, self.path[len(prefix):])
+            if not item.pop('success'):
+                return self._send_json(404, {'success': False, 'error': item['error']})
+            return self._send_json(200, {'success': True, 'data': item})
+
+        def log_message(self, fmt, *args):  # silencioso por defecto
+            pass
+
+    return EcfStubHandler
+
+
+def make_server(host='127.0.0.1', port=0):
+    """Crea el servidor (port=0 elige un puerto libre)."""
+    return ThreadingHTTPServer((host, port), make_handler(EcfStubState()))
+
+
+def serve_in_thread(host='127.0.0.1', port=0):
+    """
+    Arranca el servidor en un hilo daemon.
+
+    Returns:
+        tuple: (server, base_url) — llamar server.shutdown() al terminar
+    """
+    server = make_server(host, port)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f'http://{host}:{server.server_address[1]}{API_PREFIX}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor local que imita el microservicio dgii-ecf')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3000)
+    args = parser.parse_args()
+    server = make_server(args.host, args.port)
+    print(f'Microservicio dgii-ecf simulado en http://{args.host}:{args.port}{API_PREFIX}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
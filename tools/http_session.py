@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Gestor de sesiones HTTP reutilizables (keep-alive) por proceso y URL base.
+
+Cada worker de Odoo (proceso) mantiene una ``requests.Session`` por
+esquema+host con su propio pool de conexiones, de modo que las llamadas
+consecutivas al microservicio reutilizan la conexión TCP/TLS abierta.
+Las sesiones heredadas tras un ``fork`` se descartan para no compartir
+sockets con el proceso padre.
+"""
+import os
+import threading
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_POOL_SIZE = 10
+
+_lock = threading.Lock()
+_sessions = {}
+_owner_pid = None
+
+
+def _base_url(url):
+    """Retorna 'esquema://host[:puerto]' de una URL."""
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}".lower()
+
+
+def _new_session(pool_size):
+    session = requests.Session()
+    # Sin cookies: la sesión se comparte entre hilos y no debe guardar estado.
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=pool_size,
+        pool_block=False,
+        max_retries=0,
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session(url, pool_size=DEFAULT_POOL_SIZE):
+    """
+    Obtiene la sesión compartida para la URL base de `url`.
+
+    Args:
+        url (str): URL completa o base del servicio
+        pool_size (int): conexiones máximas mantenidas abiertas hacia ese host
+
+    Returns:
+        requests.Session
+    """
+    global _owner_pid
+    key = _base_url(url)
+    pool_size = max(int(pool_size or DEFAULT_POOL_SIZE), 1)
+    with _lock:
+        pid = os.getpid()
+        if _owner_pid != pid:
+            _sessions.clear()
+            _owner_pid = pid
+        entry = _sessions.get(key)
+        if entry is None or entry[1] != pool_size:
+            if entry is not None:
+                entry[0].close()
+            entry = (_new_session(pool_size), pool_size)
+            _sessions[key] = entry
+        return entry[0]
+
+
+def request(method, url, pool_size=DEFAULT_POOL_SIZE, **kwargs):
+    """Equivalente a ``requests.request`` usando la sesión compartida del host."""
+    return get_session(url, pool_size).request(method=method, url=url, **kwargs)
+
+
+def close_all():
+    """Cierra todas las sesiones del proceso actual."""
+    with _lock:
+        for session, _pool_size in _sessions.values():
+            session.close()
+        _sessions.clear()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Caché LRU en memoria (por proceso) con expiración por entrada.
+
+Es el primer nivel de ``dgii.lookup.cache``: las consultas repetidas de un
+mismo RNC o directorio se responden sin tocar la base de datos. Las entradas
+heredadas tras un ``fork`` se descartan.
+
+Cada proceso guarda las entradas como máximo ``LOCAL_TTL_MAX`` segundos, de
+modo que una invalidación hecha en otro worker se ve en ese plazo.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Entradas máximas por base de datos y proceso
+MAX_ENTRIES = 4096
+
+# Vigencia máxima (segundos) de una entrada en memoria
+LOCAL_TTL_MAX = 300
+
+# Valor que representa un resultado negativo (no encontrado) en caché
+NEGATIVE = object()
+
+_lock = threading.Lock()
+_caches = {}
+_owner_pid = None
+
+
+def _check_fork():
+    global _owner_pid
+    if _owner_pid != os.getpid():
+        _caches.clear()
+        _owner_pid = os.getpid()
+
+
+def get(dbname, key):
+    """
+    Retorna el valor vigente de `key`, ``NEGATIVE`` para un negativo vigente,
+    o None si no está o expiró.
+    """
+    with _lock:
+        _check_fork()
+        cache = _caches.get(dbname)
+        entry = cache and cache.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires <= time.monotonic():
+            del cache[key]
+            return None
+        cache.move_to_end(key)
+        return value
+
+
+def put(dbname, key, value, ttl):
+    """Guarda `value` (o ``NEGATIVE``) durante `ttl` segundos."""
+    if ttl <= 0:
+        return
+    with _lock:
+        _check_fork()
+        cache = _caches.setdefault(dbname, OrderedDict())
+        cache[key] = (value, time.monotonic() + min(ttl, LOCAL_TTL_MAX))
+        cache.move_to_end(key)
+        while len(cache) > MAX_ENTRIES:
+            cache.popitem(last=False)
+
+
+def invalidate(dbname, predicate=None):
+    """Elimina las entradas cuya clave cumple `predicate` (todas si es None)."""
+    with _lock:
+        _check_fork()
+        cache = _caches.get(dbname)
+        if not cache:
+            return
+        if predicate is None:
+            cache.clear()
+            return
+        for key in [key for key in cache if predicate(key)]:
+            del cache[key]
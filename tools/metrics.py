@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Acumulador en memoria de histogramas de latencia por etapa.
+
+Las mediciones se agregan por proceso en buckets fijos (sin escribir en la
+base de datos en cada envío) y se vuelcan periódicamente al modelo
+``dgii.latency.histogram`` con un UPSERT por serie.
+
+Uso:
+    with metrics.timer(dbname, (company_id, tipo_ecf, endpoint, 'http')):
+        ...
+"""
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Límites superiores (ms) de los buckets; el último bucket es +Inf
+BUCKET_BOUNDS_MS = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 20000)
+
+# Nombre del campo de cada bucket en dgii.latency.histogram
+BUCKET_FIELDS = tuple(f'bucket_le_{bound}' for bound in BUCKET_BOUNDS_MS) + ('bucket_inf',)
+
+_lock = threading.Lock()
+_series = {}
+_last_flush = {}
+_owner_pid = None
+
+
+def _check_fork():
+    global _owner_pid
+    if _owner_pid != os.getpid():
+        _series.clear()
+        _last_flush.clear()
+        _owner_pid = os.getpid()
+
+
+def observe(dbname, key, duration_ms):
+    """
+    Registra una duración.
+
+    Args:
+        dbname (str): base de datos
+        key (tuple): (company_id, tipo_ecf, endpoint, stage)
+        duration_ms (float): duración en milisegundos
+    """
+    index = bisect.bisect_left(BUCKET_BOUNDS_MS, duration_ms)
+    with _lock:
+        _check_fork()
+        series = _series.setdefault(dbname, {}).get(key)
+        if series is None:
+            series = _series[dbname][key] = {
+                'count': 0, 'sum_ms': 0.0, 'max_ms': 0.0, 'buckets': [0] * len(BUCKET_FIELDS),
+            }
+        series['count'] += 1
+        series['sum_ms'] += duration_ms
+        series['max_ms'] = max(series['max_ms'], duration_ms)
+        series['buckets'][index] += 1
+
+
+@contextmanager
+def timer(dbname, key):
+    """Mide el bloque y lo registra en la serie `key`, también si lanza excepción."""
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        observe(dbname, key, (time.monotonic() - start) * 1000)
+
+
+def drain(dbname):
+    """Retorna y reinicia las series acumuladas de la base de datos."""
+    with _lock:
+        _check_fork()
+        _last_flush[dbname] = time.monotonic()
+        return _series.pop(dbname, {})
+
+
+def restore(dbname, series):
+    """Devuelve al acumulador series que no pudieron volcarse."""
+    with _lock:
+        current = _series.setdefault(dbname, {})
+        for key, data in series.items():
+            target = current.get(key)
+            if target is None:
+                current[key] = data
+                continue
+            target['count'] += data['count']
+            target['sum_ms'] += data['sum_ms']
+            target['max_ms'] = max(target['max_ms'], data['max_ms'])
+            target['buckets'] = [a + b for a, b in zip(target['buckets'], data['buckets'])]
+
+
+def flush_due(dbname, interval):
+    """Indica si pasaron `interval` segundos desde el último volcado del proceso."""
+    with _lock:
+        _check_fork()
+        if not _series.get(dbname):
+            return False
+        last = _last_flush.setdefault(dbname, time.monotonic())
+        return time.monotonic() - last >= interval
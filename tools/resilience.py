@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Limitador de tasa adaptativo (token bucket) por endpoint y proceso.
+
+Cada endpoint lógico ('send', 'status', 'rnc', 'directory') tiene un bucket
+cuya tasa se ajusta con la latencia y los errores observados (AIMD):
+
+* un error o una latencia por encima del objetivo reduce la tasa a la mitad;
+* cada respuesta rápida y correcta la aumenta en un 10% hasta el máximo.
+
+Así, cuando el microservicio o la DGII se degradan, los workers dejan de
+acumular peticiones lentas y fallan rápido con ``RateLimitedError``.
+"""
+import os
+import threading
+import time
+
+import requests
+
+# Tasa mínima (peticiones/segundo) a la que puede bajar un endpoint degradado
+MIN_RATE = 0.2
+
+
+class CircuitOpenError(requests.RequestException):
+    """El circuito del endpoint está abierto: la petición no se envía."""
+
+
+class RateLimitedError(requests.RequestException):
+    """No hay capacidad disponible en el limitador dentro del tiempo de espera."""
+
+
+class AdaptiveRateLimiter:
+    """Token bucket thread-safe con tasa adaptativa."""
+
+    def __init__(self, max_rate, latency_target):
+        self.lock = threading.Lock()
+        self.max_rate = max(float(max_rate), MIN_RATE)
+        self.rate = self.max_rate
+        self.capacity = max(self.max_rate, 1.0)
+        self.tokens = self.capacity
+        self.latency_target = latency_target
+        self.updated = time.monotonic()
+
+    def configure(self, max_rate, latency_target):
+        """Actualiza límites si cambió la configuración."""
+        with self.lock:
+            max_rate = max(float(max_rate), MIN_RATE)
+            if max_rate != self.max_rate:
+                self.max_rate = max_rate
+                self.rate = min(self.rate, max_rate)
+                self.capacity = max(max_rate, 1.0)
+            self.latency_target = latency_target
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        self.updated = now
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+
+    def acquire(self, max_wait=0.0):
+        """
+        Consume un token, esperando como máximo `max_wait` segundos.
+
+        Returns:
+            bool: True si se obtuvo el token
+        """
+        deadline = time.monotonic() + max_wait
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if now + wait > deadline:
+                return False
+            time.sleep(wait)
+
+    def record(self, latency, ok):
+        """Ajusta la tasa según el resultado de una petición."""
+        with self.lock:
+            if not ok or latency > self.latency_target:
+                self.rate = max(self.rate / 2, MIN_RATE)
+                self.tokens = min(self.tokens, 1.0)
+            else:
+                self.rate = min(self.rate * 1.1, self.max_rate)
+
+
+_lock = threading.Lock()
+_limiters = {}
+_owner_pid = None
+
+
+def get_limiter(key, max_rate, latency_target):
+    """Obtiene (o crea) el limitador del proceso para `key`."""
+    global _owner_pid
+    with _lock:
+        if _owner_pid != os.getpid():
+            _limiters.clear()
+            _owner_pid = os.getpid()
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = _limiters[key] = AdaptiveRateLimiter(max_rate, latency_target)
+    limiter.configure(max_rate, latency_target)
+    return limiter
+
+
+def current_rates():
+    """Tasas actuales de los limitadores del proceso, para diagnóstico."""
+    with _lock:
+        return {key: round(limiter.rate, 2) for key, limiter in _limiters.items()}
@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Validación local (sin red) de RNC y Cédula.
+
+- RNC (9 dígitos): dígito verificador módulo 11 de DGII con pesos
+  7, 9, 8, 6, 5, 4, 3, 2.
+- Cédula (11 dígitos): dígito verificador Luhn de la JCE (pesos 1, 2
+  alternos, sumando los dígitos de cada producto).
+
+``validate_many`` valida listas completas con tablas precalculadas por
+posición, para descartar números mal formados en importaciones masivas
+antes de cualquier consulta.
+
+Los números reales con dígito verificador incorrecto (``rnc_whitelist``)
+se aceptan por defecto. Un rechazo por ``REASON_CHECK_DIGIT`` no es
+definitivo: el llamador puede confirmarlo contra el padrón local.
+
+Uso:
+    reasons = rnc_validator.validate_many(['131793916', '00113918205'])
+    # [None, None]: ambos válidos
+"""
+import re
+
+from .rnc_whitelist import DEFAULT_WHITELIST
+
+# Motivos de rechazo (None = válido)
+REASON_EMPTY = 'empty'
+REASON_DIGITS = 'digits'
+REASON_LENGTH = 'length'
+REASON_KNOWN_INVALID = 'known_invalid'
+REASON_CHECK_DIGIT = 'check_digit'
+
+RNC_LENGTH = 9
+CEDULA_LENGTH = 11
+
+RNC_WEIGHTS = (7, 9, 8, 6, 5, 4, 3, 2)
+CEDULA_WEIGHTS = (1, 2, 1, 2, 1, 2, 1, 2, 1, 2)
+
+# Números estructuralmente correctos que nunca son contribuyentes
+DEFAULT_KNOWN_INVALID = frozenset({'0' * RNC_LENGTH, '0' * CEDULA_LENGTH})
+
+_NON_DIGITS = re.compile(r'[^0-9]')
+
+# Aporte de cada dígito ('0'..'9') en cada posición, precalculado
+_RNC_TABLES = tuple({str(d): d * w for d in range(10)} for w in RNC_WEIGHTS)
+_CEDULA_TABLES = tuple({str(d): sum(divmod(d * w, 10)) for d in range(10)} for w in CEDULA_WEIGHTS)
+
+
+def normalize(value):
+    """Deja solo los dígitos de `value` ('' si está vacío)."""
+    return _NON_DIGITS.sub('', value) if value else ''
+
+
+def rnc_check_digit(digits):
+    """Dígito verificador de los 8 primeros dígitos de un RNC."""
+    remainder = sum(table[c] for table, c in zip(_RNC_TABLES, digits)) % 11
+    if remainder == 0:
+        return '2'
+    if remainder == 1:
+        return '1'
+    return str(11 - remainder)
+
+
+def cedula_check_digit(digits):
+    """Dígito verificador Luhn de los 10 primeros dígitos de una Cédula."""
+    total = sum(table[c] for table, c in zip(_CEDULA_TABLES, digits))
+    return str((10 - total % 10) % 10)
+
+
+def validate(number, known_invalid=DEFAULT_KNOWN_INVALID, whitelist=DEFAULT_WHITELIST):
+    """
+    Valida un RNC o Cédula ya normalizado (solo dígitos).
+
+    Args:
+        number (str): número a validar
+        known_invalid (set): números rechazados aunque el dígito cuadre
+        whitelist (set): números aceptados aunque el dígito no cuadre
+            (por defecto, las excepciones conocidas de rnc_whitelist)
+
+    Returns:
+        str: motivo de rechazo (``REASON_*``) o None si es válido
+    """
+    if not number:
+        return REASON_EMPTY
+    if number in whitelist:
+        return None
+    if not number.isdigit():
+        return REASON_DIGITS
+    length = len(number)
+    if length == RNC_LENGTH:
+        expected = rnc_check_digit(number)
+    elif length == CEDULA_LENGTH:
+        expected = cedula_check_digit(number)
+    else:
+        return REASON_LENGTH
+    if number in known_invalid:
+        return REASON_KNOWN_INVALID
+    if number[-1] != expected:
+        return REASON_CHECK_DIGIT
+    return None
+
+
+def validate_many(numbers, known_invalid=DEFAULT_KNOWN_INVALID, whitelist=DEFAULT_WHITELIST):
+    """
+    Valida una lista de números normalizados.
+
+    Returns:
+        list: motivo de rechazo (o None) por cada número, en el mismo orden
+    """
+    known_invalid = frozenset(known_invalid)
+    whitelist = frozenset(whitelist)
+    return [validate(number, known_invalid, whitelist) for number in numbers]
+
+
+def is_valid(number, known_invalid=DEFAULT_KNOWN_INVALID, whitelist=DEFAULT_WHITELIST):
+    return validate(number, known_invalid, whitelist) is None
@@ -65,7 +65,8 @@ class ApplyCreditWizard(models.TransientModel):
         'l10n_do.ecf_credit',
         string='Nota de Crédito',
         required=True,
-        domain="[('partner_id', '=', partner_id), ('state', 'in', ['available', 'partial']), ('company_id', '=', company_id)]",
+        domain="[('partner_id', '=', partner_id), ('state', 'in', ['available', 'partial']), "
+               "('company_id', '=', company_id), ('currency_id', '=', currency_id)]",
         help='Crédito de NC a aplicar'
     )
 
@@ -98,34 +99,42 @@ class ApplyCreditWizard(models.TransientModel):
 
     available_credits_count = fields.Integer(
         string='# Créditos Disponibles',
-        compute='_compute_available_credits',
+        compute='_compute_credit_balance',
     )
 
     total_available = fields.Monetary(
         string='Total Créditos Disponibles',
-        compute='_compute_available_credits',
+        compute='_compute_credit_balance',
         currency_field='currency_id',
     )
 
     # ========== MÉTODOS COMPUTADOS ==========
-    @api.depends('invoice_id', 'partner_id', 'company_id')
+    @api.depends('invoice_id', 'partner_id', 'company_id', 'currency_id')
     def _compute_available_credits(self):
         for wizard in self:
-            if not wizard.partner_id or not wizard.company_id:
+            if not wizard.partner_id or not wizard.company_id or not wizard.currency_id:
                 wizard.available_credits = False
-                wizard.available_credits_count = 0
-                wizard.total_available = 0.0
                 continue
 
-            credits = self.env['l10n_do.ecf_credit'].search([
+            wizard.available_credits = self.env['l10n_do.ecf_credit'].search([
                 ('partner_id', '=', wizard.partner_id.id),
                 ('company_id', '=', wizard.company_id.id),
+                ('currency_id', '=', wizard.currency_id.id),
                 ('state', 'in', ['available', 'partial']),
                 ('amount_available', '>', 0),
             ])
-            wizard.available_credits = credits
-            wizard.available_credits_count = len(credits)
-            wizard.total_available = sum(c.amount_available for c in credits)
+
+    @api.depends('partner_id', 'company_id', 'currency_id')
+    def _compute_credit_balance(self):
+        """Saldo y cantidad de créditos desde el agregado por cliente (una fila)."""
+        balance = self.env['l10n_do.ecf_credit_balance'].sudo()
+        for wizard in self:
+            if not wizard.partner_id or not wizard.company_id or not wizard.currency_id:
+                wizard.available_credits_count = 0
+                wizard.total_available = 0.0
+                continue
+            wizard.total_available, wizard.available_credits_count = balance._get_balance(
+                wizard.partner_id, wizard.company_id, wizard.currency_id)
 
     # ========== ONCHANGE ==========
     @api.onchange('credit_id')
@@ -158,6 +167,14 @@ class ApplyCreditWizard(models.TransientModel):
         if not self.invoice_id:
             raise UserError(_('No hay factura seleccionada.'))
 
+        if self.credit_id.currency_id != self.invoice_id.currency_id:
+            raise UserError(_(
+                'La NC %(encf)s está en %(credit_currency)s y la factura en %(invoice_currency)s.',
+                encf=self.credit_id.encf,
+                credit_currency=self.credit_id.currency_id.name,
+                invoice_currency=self.invoice_id.currency_id.name,
+            ))
+
         if self.amount_to_apply <= 0:
             raise UserError(_('El monto a aplicar debe ser mayor a cero.'))
 